@@ -0,0 +1,206 @@
+import io
+import os
+import sys
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Share the LTTB implementation with the analysis server
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server', 'python'))
+from downsample import downsample_indices, lttb_indices
+
+CHART_TYPES = ['price', 'volume', 'prediction', 'ema', 'rsi', 'signals']
+
+# A 10-inch chart can't show more points than this
+DEFAULT_MAX_POINTS = 1000
+
+def results_hash(results):
+    """Stable hash of an analysis result, used as the chart cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(results.get('ticker')).encode())
+    digest.update(np.asarray(pd.DatetimeIndex(results['dates']).asi8).tobytes())
+    for key in ['prices', 'predictions', 'ema_20', 'ema_50', 'rsi', 'signals']:
+        digest.update(np.ascontiguousarray(results[key], dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(results['stock_data']['Volume'].values, dtype=np.float64).tobytes())
+    digest.update(json.dumps(results.get('next_day_prediction'), sort_keys=True).encode())
+    return digest.hexdigest()
+
+class ChartRenderer:
+    """Renders the dashboard charts to PNG/SVG bytes with a bounded LRU cache
+
+    Charts are drawn on standalone Figure objects (not pyplot), so nothing is
+    registered globally and each figure is released as soon as it has been
+    serialized. The cache is keyed by (result hash, chart type, format) and
+    evicts least-recently-used entries once max_bytes is exceeded.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_workers=4, max_points=DEFAULT_MAX_POINTS):
+        self.max_bytes = max_bytes
+        self.max_points = max_points
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chart-render')
+
+    def _get(self, key):
+        with self.lock:
+            data = self.cache.get(key)
+            if data is not None:
+                self.cache.move_to_end(key)
+            return data
+
+    def _put(self, key, data):
+        with self.lock:
+            if key in self.cache:
+                return
+            self.cache[key] = data
+            self.cache_bytes += len(data)
+            while self.cache_bytes > self.max_bytes and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.cache_bytes -= len(evicted)
+
+    def render_all(self, results, chart_types=CHART_TYPES, fmt='png'):
+        """Render every chart type in parallel, returning {chart type: bytes}"""
+        digest = results_hash(results)
+        charts = {}
+        missing = []
+        for chart_type in chart_types:
+            data = self._get((digest, chart_type, fmt))
+            if data is not None:
+                charts[chart_type] = data
+            else:
+                missing.append(chart_type)
+        if not missing:
+            return charts
+
+        sample = self._sample(results)
+        pending = {chart_type: self.executor.submit(self._render, results, sample, chart_type, fmt)
+                   for chart_type in missing}
+
+        for chart_type, future in pending.items():
+            data = future.result()
+            self._put((digest, chart_type, fmt), data)
+            charts[chart_type] = data
+        return charts
+
+    def _render(self, results, sample, chart_type, fmt):
+        figure = Figure(figsize=(10, 8) if chart_type == 'rsi' else (10, 4) if chart_type == 'volume' else (10, 6))
+        FigureCanvasAgg(figure)
+        try:
+            getattr(self, f'_draw_{chart_type}')(figure, results, sample)
+            buffer = io.BytesIO()
+            figure.savefig(buffer, format=fmt, bbox_inches='tight')
+            return buffer.getvalue()
+        finally:
+            # Drop the artists right away instead of waiting for garbage collection
+            figure.clear()
+
+    def _sample(self, results):
+        """Downsampled view of the plotted series (LTTB over price, prediction, EMAs and RSI)"""
+        idx = downsample_indices(
+            [results['prices'], results['predictions'], results['ema_20'], results['ema_50'], results['rsi']],
+            self.max_points
+        )
+        sample = {key: np.asarray(results[key])[idx]
+                  for key in ['prices', 'predictions', 'ema_20', 'ema_50', 'rsi']}
+        sample['dates'] = pd.DatetimeIndex(results['dates'])[idx]
+        return sample
+
+    @staticmethod
+    def _format(ax, title, ylabel, legend=True):
+        ax.set_title(title, fontsize=16)
+        ax.set_xlabel('Date', fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3)
+        if legend:
+            ax.legend()
+
+    def _draw_price(self, figure, results, sample):
+        ax = figure.subplots()
+        ax.plot(sample['dates'], sample['prices'], label='Price')
+        self._format(ax, f"{results['ticker']} Price History", 'Price ($)')
+
+    def _draw_volume(self, figure, results, sample):
+        ax = figure.subplots()
+        volume = np.asarray(results['stock_data']['Volume'].values, dtype=np.float64).flatten()
+        idx = lttb_indices(volume, self.max_points)
+        ax.bar(pd.DatetimeIndex(results['dates'])[idx], volume[idx], alpha=0.7, color='#2E86C1')
+        self._format(ax, f"{results['ticker']} Trading Volume", 'Volume', legend=False)
+
+    def _draw_prediction(self, figure, results, sample):
+        ax = figure.subplots()
+        ax.plot(sample['dates'], sample['prices'], label='Actual Price', color='blue')
+        ax.plot(sample['dates'], sample['predictions'], label='Predicted Price', color='red', linestyle='--')
+
+        if 'next_day_prediction' in results:
+            next_date = pd.to_datetime(results['next_day_prediction']['date'])
+            next_price = results['next_day_prediction']['price']
+            ax.scatter([next_date], [next_price], color='green', s=100, zorder=5,
+                       label='Next Day Prediction')
+            ax.annotate(f"${next_price:.2f}",
+                        (next_date, next_price),
+                        xytext=(10, 10),
+                        textcoords='offset points',
+                        arrowprops=dict(arrowstyle='->', color='green'),
+                        color='green',
+                        fontweight='bold')
+
+        self._format(ax, f"{results['ticker']} - Actual vs Predicted Prices", 'Price ($)')
+
+    def _draw_ema(self, figure, results, sample):
+        ax = figure.subplots()
+        ax.plot(sample['dates'], sample['prices'], label='Price', alpha=0.7)
+        ax.plot(sample['dates'], sample['ema_20'], label='EMA 20', color='orange')
+        ax.plot(sample['dates'], sample['ema_50'], label='EMA 50', color='green')
+        self._format(ax, f"{results['ticker']} - Price and EMA", 'Price ($)')
+
+    def _draw_rsi(self, figure, results, sample):
+        ax1, ax2 = figure.subplots(2, 1, gridspec_kw={'height_ratios': [3, 1]})
+
+        ax1.plot(sample['dates'], sample['prices'], label='Price')
+        ax1.set_title(f"{results['ticker']} - Price", fontsize=16)
+        ax1.grid(True, alpha=0.3)
+        ax1.legend()
+
+        rsi = sample['rsi']
+        ax2.plot(sample['dates'], rsi, label='RSI', color='purple')
+        ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5)
+        ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5)
+        ax2.fill_between(sample['dates'], rsi, 70, where=(rsi >= 70), color='red', alpha=0.3)
+        ax2.fill_between(sample['dates'], rsi, 30, where=(rsi <= 30), color='green', alpha=0.3)
+        ax2.set_title('RSI (14)', fontsize=16)
+        ax2.set_ylim(0, 100)
+        ax2.grid(True, alpha=0.3)
+        figure.tight_layout()
+
+    def _draw_signals(self, figure, results, sample):
+        ax = figure.subplots()
+        ax.plot(sample['dates'], sample['prices'], label='Price', alpha=0.7)
+
+        # Markers are drawn from the full series so every signal is shown exactly
+        signals = np.asarray(results['signals'])
+        dates = pd.DatetimeIndex(results['dates'])
+        prices = np.asarray(results['prices'])
+        buy = signals == 1
+        sell = signals == -1
+        if buy.any():
+            ax.scatter(dates[buy], prices[buy], marker='^', color='green', s=100, label='Buy')
+        if sell.any():
+            ax.scatter(dates[sell], prices[sell], marker='v', color='red', s=100, label='Sell')
+
+        if 'next_day_prediction' in results:
+            next_date = pd.to_datetime(results['next_day_prediction']['date'])
+            next_price = results['next_day_prediction']['price']
+            signal = results['next_day_prediction']['signal']
+            marker, color = {'BUY': ('^', 'green'), 'SELL': ('v', 'red')}.get(signal, ('o', 'blue'))
+            ax.scatter([next_date], [next_price], marker=marker, color=color,
+                       s=150, label=f'Next Day ({signal})', edgecolors='black')
+
+        self._format(ax, f"{results['ticker']} - Trading Signals", 'Price ($)')
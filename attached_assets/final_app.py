@@ -1,21 +1,10 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import datetime
 from simple_stock_analysis import analyze_stock
-import socketio
-import threading
-import time
-import json
 from login import login_page, logout
-
-# Initialize Socket.IO client
-sio = socketio.Client(logger=True, engineio_logger=True)
-
-# Global variables for stock notifications
-top_stocks = []
-notification_count = 0
+from chart_renderer import ChartRenderer
+from live_feed import LiveTickerClient
 
 # Set page configuration
 st.set_page_config(
@@ -24,78 +13,24 @@ st.set_page_config(
     layout="wide"
 )
 
-# Define Socket.IO event handlers
-@sio.event
-def connect():
-    print("Connected to Socket.IO server")
-
-@sio.event
-def disconnect():
-    print("Disconnected from Socket.IO server")
-
-@sio.on('stock_update')
-def on_stock_update(data):
-    print(f"Received stock update: {data}")
-    # Add the stock update to our list if it's not already there
-    if isinstance(data, dict) and 'ticker' in data:
-        for i, stock in enumerate(top_stocks):
-            if stock['ticker'] == data['ticker']:
-                top_stocks[i] = data
-                break
-        else:
-            if len(top_stocks) >= 4:
-                top_stocks.pop(0)  # Remove oldest if we already have 4
-            top_stocks.append(data)
-
-        # Increment notification counter to trigger UI update
-        global notification_count
-        notification_count += 1
-
-@sio.on('top_stocks_update')
-def on_top_stocks_update(data):
-    print(f"Received top stocks update: {data}")
-    global top_stocks, notification_count
-
-    # Update our list of top stocks without affecting analysis
-    if isinstance(data, list) and len(data) > 0:
-        # Only update price and signal info
-        for new_stock in data:
-            for i, existing_stock in enumerate(top_stocks):
-                if existing_stock['ticker'] == new_stock['ticker']:
-                    top_stocks[i].update({
-                        'price': new_stock['price'],
-                        'signal': new_stock['signal'],
-                        'change_percent': new_stock['change_percent'],
-                        'timestamp': new_stock['timestamp']
-                    })
-                    break
-            else:
-                if len(top_stocks) >= 4:
-                    top_stocks.pop(0)
-                top_stocks.append(new_stock)
-        notification_count += 1
-
-# Socket.IO connection thread
-def socketio_thread():
-    while True:
-        try:
-            if not sio.connected:
-                print("Trying to connect to Socket.IO server...")
-                sio.connect('http://0.0.0.0:8001', transports=['websocket'])
-            time.sleep(10)
-        except Exception as e:
-            print(f"Socket.IO connection error: {str(e)}")
-            time.sleep(5)
-
-# Start the WebSocket thread when the app loads
-if not sio.connected:
-    threading.Thread(target=socketio_thread, daemon=True).start()
+# One Socket.IO connection (and reader thread) for the whole process, however
+# many sessions and reruns there are
+@st.cache_resource
+def get_live_client():
+    return LiveTickerClient().start()
+
+live_client = get_live_client()
 
 # Cache the analysis function to improve performance
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def get_stock_analysis(ticker, start_date, end_date, lookback_period):
     return analyze_stock(ticker, start_date, end_date, lookback_period)
 
+# One renderer (and chart cache) shared by every session
+@st.cache_resource
+def get_chart_renderer():
+    return ChartRenderer()
+
 # First, check if user is authenticated
 if not login_page():
     # Exit here if not logged in
@@ -195,9 +130,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Do not auto-refresh the entire page
-# We'll use socket.io to update just the notification bar
-
 # Create hardcoded stocks for demonstration (in case WebSocket doesn't connect in time)
 demo_stocks = [
     {"ticker": "AAPL", "price": 204.60, "signal": "NEUTRAL", "change_percent": -0.68},
@@ -207,92 +139,19 @@ demo_stocks = [
 ]
 
 # Initialize session state variables if they don't exist
-if 'top_stocks' not in st.session_state:
-    st.session_state.top_stocks = demo_stocks
-
-if 'notification_count' not in st.session_state:
-    st.session_state.notification_count = 0
-
-if 'last_update_time' not in st.session_state:
-    st.session_state.last_update_time = datetime.datetime.now()
-
-# Update session state if we have data from WebSocket
-if top_stocks and len(top_stocks) > 0:
-    # Always update when new data arrives - we're going to force a rerun
-    st.session_state.top_stocks = top_stocks
-    st.session_state.notification_count += 1
-    st.session_state.last_update_time = datetime.datetime.now()
+if 'live_stocks' not in st.session_state:
+    st.session_state.live_stocks = {stock['ticker']: dict(stock) for stock in demo_stocks}
 
-    # ALWAYS rerun when new data is received
-    st.rerun()
+# Version of the shared snapshot this session has already applied
+if 'feed_cursor' not in st.session_state:
+    st.session_state.feed_cursor = 0
 
-# Real-time stock notification bar (use session state for rendering)
-st.subheader("🔔 Real-time Market Movers")
-
-# Extract timestamp from the most recent stock data
-# Get the latest update time from the socket data
-if st.session_state.top_stocks and isinstance(st.session_state.top_stocks[0], dict):
-    latest_stock = st.session_state.top_stocks[0]
-    update_time = latest_stock.get('server_time', datetime.datetime.now().strftime("%H:%M:%S"))
-else:
-    update_time = datetime.datetime.now().strftime("%H:%M:%S")
-
-# Display update timestamp prominently at the top with animation when it changes
 if 'previous_update_time' not in st.session_state:
-    st.session_state.previous_update_time = update_time
-
-if st.session_state.previous_update_time != update_time:
-    # Animation effect for new updates
-    st.markdown(f"""
-    <div style='text-align:right; margin-bottom:10px;'>
-        <div style='display:inline-block; padding:5px 10px; background-color:#2a9d8f; color:white; 
-                  border-radius:4px; font-weight:bold; animation:pulse 2s infinite;'>
-            ⟳ Last updated: {update_time}
-        </div>
-    </div>
-    <style>
-    @keyframes pulse {{
-        0% {{ opacity: 1; transform: scale(1); }}
-        50% {{ opacity: 0.8; transform: scale(1.05); }}
-        100% {{ opacity: 1; transform: scale(1); }}
-    }}
-    </style>
-    """, unsafe_allow_html=True)
-
-    # Update previous time for next comparison
-    st.session_state.previous_update_time = update_time
-else:
-    st.markdown(f"""
-    <div style='text-align:right; margin-bottom:10px;'>
-        <div style='display:inline-block; padding:5px 10px; background-color:#444; color:white; 
-                  border-radius:4px;'>
-            ⟳ Last updated: {update_time}
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-# Use Streamlit's built-in UI components for reliable rendering
-col1, col2, col3, col4 = st.columns(4)
+    st.session_state.previous_update_time = None
 
-with col1:
-    stock = st.session_state.top_stocks[0]
-    signal_color = "gray"
-    if stock['signal'] == 'BUY':
-        signal_color = "green"
-    elif stock['signal'] == 'SELL':
-        signal_color = "red"
-
-    change_color = "green" if stock.get('change_percent', 0) >= 0 else "red"
-    change_symbol = "+" if stock.get('change_percent', 0) >= 0 else ""
-
-    st.markdown(f"<div style='padding:10px; border-radius:5px; background-color:#2D2D2D; border-left:4px solid {signal_color};'>", unsafe_allow_html=True)
-    st.markdown(f"<h3 style='text-align:center; margin:0;'>{stock['ticker']}</h3>", unsafe_allow_html=True)
-    st.markdown(f"<div style='text-align:center; font-size:16px;'>${stock.get('price', 0):.2f} <span style='color:{change_color};'>{change_symbol}{stock.get('change_percent', 0):.2f}%</span></div>", unsafe_allow_html=True)
-    st.markdown(f"<div style='text-align:center; font-size:14px;'>Signal: {stock['signal']}</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+STOCKS_PER_ROW = 4
 
-with col2:
-    stock = st.session_state.top_stocks[1]
+def render_stock_card(stock):
     signal_color = "gray"
     if stock['signal'] == 'BUY':
         signal_color = "green"
@@ -308,43 +167,65 @@ with col2:
     st.markdown(f"<div style='text-align:center; font-size:14px;'>Signal: {stock['signal']}</div>", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-with col3:
-    stock = st.session_state.top_stocks[2]
-    signal_color = "gray"
-    if stock['signal'] == 'BUY':
-        signal_color = "green"
-    elif stock['signal'] == 'SELL':
-        signal_color = "red"
-
-    change_color = "green" if stock.get('change_percent', 0) >= 0 else "red"
-    change_symbol = "+" if stock.get('change_percent', 0) >= 0 else ""
+# Real-time stock notification bar. Runs as a fragment, so socket updates only
+# re-render this bar instead of rerunning the whole page.
+@st.fragment(run_every=2)
+def market_movers_bar():
+    live_stocks = st.session_state.live_stocks
+
+    # Apply everything that changed since the last refresh
+    version, changed, server_time = live_client.changes_since(st.session_state.feed_cursor)
+    live_stocks.update(changed)
+    st.session_state.feed_cursor = version
+    if server_time:
+        st.session_state.latest_server_time = server_time
+
+    st.subheader("🔔 Real-time Market Movers")
+
+    # Get the latest update time from the socket data
+    update_time = st.session_state.get('latest_server_time', datetime.datetime.now().strftime("%H:%M:%S"))
+
+    # Display update timestamp prominently at the top with animation when it changes
+    if st.session_state.previous_update_time not in (None, update_time):
+        # Animation effect for new updates
+        st.markdown(f"""
+        <div style='text-align:right; margin-bottom:10px;'>
+            <div style='display:inline-block; padding:5px 10px; background-color:#2a9d8f; color:white; 
+                      border-radius:4px; font-weight:bold; animation:pulse 2s infinite;'>
+                ⟳ Last updated: {update_time}
+            </div>
+        </div>
+        <style>
+        @keyframes pulse {{
+            0% {{ opacity: 1; transform: scale(1); }}
+            50% {{ opacity: 0.8; transform: scale(1.05); }}
+            100% {{ opacity: 1; transform: scale(1); }}
+        }}
+        </style>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown(f"""
+        <div style='text-align:right; margin-bottom:10px;'>
+            <div style='display:inline-block; padding:5px 10px; background-color:#444; color:white; 
+                      border-radius:4px;'>
+                ⟳ Last updated: {update_time}
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    st.session_state.previous_update_time = update_time
 
-    st.markdown(f"<div style='padding:10px; border-radius:5px; background-color:#2D2D2D; border-left:4px solid {signal_color};'>", unsafe_allow_html=True)
-    st.markdown(f"<h3 style='text-align:center; margin:0;'>{stock['ticker']}</h3>", unsafe_allow_html=True)
-    st.markdown(f"<div style='text-align:center; font-size:16px;'>${stock.get('price', 0):.2f} <span style='color:{change_color};'>{change_symbol}{stock.get('change_percent', 0):.2f}%</span></div>", unsafe_allow_html=True)
-    st.markdown(f"<div style='text-align:center; font-size:14px;'>Signal: {stock['signal']}</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    # One card per ticker, wrapped into rows
+    stocks = list(live_stocks.values())
+    for row_start in range(0, len(stocks), STOCKS_PER_ROW):
+        columns = st.columns(STOCKS_PER_ROW)
+        for column, stock in zip(columns, stocks[row_start:row_start + STOCKS_PER_ROW]):
+            with column:
+                render_stock_card(stock)
 
-with col4:
-    stock = st.session_state.top_stocks[3]
-    signal_color = "gray"
-    if stock['signal'] == 'BUY':
-        signal_color = "green"
-    elif stock['signal'] == 'SELL':
-        signal_color = "red"
+    # Manual refresh only re-runs this fragment
+    st.button("Refresh Stocks", key="manual_refresh")
 
-    change_color = "green" if stock.get('change_percent', 0) >= 0 else "red"
-    change_symbol = "+" if stock.get('change_percent', 0) >= 0 else ""
-
-    st.markdown(f"<div style='padding:10px; border-radius:5px; background-color:#2D2D2D; border-left:4px solid {signal_color};'>", unsafe_allow_html=True)
-    st.markdown(f"<h3 style='text-align:center; margin:0;'>{stock['ticker']}</h3>", unsafe_allow_html=True)
-    st.markdown(f"<div style='text-align:center; font-size:16px;'>${stock.get('price', 0):.2f} <span style='color:{change_color};'>{change_symbol}{stock.get('change_percent', 0):.2f}%</span></div>", unsafe_allow_html=True)
-    st.markdown(f"<div style='text-align:center; font-size:14px;'>Signal: {stock['signal']}</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-# Add a refresh button for manual refresh
-if st.button("Refresh Stocks", key="manual_refresh"):
-    st.rerun()
+market_movers_bar()
 
 # Sidebar for user inputs
 with st.sidebar:
@@ -388,10 +269,10 @@ if analyze_button:
                 st.error(results["error"])
             else:
                 # Send data via WebSocket if available
-                if 'next_day_prediction' in results and sio.connected:
+                if 'next_day_prediction' in results and live_client.connected:
                     try:
                         next_pred = results['next_day_prediction']
-                        sio.emit('stock_update', {
+                        live_client.emit('stock_update', {
                             'ticker': ticker,
                             'price': next_pred['price'],
                             'signal': next_pred['signal'],
@@ -466,6 +347,9 @@ if analyze_button:
                         """, unsafe_allow_html=True)
                         st.markdown('</div>', unsafe_allow_html=True)
 
+                # Render all charts up front (cached per result, drawn in parallel)
+                charts = get_chart_renderer().render_all(results)
+
                 # Display results in tabs
                 tab1, tab2, tab3, tab4 = st.tabs(["Stock Overview", "Price Prediction", "Technical Analysis", "Trading Signals"])
 
@@ -499,67 +383,18 @@ if analyze_button:
                     # Price history chart
                     st.subheader("Price History")
 
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.plot(results['dates'], results['prices'], label='Price')
-
-                    # Format the chart
-                    ax.set_title(f"{ticker} Price History", fontsize=16)
-                    ax.set_xlabel('Date', fontsize=12)
-                    ax.set_ylabel('Price ($)', fontsize=12)
-                    ax.grid(True, alpha=0.3)
-                    ax.legend()
-
-                    st.pyplot(fig)
+                    st.image(charts['price'], use_container_width=True)
 
                     # Volume chart
                     st.subheader("Trading Volume")
 
-                    fig, ax = plt.subplots(figsize=(10, 4))
-                    # Convert volume to numpy array properly
-                    volume = results['stock_data']['Volume'].values.flatten()
-                    ax.bar(results['dates'], volume, alpha=0.7, color='#2E86C1')
-
-                    # Format the chart
-                    ax.set_title(f"{ticker} Trading Volume", fontsize=16)
-                    ax.set_xlabel('Date', fontsize=12)
-                    ax.set_ylabel('Volume', fontsize=12)
-                    ax.grid(True, alpha=0.3)
-
-                    st.pyplot(fig)
+                    st.image(charts['volume'], use_container_width=True)
 
                 with tab2:
                     st.subheader("ML Price Prediction")
 
                     # Prediction vs Actual Price chart
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.plot(results['dates'], results['prices'], label='Actual Price', color='blue')
-                    ax.plot(results['dates'], results['predictions'], label='Predicted Price', color='red', linestyle='--')
-
-                    # Add the next day prediction point
-                    if 'next_day_prediction' in results:
-                        next_date = pd.to_datetime(results['next_day_prediction']['date'])
-                        next_price = results['next_day_prediction']['price']
-
-                        ax.scatter([next_date], [next_price], color='green', s=100, zorder=5, 
-                                  label='Next Day Prediction')
-
-                        # Add annotation for next day prediction
-                        ax.annotate(f"${next_price:.2f}", 
-                                   (next_date, next_price),
-                                   xytext=(10, 10),
-                                   textcoords='offset points',
-                                   arrowprops=dict(arrowstyle='->', color='green'),
-                                   color='green',
-                                   fontweight='bold')
-
-                    # Format the chart
-                    ax.set_title(f"{ticker} - Actual vs Predicted Prices", fontsize=16)
-                    ax.set_xlabel('Date', fontsize=12)
-                    ax.set_ylabel('Price ($)', fontsize=12)
-                    ax.grid(True, alpha=0.3)
-                    ax.legend()
-
-                    st.pyplot(fig)
+                    st.image(charts['prediction'], use_container_width=True)
 
                     # Next day prediction details
                     if 'next_day_prediction' in results:
@@ -605,96 +440,18 @@ if analyze_button:
                     # EMA Chart
                     st.write("### Exponential Moving Averages (EMA)")
 
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.plot(results['dates'], results['prices'], label='Price', alpha=0.7)
-                    ax.plot(results['dates'], results['ema_20'], label='EMA 20', color='orange')
-                    ax.plot(results['dates'], results['ema_50'], label='EMA 50', color='green')
-
-                    # Format the chart
-                    ax.set_title(f"{ticker} - Price and EMA", fontsize=16)
-                    ax.set_xlabel('Date', fontsize=12)
-                    ax.set_ylabel('Price ($)', fontsize=12)
-                    ax.grid(True, alpha=0.3)
-                    ax.legend()
-
-                    st.pyplot(fig)
+                    st.image(charts['ema'], use_container_width=True)
 
                     # RSI Chart
                     st.write("### Relative Strength Index (RSI)")
 
-                    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [3, 1]})
-
-                    # Price chart
-                    ax1.plot(results['dates'], results['prices'], label='Price')
-                    ax1.set_title(f"{ticker} - Price", fontsize=16)
-                    ax1.grid(True, alpha=0.3)
-                    ax1.legend()
-
-                    # RSI chart
-                    ax2.plot(results['dates'], results['rsi'], label='RSI', color='purple')
-                    ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5)
-                    ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5)
-                    ax2.fill_between(results['dates'], results['rsi'], 70, 
-                                    where=(results['rsi'] >= 70), 
-                                    color='red', alpha=0.3)
-                    ax2.fill_between(results['dates'], results['rsi'], 30, 
-                                    where=(results['rsi'] <= 30), 
-                                    color='green', alpha=0.3)
-                    ax2.set_title('RSI (14)', fontsize=16)
-                    ax2.set_ylim(0, 100)
-                    ax2.grid(True, alpha=0.3)
-
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    st.image(charts['rsi'], use_container_width=True)
 
                 with tab4:
                     st.subheader("Trading Signals")
 
                     # Plot price with buy/sell signals
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.plot(results['dates'], results['prices'], label='Price', alpha=0.7)
-
-                    # Find buy and sell signal indices
-                    buy_signals = [i for i in range(len(results['signals'])) if results['signals'][i] == 1]
-                    sell_signals = [i for i in range(len(results['signals'])) if results['signals'][i] == -1]
-
-                    # Plot buy and sell signals
-                    if buy_signals:
-                        ax.scatter([results['dates'][i] for i in buy_signals],
-                                  [results['prices'][i] for i in buy_signals],
-                                  marker='^', color='green', s=100, label='Buy')
-
-                    if sell_signals:
-                        ax.scatter([results['dates'][i] for i in sell_signals],
-                                  [results['prices'][i] for i in sell_signals],
-                                  marker='v', color='red', s=100, label='Sell')
-
-                    # Plot next day prediction if available
-                    if 'next_day_prediction' in results:
-                        next_date = pd.to_datetime(results['next_day_prediction']['date'])
-                        next_price = results['next_day_prediction']['price']
-                        signal = results['next_day_prediction']['signal']
-
-                        marker = 'o'
-                        color = 'blue'
-                        if signal == 'BUY':
-                            marker = '^'
-                            color = 'green'
-                        elif signal == 'SELL':
-                            marker = 'v'
-                            color = 'red'
-
-                        ax.scatter([next_date], [next_price], marker=marker, color=color, 
-                                  s=150, label=f'Next Day ({signal})', edgecolors='black')
-
-                    # Format the chart
-                    ax.set_title(f"{ticker} - Trading Signals", fontsize=16)
-                    ax.set_xlabel('Date', fontsize=12)
-                    ax.set_ylabel('Price ($)', fontsize=12)
-                    ax.grid(True, alpha=0.3)
-                    ax.legend()
-
-                    st.pyplot(fig)
+                    st.image(charts['signals'], use_container_width=True)
 
                     # Display recent signals - UPDATED
                     st.subheader("Recent Trading Signals")
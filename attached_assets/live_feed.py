@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+import socketio
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server', 'python'))
+import wire_format
+
+# Default server URL
+SOCKET_SERVER_URL = os.environ.get('SOCKET_SERVER_URL', 'http://0.0.0.0:8001')
+
+class LiveTickerClient:
+    """One Socket.IO connection shared by every dashboard session
+
+    A single supervisor thread connects (retrying until the server is up) and
+    then waits on the client, which reconnects by itself after that. Incoming
+    updates are merged into one ticker -> stock snapshot under a lock; every
+    change bumps a version number, so each session keeps its own cursor and
+    asks only for what changed since it last looked.
+    """
+
+    def __init__(self, url=SOCKET_SERVER_URL, retry_delay=5):
+        self.url = url
+        self.retry_delay = retry_delay
+        self.sio = socketio.Client(reconnection=True)
+        self.lock = threading.Lock()
+        self.version = 0
+        self.stocks = {}
+        self.changed_at = {}
+        self.server_time = None
+        self.movers = []
+        self.thread = None
+
+        self.sio.on('connect', lambda: print("Connected to Socket.IO server"))
+        self.sio.on('disconnect', lambda *args: print("Disconnected from Socket.IO server"))
+        self.sio.on('stock_update', self._on_stock_update)
+        self.sio.on('top_stocks_update', self._on_top_stocks_update)
+        self.sio.on('top_movers_update', self._on_top_movers_update)
+
+    @property
+    def connected(self):
+        return self.sio.connected
+
+    def start(self):
+        """Start the connection thread (once)"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='live-ticker-client', daemon=True)
+                self.thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                print("Trying to connect to Socket.IO server...")
+                # Ask for the compact binary format when msgpack is installed
+                auth = {'wire': wire_format.MSGPACK} if wire_format.msgpack is not None else None
+                self.sio.connect(self.url, transports=['websocket'], auth=auth)
+                # Returns only once the client gives up reconnecting
+                self.sio.wait()
+            except Exception as e:
+                print(f"Socket.IO connection error: {str(e)}")
+            time.sleep(self.retry_delay)
+
+    def _on_stock_update(self, data):
+        if isinstance(data, bytes):
+            data = wire_format.decode(data)
+        if isinstance(data, dict) and 'ticker' in data:
+            self._apply([data])
+
+    def _on_top_stocks_update(self, data):
+        if isinstance(data, bytes):
+            data = wire_format.decode(data)
+        if isinstance(data, list) and len(data) > 0:
+            self._apply(data)
+
+    def _on_top_movers_update(self, data):
+        if isinstance(data, bytes):
+            data = wire_format.decode(data)
+        if isinstance(data, list):
+            stocks = [stock for stock in data if isinstance(stock, dict) and 'ticker' in stock]
+            self._apply(stocks, movers=[stock['ticker'] for stock in stocks])
+
+    def _apply(self, stocks, movers=None):
+        with self.lock:
+            self.version += 1
+            if movers is not None:
+                self.movers = movers
+            for stock in stocks:
+                if not isinstance(stock, dict) or 'ticker' not in stock:
+                    continue
+                # Entries are replaced, never mutated, so readers can keep references
+                merged = dict(self.stocks.get(stock['ticker'], {}))
+                merged.update(stock)
+                self.stocks[stock['ticker']] = merged
+                self.changed_at[stock['ticker']] = self.version
+                self.server_time = stock.get('server_time', self.server_time)
+
+    def changes_since(self, cursor):
+        """Return (version, {ticker: stock} changed after `cursor`, latest server time)"""
+        with self.lock:
+            if cursor >= self.version:
+                return self.version, {}, self.server_time
+            changed = {ticker: self.stocks[ticker]
+                       for ticker, version in self.changed_at.items() if version > cursor}
+            return self.version, changed, self.server_time
+
+    def top_movers(self):
+        """Tickers of the server's latest top movers, largest move first"""
+        with self.lock:
+            return list(self.movers)
+
+    def emit(self, event, data):
+        """Send an event if connected; returns whether it was sent"""
+        if not self.sio.connected:
+            return False
+        self.sio.emit(event, data)
+        return True
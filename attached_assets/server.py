@@ -1,10 +1,15 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
-import yfinance as yf
 import asyncio
 import json
+import os
+import sys
 from typing import List
 
+# Market data comes from the same provider as the rest of the stack
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server', 'python'))
+from market_data import get_provider
+
 app = FastAPI()
 clients: List[WebSocket] = []
 
@@ -37,13 +42,12 @@ async def websocket_endpoint(websocket: WebSocket):
 
 async def get_stock_data(symbol: str):
     try:
-        stock = yf.Ticker(symbol)
-        data = stock.history(period="1d", interval="1m").tail(1)
+        quote = get_provider().quotes([symbol])[symbol]
         return {
             "symbol": symbol,
-            "price": round(data["Close"].values[0], 2),
-            "open": round(data["Open"].values[0], 2),
-            "volume": int(data["Volume"].values[0])
+            "price": round(quote["price"], 2),
+            "open": round(quote["open"], 2),
+            "volume": int(quote["volume"])
         }
     except Exception as e:
         return {
@@ -52,6 +52,15 @@ const StockSchema = new mongoose.Schema({
     },
     accuracy: {
       type: Number
+    },
+    // Trading days ahead the prediction was made for, and which model made it
+    horizon: {
+      type: Number,
+      default: 1
+    },
+    model: {
+      type: String,
+      default: 'random_forest'
     }
   }]
 });
@@ -76,11 +85,13 @@ StockSchema.methods.updateStockData = function(data) {
 };
 
 // Method to add prediction
-StockSchema.methods.addPrediction = function(date, predictedPrice, signal) {
+StockSchema.methods.addPrediction = function(date, predictedPrice, signal, horizon = 1, model = 'random_forest') {
   this.predictionHistory.push({
     date,
     predictedPrice,
-    signal
+    signal,
+    horizon,
+    model
   });
   
   // Limit history to most recent 30 entries
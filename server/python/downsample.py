@@ -0,0 +1,57 @@
+import numpy as np
+
+def lttb_indices(y, n_out, x=None):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept; the interior is split into
+    n_out - 2 buckets and from each bucket the point forming the largest
+    triangle with the previously kept point and the next bucket's centroid is
+    chosen. Bucket edges and centroids are computed for all buckets at once;
+    only the choice of the anchor point is carried from bucket to bucket.
+    """
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # n_out - 2 buckets over the interior points [1, n-1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    centroid_x = np.add.reduceat(x[:n - 1], starts) / counts
+    centroid_y = np.add.reduceat(y[:n - 1], starts) / counts
+    # Each bucket looks ahead to the next bucket's centroid; the last one to the final point
+    next_x = np.append(centroid_x[1:], x[-1])
+    next_y = np.append(centroid_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    anchor = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[anchor], y[anchor]
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((ax - next_x[bucket]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[bucket] - ay))
+        anchor = lo + int(np.argmax(area))
+        selected[bucket + 1] = anchor
+    return selected
+
+def downsample_indices(series, max_points, keep=None):
+    """Shared point indices for several series drawn on the same x axis
+
+    Every index in `keep` (e.g. bars with trading signals) is retained
+    exactly; the remaining budget is split evenly between the series and the
+    union of their LTTB selections is returned in order. The result has at
+    most max_points points unless `keep` alone takes up the budget, in which
+    case it has at most len(keep) + 3 * len(series).
+    """
+    n = len(series[0])
+    if n <= max_points:
+        return np.arange(n)
+    keep = np.unique(np.asarray(keep if keep is not None else [], dtype=np.int64))
+
+    budget = max(3, (max_points - len(keep)) // len(series))
+    chosen = [keep] + [lttb_indices(values, budget) for values in series]
+    return np.unique(np.concatenate(chosen))
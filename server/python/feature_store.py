@@ -0,0 +1,293 @@
+import os
+import json
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from indicators import IndicatorSet
+from trading_calendar import get_trading_calendar
+
+DEFAULT_ROOT = os.environ.get(
+    'FEATURE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'features')
+)
+
+# Bars of history recomputed in front of appended rows so recursive
+# indicators (EMA, RSI) have converged before the new values are written
+WARMUP_BARS = 250
+
+FEATURE_DTYPE = np.float32
+
+def _column(data, name):
+    if name not in data:
+        return None
+    return np.asarray(data[name].values, dtype=np.float64).flatten()
+
+def _compute_features(ohlcv):
+    """All stored features for an OHLCV frame, as {name: float32 array}"""
+    close = _column(ohlcv, 'Close')
+    volume = _column(ohlcv, 'Volume')
+    indicators = IndicatorSet(close, _column(ohlcv, 'High'), _column(ohlcv, 'Low'), volume)
+    close_series = pd.Series(close)
+    returns = close_series.pct_change()
+
+    features = {
+        'return_1': returns,
+        'return_5': close_series.pct_change(5),
+        'return_20': close_series.pct_change(20),
+        'volatility_20': returns.rolling(20).std(),
+        'rsi_14': indicators.rsi(14)[0] / 100.0,
+        'ema_20_dist': close / indicators.ema(20)[0] - 1.0,
+        'ema_50_dist': close / indicators.ema(50)[0] - 1.0,
+        'macd_hist': indicators.macd()['macd_hist'][0] / close
+    }
+    if volume is not None:
+        log_volume = np.log1p(volume)
+        features['log_volume'] = log_volume
+        features['volume_ratio_20'] = pd.Series(volume) / pd.Series(volume).rolling(20).mean()
+    if 'High' in ohlcv and 'Low' in ohlcv:
+        features['atr_14_pct'] = indicators.atr(14)[0] / close
+
+    return {name: np.asarray(values, dtype=FEATURE_DTYPE) for name, values in features.items()}
+
+FEATURE_NAMES = ['return_1', 'return_5', 'return_20', 'volatility_20', 'rsi_14', 'ema_20_dist',
+                 'ema_50_dist', 'macd_hist', 'log_volume', 'volume_ratio_20', 'atr_14_pct']
+
+# Named feature sets for training and inference
+FEATURE_SETS = {
+    'returns': ['return_1', 'return_5', 'return_20', 'volatility_20'],
+    'technical': ['return_1', 'rsi_14', 'ema_20_dist', 'ema_50_dist', 'macd_hist', 'volatility_20'],
+    'volume': ['return_1', 'log_volume', 'volume_ratio_20'],
+    'full': FEATURE_NAMES
+}
+
+# Bumped automatically whenever the feature list changes
+FEATURE_VERSION = hashlib.sha1(','.join(FEATURE_NAMES + [str(WARMUP_BARS)]).encode()).hexdigest()[:10]
+
+def resolve_feature_set(feature_set):
+    """Feature names for a set name (or an explicit list of names)"""
+    names = FEATURE_SETS.get(feature_set) if isinstance(feature_set, str) else list(feature_set)
+    if names is None:
+        raise ValueError(f"Unknown feature set '{feature_set}'. Choose from {sorted(FEATURE_SETS)}")
+    unknown = [name for name in names if name not in FEATURE_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown features {unknown}")
+    return names
+
+class FeatureStore:
+    """Versioned per-ticker feature matrices stored column by column on disk
+
+    Each ticker has a directory per feature version holding one raw float32
+    file per feature (plus the dates and the OHLCV it was computed from) and
+    a meta.json with the row count. Reads are memory-mapped, so loading a
+    feature set only touches the selected columns, and new bars are appended
+    to the existing files instead of rewriting them.
+
+    The CLI runs one process per request, so sync() and load() also take an
+    flock on the ticker's lock file (exclusive to write, shared to read)
+    besides the in-process lock.
+    """
+
+    OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, ticker.upper(), FEATURE_VERSION)
+
+    @contextmanager
+    def _file_lock(self, ticker, exclusive):
+        path = os.path.join(self.root, ticker.upper(), '.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self, ticker):
+        try:
+            with open(os.path.join(self._dir(ticker), 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, ticker, meta):
+        path = os.path.join(self._dir(ticker), 'meta.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _dtype(name):
+        # Source OHLCV keeps full precision; dates are stored as epoch seconds
+        if name == 'date':
+            return np.int64
+        if name.startswith('ohlcv_'):
+            return np.float64
+        return FEATURE_DTYPE
+
+    def _column_path(self, ticker, name):
+        return os.path.join(self._dir(ticker), f'{name}.bin')
+
+    def _read_column(self, ticker, name, rows):
+        dtype = self._dtype(name)
+        path = self._column_path(ticker, name)
+        if rows == 0 or not os.path.exists(path):
+            return np.zeros(rows, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    def _read_dates(self, ticker, rows):
+        return pd.DatetimeIndex(np.asarray(self._read_column(ticker, 'date', rows)).astype('datetime64[s]'))
+
+    def _append_columns(self, ticker, columns, rows_before):
+        for name, values in columns.items():
+            dtype = self._dtype(name)
+            path = self._column_path(ticker, name)
+            with open(path, 'ab') as f:
+                # Drop bytes left behind by an interrupted append
+                f.truncate(rows_before * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+    def _read_ohlcv(self, ticker, rows, start=0):
+        """Stored source bars from row `start` on, as an OHLCV frame"""
+        return pd.DataFrame(
+            {col: np.array(self._read_column(ticker, f'ohlcv_{col}', rows)[start:])
+             for col in self.OHLCV_COLUMNS},
+            index=self._read_dates(ticker, rows)[start:]
+        )
+
+    def _write_features(self, ticker, meta, frame, count, rows_before):
+        """Compute features over `frame` and store its last `count` rows after `rows_before`"""
+        features = _compute_features(frame)
+        columns = {name: values[-count:] for name, values in features.items()}
+        for col in self.OHLCV_COLUMNS:
+            columns[f'ohlcv_{col}'] = frame[col].values[-count:]
+        columns['date'] = frame.index.values[-count:].astype('datetime64[s]').astype(np.int64)
+
+        self._append_columns(ticker, columns, rows_before)
+        meta['rows'] = rows_before + count
+        meta['last_date'] = str(np.datetime_as_string(frame.index.values[-1], unit='s'))
+        self._write_meta(ticker, meta)
+        return count
+
+    def _rebuild(self, ticker, meta, frame):
+        # Invalidate the stored rows first so an interrupted rewrite is rebuilt next time
+        meta.update(rows=0, last_date=None)
+        self._write_meta(ticker, meta)
+        return self._write_features(ticker, meta, frame, len(frame), 0)
+
+    @staticmethod
+    def _next_expected(stored_dates):
+        """Start of the bar that should follow the stored ones, or None if unknown
+
+        The next NYSE session for daily bars, else the next intraday bar at
+        the stored bar spacing (the next session's open after a close).
+        """
+        tail = stored_dates[-WARMUP_BARS:]
+        calendar = get_trading_calendar()
+        try:
+            if (tail == tail.normalize()).all():
+                return calendar.next_sessions(tail[-1], 1)[0]
+            steps = np.diff(tail.values).astype('timedelta64[s]').astype(np.int64)
+            steps = steps[steps > 0]
+            if not len(steps):
+                return None
+            return calendar.next_bars(tail[-1], int(steps.min()), 1)[0]
+        except ValueError:
+            return None
+
+    def sync(self, ticker, ohlcv):
+        """Bring the stored features up to date with an OHLCV frame
+
+        Builds the matrix on first use (or after a version change); afterwards
+        only bars newer than the last stored date are computed and appended.
+        A frame reaching back before the first stored bar is merged with them
+        and the matrix is rebuilt. One that starts after the bar expected next
+        (per the trading calendar) or ends before the stored bars replaces
+        them, since features computed across the missing bars would be wrong.
+        Returns the number of rows written.
+        """
+        ohlcv = self._normalize(ohlcv)
+        if ohlcv.empty:
+            return 0
+        with self.lock, self._file_lock(ticker, exclusive=True):
+            meta = self._read_meta(ticker)
+            if meta is None:
+                os.makedirs(self._dir(ticker), exist_ok=True)
+                meta = {'ticker': ticker.upper(), 'version': FEATURE_VERSION, 'rows': 0, 'last_date': None}
+
+            rows = meta['rows']
+            if not rows:
+                return self._rebuild(ticker, meta, ohlcv)
+
+            stored_dates = self._read_dates(ticker, rows)
+            if ohlcv.index[-1] < stored_dates[0]:
+                return self._rebuild(ticker, meta, ohlcv)
+            if ohlcv.index[0] > stored_dates[-1]:
+                expected = self._next_expected(stored_dates)
+                if expected is not None and ohlcv.index[0] > expected:
+                    return self._rebuild(ticker, meta, ohlcv)
+            if ohlcv.index[0] < stored_dates[0]:
+                # Backfill: the frame's bars win where both have a date
+                merged = ohlcv.combine_first(self._read_ohlcv(ticker, rows))[self.OHLCV_COLUMNS]
+                return self._rebuild(ticker, meta, merged)
+
+            new_mask = ohlcv.index.values > stored_dates.values[-1]
+            new_count = int(new_mask.sum())
+            if new_count == 0:
+                return 0
+
+            # Recompute features over a warmup tail of stored bars plus the new bars
+            warmup = min(rows, WARMUP_BARS)
+            frame = pd.concat([self._read_ohlcv(ticker, rows, rows - warmup), ohlcv[new_mask]])
+            return self._write_features(ticker, meta, frame, new_count, rows)
+
+    def _normalize(self, ohlcv):
+        """Flatten yfinance (field, ticker) columns and keep the OHLCV fields"""
+        frame = pd.DataFrame(index=pd.DatetimeIndex(ohlcv.index).tz_localize(None))
+        for col in self.OHLCV_COLUMNS:
+            frame[col] = _column(ohlcv, col) if col in ohlcv else np.nan
+        return frame.sort_index()
+
+    def load(self, ticker, feature_set='full', dates=None):
+        """Return (dates, matrix, names) for a named feature set
+
+        With `dates`, rows are aligned to those dates (missing dates are NaN).
+        """
+        names = resolve_feature_set(feature_set)
+        with self._file_lock(ticker, exclusive=False):
+            meta = self._read_meta(ticker)
+            if meta is None:
+                raise KeyError(f"No stored features for {ticker}")
+
+            rows = meta['rows']
+            stored_dates = self._read_dates(ticker, rows)
+            matrix = np.empty((rows, len(names)), dtype=FEATURE_DTYPE)
+            for j, name in enumerate(names):
+                matrix[:, j] = self._read_column(ticker, name, rows)
+
+        if dates is None:
+            return stored_dates, matrix, names
+
+        dates = pd.DatetimeIndex(dates).tz_localize(None)
+        positions = stored_dates.get_indexer(dates)
+        aligned = np.full((len(dates), len(names)), np.nan, dtype=FEATURE_DTYPE)
+        found = positions >= 0
+        aligned[found] = matrix[positions[found]]
+        return dates, aligned, names
+
+_default_store = None
+
+def get_feature_store():
+    """Process-wide feature store at the default location"""
+    global _default_store
+    if _default_store is None:
+        _default_store = FeatureStore()
+    return _default_store
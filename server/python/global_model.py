@@ -0,0 +1,299 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+import joblib
+import sklearn
+from datetime import datetime, timedelta
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
+from json_stream import write_json
+from market_data import get_provider, interval_seconds
+from trading_calendar import get_trading_calendar, format_dates
+
+DEFAULT_ROOT = os.environ.get(
+    'GLOBAL_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'models')
+)
+
+# Bumped whenever the window normalization changes, so old files aren't loaded
+MODEL_VERSION = 1
+
+# Share of the universe's date range used for training; the rest is the test period
+TRAIN_FRACTION = 0.8
+
+# Pooled rows drawn per tree, so fit time stays bounded as the universe grows
+MAX_SAMPLES = 200000
+
+# Same model as analyze_stock's per-ticker fit, plus leaves large enough
+# for noisy pooled returns and a third of the window per split, which keeps
+# the pooled fit fast
+FOREST_PARAMS = {'n_estimators': 100, 'random_state': 42, 'min_samples_leaf': 20,
+                 'max_features': 1 / 3, 'n_jobs': -1}
+
+def normalized_windows(closes, lookback):
+    """Scale-free return windows of one ticker's closes
+
+    Row j holds the `lookback` log returns up to close j + lookback, divided
+    by their own standard deviation so calm and volatile tickers share one
+    scale; the last row is the latest window. Returns (windows, scales,
+    targets), targets being the next log return of every row but the last
+    in the same units.
+    """
+    returns = np.diff(np.log(np.asarray(closes, dtype=np.float64)))
+    windows = np.lib.stride_tricks.sliding_window_view(returns, lookback)
+    scales = windows.std(axis=1)
+    scales[~(scales > 0)] = 1.0
+    targets = returns[lookback:] / scales[:-1]
+    return (windows / scales[:, None]).astype(np.float32), scales, targets
+
+def price_metrics(predicted, actual, previous):
+    """Accuracy of next-bar price predictions, as analyze_stock reports it, plus direction"""
+    errors = predicted - actual
+    moves = np.sign(predicted - previous)
+    return {
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'mae': float(np.mean(np.abs(errors))),
+        'mape': float(np.mean(np.abs(errors / actual)) * 100),
+        'r2': float(r2_score(actual, predicted)) if len(actual) > 1 else None,
+        # Undefined for a model that never predicts a move (the naive one)
+        'direction_accuracy': float(np.mean(moves == np.sign(actual - previous))) if moves.any() else None
+    }
+
+def mean_metrics(per_ticker):
+    """Average each metric over the tickers"""
+    if not per_ticker:
+        return {}
+    means = {}
+    for name in per_ticker[0]:
+        values = [m[name] for m in per_ticker if m[name] is not None]
+        means[name] = float(np.mean(values)) if values else None
+    return means
+
+class GlobalModel:
+    """One forest over the pooled, normalized return windows of a universe
+
+    Instead of a forest per ticker on raw prices, every ticker's windows go
+    into one training matrix; a screen then scores the latest window of
+    every ticker with a single batched predict.
+    """
+
+    def __init__(self, lookback=60, interval='1d'):
+        self.lookback = lookback
+        self.interval = interval
+        self.model = None
+        self.trained_at = None
+        self.split_date = None
+        self.tickers = []
+        self.evaluation = None
+
+    def fit(self, history, split_date=None, baseline=True):
+        """Train on every window whose target is before split_date and evaluate on the rest
+
+        history maps ticker -> OHLCV frame. split_date defaults to the
+        TRAIN_FRACTION point of the universe's dates. With baseline=True the
+        test period is also predicted by analyze_stock's per-ticker model
+        (a forest on raw price windows, one fit per ticker) for comparison.
+        """
+        series = {ticker: frame['Close'].dropna() for ticker, frame in history.items()
+                  if len(frame) > self.lookback + 2}
+        if not series:
+            raise ValueError(f"No ticker has more than {self.lookback + 2} bars")
+        if split_date is None:
+            dates = np.unique(np.concatenate([closes.index.values for closes in series.values()]))
+            split_date = dates[int(len(dates) * TRAIN_FRACTION)]
+        split_date = pd.Timestamp(split_date)
+
+        # Pool the windows; target of row j is close j + lookback + 1
+        train_X, train_y, tests = [], [], {}
+        for ticker, closes in series.items():
+            windows, scales, targets = normalized_windows(closes.values, self.lookback)
+            target_dates = closes.index[self.lookback + 1:]
+            train = target_dates < split_date
+            train_X.append(windows[:-1][train])
+            train_y.append(targets[train])
+            if (~train).any():
+                tests[ticker] = (windows[:-1][~train], scales[:-1][~train], np.flatnonzero(~train))
+        X = np.concatenate(train_X)
+        y = np.concatenate(train_y)
+
+        start = time.perf_counter()
+        self.model = RandomForestRegressor(max_samples=min(MAX_SAMPLES, len(X)), **FOREST_PARAMS)
+        self.model.fit(X, y)
+        global_seconds = time.perf_counter() - start
+        self.trained_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.split_date = split_date
+        self.tickers = sorted(series)
+
+        # Test windows of every ticker in one predict, then split back per ticker
+        test_tickers = list(tests)
+        predicted = self.model.predict(np.concatenate([tests[t][0] for t in test_tickers])) if tests else []
+        bounds = np.cumsum([0] + [len(tests[t][0]) for t in test_tickers])
+        global_metrics, naive_metrics, baseline_metrics = [], [], []
+        baseline_seconds = 0.0
+        for i, ticker in enumerate(test_tickers):
+            _, scales, rows = tests[ticker]
+            closes = series[ticker].values.astype(np.float64)
+            previous = closes[self.lookback + rows]
+            actual = closes[self.lookback + 1 + rows]
+            returns = predicted[bounds[i]:bounds[i + 1]] * scales
+            global_metrics.append(price_metrics(previous * np.exp(returns), actual, previous))
+            naive_metrics.append(price_metrics(previous, actual, previous))
+            if baseline:
+                start = time.perf_counter()
+                baseline_metrics.append(price_metrics(
+                    self._baseline_predictions(closes, rows), actual, previous))
+                baseline_seconds += time.perf_counter() - start
+
+        global_mean = mean_metrics(global_metrics)
+        self.evaluation = {
+            'tickers': len(series),
+            'train_rows': int(len(X)),
+            'test_rows': int(bounds[-1]),
+            'split_date': format_dates([split_date])[0],
+            'fit_seconds': {'global': round(global_seconds, 2)},
+            'models': {'global': global_mean, 'naive': mean_metrics(naive_metrics)}
+        }
+        if baseline:
+            baseline_mean = mean_metrics(baseline_metrics)
+            self.evaluation['fit_seconds']['per_ticker'] = round(baseline_seconds, 2)
+            self.evaluation['models']['per_ticker'] = baseline_mean
+            # Tickers whose test MAPE the global model beats
+            self.evaluation['global_better_mape'] = int(sum(
+                g['mape'] < b['mape'] for g, b in zip(global_metrics, baseline_metrics)))
+        return self
+
+    def _baseline_predictions(self, closes, rows):
+        """analyze_stock's model on one ticker: a forest on raw price windows fitted before the test rows"""
+        price_windows = np.lib.stride_tricks.sliding_window_view(closes, self.lookback)
+        # Window k ends at close k + lookback - 1 and predicts close k + lookback
+        first_test = rows[0] + 1
+        model = RandomForestRegressor(n_estimators=100, random_state=42)
+        model.fit(price_windows[:first_test].astype(np.float32), closes[self.lookback:self.lookback + first_test])
+        return model.predict(price_windows[rows + 1].astype(np.float32))
+
+    def predict_next(self, history):
+        """Next-bar prediction for every ticker, from one batched predict over their latest windows"""
+        series = {ticker: frame['Close'].dropna() for ticker, frame in history.items()
+                  if len(frame) > self.lookback}
+        if not series:
+            return []
+        tickers = list(series)
+        latest = [normalized_windows(series[t].values[-(self.lookback + 1):], self.lookback) for t in tickers]
+        X = np.vstack([windows[-1:] for windows, _, _ in latest])
+        returns = self.model.predict(X) * np.array([scales[-1] for _, scales, _ in latest])
+
+        calendar = get_trading_calendar()
+        seconds = interval_seconds(self.interval)
+        unit = 'D' if self.interval == '1d' else 'm'
+        predictions = []
+        for ticker, predicted_return in zip(tickers, returns):
+            last_date = series[ticker].index[-1]
+            if self.interval == '1d':
+                next_date = calendar.next_sessions(last_date, 1)
+            else:
+                next_date = calendar.next_bars(last_date, seconds, 1)
+            last_price = float(series[ticker].values[-1])
+            predicted_price = last_price * float(np.exp(predicted_return))
+            predictions.append({
+                'ticker': ticker,
+                'date': format_dates(next_date, unit)[0],
+                'price': round(last_price, 2),
+                'predicted_price': round(predicted_price, 2),
+                'change_percent': round((predicted_price / last_price - 1) * 100, 2)
+            })
+        predictions.sort(key=lambda p: p['change_percent'], reverse=True)
+        return predictions
+
+    def info(self):
+        return {
+            'version': MODEL_VERSION,
+            'interval': self.interval,
+            'lookback': self.lookback,
+            'trained_at': self.trained_at,
+            'tickers': len(self.tickers),
+            'evaluation': self.evaluation
+        }
+
+    # Saved as plain state, so a model trained from the CLI loads in the server
+    STATE = ['lookback', 'interval', 'trained_at', 'split_date', 'tickers', 'evaluation']
+
+    def save(self, path=None):
+        path = path or model_path(self.interval, self.lookback)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        joblib.dump({'version': MODEL_VERSION, 'sklearn': sklearn.__version__, 'forest': self.model,
+                     'state': {name: getattr(self, name) for name in self.STATE}}, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """The saved model, or None if it is missing or from another version"""
+        try:
+            saved = joblib.load(path)
+        except FileNotFoundError:
+            return None
+        if saved.get('version') != MODEL_VERSION or saved.get('sklearn') != sklearn.__version__:
+            return None
+        model = cls()
+        for name, value in saved['state'].items():
+            setattr(model, name, value)
+        model.model = saved['forest']
+        return model
+
+def model_path(interval='1d', lookback=60, root=DEFAULT_ROOT):
+    return os.path.join(root, f'global_{interval}_{lookback}.joblib')
+
+def history_days(interval, bars):
+    """Calendar days of history that hold at least `bars` bars"""
+    if interval == '1d':
+        return int(bars * 1.5) + 10
+    # 6.5 trading hours a session, five sessions a week
+    return int(bars * interval_seconds(interval) / 23400 * 1.5) + 5
+
+def train(tickers, start_date, end_date, lookback=60, interval='1d', baseline=True):
+    """Fit and persist the global model on a universe; returns its evaluation"""
+    history = get_provider().history(tickers, start=start_date, end=end_date, interval=interval)
+    model = GlobalModel(lookback, interval).fit(history, baseline=baseline)
+    path = model.save()
+    return dict(model.info(), path=path)
+
+def score(tickers, lookback=60, interval='1d'):
+    """Score the latest window of every ticker with the persisted global model"""
+    model = GlobalModel.load(model_path(interval, lookback))
+    if model is None:
+        return {"error": f"No global model for {interval} bars with lookback {lookback}; train one first"}
+    end = datetime.now() + timedelta(days=1)
+    start = end - timedelta(days=history_days(interval, lookback + 1))
+    history = get_provider().history(tickers, start=start, end=end, interval=interval)
+    return {'model': model.info(), 'predictions': model.predict_next(history)}
+
+if __name__ == "__main__":
+    # Usage: global_model.py train TICKERS START END [--lookback=N] [--interval=1d] [--no-baseline]
+    #        global_model.py score TICKERS [--lookback=N] [--interval=1d]
+    # TICKERS is comma-separated
+    lookback = 60
+    interval = '1d'
+    for arg in sys.argv:
+        if arg.startswith('--lookback='):
+            lookback = int(arg.split('=', 1)[1])
+        elif arg.startswith('--interval='):
+            interval = arg.split('=', 1)[1]
+    args = [arg for arg in sys.argv if not arg.startswith('--')]
+    if len(args) < 3 or args[1] not in ('train', 'score'):
+        print(json.dumps({"error": "Usage: global_model.py train|score TICKERS [START END]"}))
+        sys.exit(1)
+
+    tickers = [t.strip().upper() for t in args[2].split(',') if t.strip()]
+    try:
+        if args[1] == 'train':
+            result = train(tickers, args[3], args[4], lookback, interval, baseline='--no-baseline' not in sys.argv)
+        else:
+            result = score(tickers, lookback, interval)
+    except Exception as e:
+        result = {"error": f"Error running global model: {str(e)}"}
+    write_json(result, sys.stdout)
+    sys.stdout.write('\n')
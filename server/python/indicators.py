@@ -0,0 +1,268 @@
+import re
+import numpy as np
+from scipy.signal import lfilter
+
+# Default parameters for indicators requested without an explicit period
+DEFAULT_PERIODS = {
+    'ema': 20,
+    'rsi': 14,
+    'atr': 14,
+    'bollinger': 20
+}
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WIDTH = 2.0
+
+INDICATOR_NAMES = ['ema', 'rsi', 'macd', 'bollinger', 'atr', 'vwap', 'obv']
+
+def _as_2d(values):
+    """View input as (tickers, bars) float64; 1-D input becomes a single row"""
+    arr = np.asarray(values, dtype=np.float64)
+    return np.atleast_2d(arr)
+
+def _smooth(values, alpha, initial):
+    """Exponential smoothing y[t] = alpha*x[t] + (1-alpha)*y[t-1] along the last axis
+
+    Runs as a single IIR filter (scipy lfilter) over every row at once, with
+    y[0] = alpha*x[0] + (1-alpha)*initial.
+    """
+    zi = ((1 - alpha) * initial)[:, None]
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], values, axis=-1, zi=zi)
+    return smoothed
+
+def parse_indicator(spec):
+    """Split an indicator spec like 'ema_50' or 'rsi' into (name, period)"""
+    match = re.fullmatch(r'([a-z]+)(?:_(\d+))?', spec)
+    if not match or match.group(1) not in INDICATOR_NAMES:
+        raise ValueError(f"Unknown indicator '{spec}'. Choose from {INDICATOR_NAMES}")
+    name, period = match.group(1), match.group(2)
+    return name, int(period) if period else DEFAULT_PERIODS.get(name)
+
+class IndicatorSet:
+    """Computes several indicators over the same OHLCV arrays
+
+    Intermediates (price deltas, EMAs by period, true range, cumulative sums)
+    are computed once and shared, so requesting MACD together with EMA-12,
+    or Bollinger Bands together with VWAP, doesn't rescan the series.
+    Inputs may be 1-D (one ticker) or 2-D (tickers x bars).
+    """
+
+    def __init__(self, close, high=None, low=None, volume=None):
+        self.one_dim = np.ndim(close) == 1
+        self.close = _as_2d(close)
+        self.high = _as_2d(high) if high is not None else None
+        self.low = _as_2d(low) if low is not None else None
+        self.volume = _as_2d(volume) if volume is not None else None
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _require(self, *fields):
+        for field in fields:
+            if getattr(self, field) is None:
+                raise ValueError(f"'{field}' data is required for this indicator")
+
+    # Shared intermediates
+
+    def deltas(self):
+        return self._cached('deltas', lambda: np.diff(self.close, axis=-1))
+
+    def ema(self, period):
+        alpha = 2.0 / (period + 1)
+        # Seeded with the first value, matching pandas ewm(adjust=False)
+        return self._cached(('ema', period),
+                            lambda: _smooth(self.close, alpha, self.close[:, 0]))
+
+    def true_range(self):
+        def compute():
+            self._require('high', 'low')
+            prev_close = self.close[:, :-1]
+            tr = self.high - self.low
+            tr[:, 1:] = np.maximum.reduce([
+                tr[:, 1:],
+                np.abs(self.high[:, 1:] - prev_close),
+                np.abs(self.low[:, 1:] - prev_close)
+            ])
+            return tr
+        return self._cached('true_range', compute)
+
+    def rolling_moments(self, window):
+        """Rolling mean and population std from one pair of cumulative sums"""
+        def compute():
+            # Shift by the first value so the running sums don't lose precision
+            shifted = self.close - self.close[:, :1]
+            csum = np.cumsum(shifted, axis=-1)
+            csum_sq = np.cumsum(shifted * shifted, axis=-1)
+            total = csum[:, window - 1:].copy()
+            total_sq = csum_sq[:, window - 1:].copy()
+            total[:, 1:] -= csum[:, :-window]
+            total_sq[:, 1:] -= csum_sq[:, :-window]
+
+            mean = np.full(self.close.shape, np.nan)
+            std = np.full(self.close.shape, np.nan)
+            mean[:, window - 1:] = total / window
+            variance = np.maximum(total_sq / window - mean[:, window - 1:] ** 2, 0.0)
+            std[:, window - 1:] = np.sqrt(variance)
+            mean += self.close[:, :1]
+            return mean, std
+        return self._cached(('moments', window), compute)
+
+    # Indicators
+
+    def rsi_averages(self, period):
+        """Seed and Wilder-smoothed average gain/loss behind rsi()
+
+        Returns (up, down, up_avg, down_avg); the smoothed averages cover
+        bars period onwards and are None when there aren't enough bars.
+        """
+        def compute():
+            deltas = self.deltas()
+            seed = deltas[:, :period + 1]
+            up = np.where(seed >= 0, seed, 0.0).sum(axis=-1) / period
+            down = -np.where(seed < 0, seed, 0.0).sum(axis=-1) / period
+            if self.close.shape[1] <= period:
+                return up, down, None, None
+            moves = deltas[:, period - 1:]
+            alpha = 1.0 / period
+            up_avg = _smooth(np.maximum(moves, 0.0), alpha, up)
+            down_avg = _smooth(np.maximum(-moves, 0.0), alpha, down)
+            return up, down, up_avg, down_avg
+        return self._cached(('rsi_averages', period), compute)
+
+    def rsi_state(self, period):
+        """Latest (average gain, average loss) per row, to continue RSI bar by bar"""
+        up, down, up_avg, down_avg = self.rsi_averages(period)
+        if up_avg is None:
+            return up, down
+        return up_avg[:, -1], down_avg[:, -1]
+
+    def rsi(self, period):
+        """Wilder RSI with the same seeding as stockAnalysis.calculate_rsi"""
+        def compute():
+            up, down, up_avg, down_avg = self.rsi_averages(period)
+            rsi = np.empty(self.close.shape)
+            rsi[:, :period] = self.rsi_from(up[:, None], down[:, None])
+            if up_avg is not None:
+                rsi[:, period:] = self.rsi_from(up_avg, down_avg)
+            return rsi
+        return self._cached(('rsi', period), compute)
+
+    @staticmethod
+    def rsi_from(up, down):
+        # A zero average loss maps to rs = 100, as in calculate_rsi
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.where(down == 0, 100.0, up / np.where(down == 0, 1.0, down))
+        return 100. - 100. / (1. + rs)
+
+    def macd(self, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        line = self.ema(fast) - self.ema(slow)
+        signal_line = _smooth(line, 2.0 / (signal + 1), line[:, 0])
+        return {'macd': line, 'macd_signal': signal_line, 'macd_hist': line - signal_line}
+
+    def bollinger(self, window, width=BOLLINGER_WIDTH):
+        mean, std = self.rolling_moments(window)
+        return {'bb_middle': mean, 'bb_upper': mean + width * std, 'bb_lower': mean - width * std}
+
+    def atr(self, period):
+        tr = self.true_range()
+        return _smooth(tr, 1.0 / period, tr[:, 0])
+
+    def vwap(self):
+        """Volume-weighted average price anchored at the first bar"""
+        self._require('volume')
+        if self.high is not None and self.low is not None:
+            typical = (self.high + self.low + self.close) / 3.0
+        else:
+            typical = self.close
+        cum_volume = np.cumsum(self.volume, axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.cumsum(typical * self.volume, axis=-1) / cum_volume
+        return np.where(cum_volume > 0, vwap, typical)
+
+    def obv(self):
+        self._require('volume')
+        obv = np.zeros(self.close.shape)
+        obv[:, 1:] = np.cumsum(np.sign(self.deltas()) * self.volume[:, 1:], axis=-1)
+        return obv
+
+    def compute(self, specs):
+        """Compute every indicator in `specs`, returning {output name: array}"""
+        results = {}
+        for spec in specs:
+            name, period = parse_indicator(spec)
+            if name == 'ema':
+                results[f'ema_{period}'] = self.ema(period)
+            elif name == 'rsi':
+                results[f'rsi_{period}'] = self.rsi(period)
+            elif name == 'atr':
+                results[f'atr_{period}'] = self.atr(period)
+            elif name == 'macd':
+                results.update(self.macd())
+            elif name == 'bollinger':
+                results.update(self.bollinger(period))
+            elif name == 'vwap':
+                results['vwap'] = self.vwap()
+            elif name == 'obv':
+                results['obv'] = self.obv()
+
+        if self.one_dim:
+            results = {key: value[0] for key, value in results.items()}
+        return results
+
+def compute_indicators(close, high=None, low=None, volume=None, indicators=('ema_20', 'rsi_14')):
+    """Compute a set of indicators over 1-D or 2-D (tickers x bars) OHLCV arrays"""
+    return IndicatorSet(close, high, low, volume).compute(indicators)
+
+def ema(prices, period):
+    """Exponential moving average of a 1-D or 2-D price array"""
+    result = IndicatorSet(prices).ema(period)
+    return result[0] if np.ndim(prices) == 1 else result
+
+if __name__ == "__main__":
+    # Benchmark the fused computation against the equivalent pandas calls
+    import sys
+    import time
+    import pandas as pd
+
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    high = close * (1 + rng.uniform(0, 0.01, n_bars))
+    low = close * (1 - rng.uniform(0, 0.01, n_bars))
+    volume = rng.integers(1e5, 1e6, n_bars).astype(np.float64)
+    specs = ['ema_20', 'ema_50', 'macd', 'bollinger', 'atr', 'vwap', 'obv']
+
+    start = time.perf_counter()
+    fused = compute_indicators(close, high, low, volume, specs)
+    fused_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    c, h, l, v = pd.Series(close), pd.Series(high), pd.Series(low), pd.Series(volume)
+    ref = {
+        'ema_20': c.ewm(span=20, adjust=False).mean(),
+        'ema_50': c.ewm(span=50, adjust=False).mean()
+    }
+    ref['macd'] = c.ewm(span=12, adjust=False).mean() - c.ewm(span=26, adjust=False).mean()
+    ref['macd_signal'] = ref['macd'].ewm(span=9, adjust=False).mean()
+    ref['bb_middle'] = c.rolling(20).mean()
+    ref['bb_upper'] = ref['bb_middle'] + 2 * c.rolling(20).std(ddof=0)
+    prev = c.shift(1)
+    tr = pd.concat([h - l, (h - prev).abs(), (l - prev).abs()], axis=1).max(axis=1)
+    ref['atr_14'] = tr.ewm(alpha=1 / 14, adjust=False).mean()
+    typical = (h + l + c) / 3
+    ref['vwap'] = (typical * v).cumsum() / v.cumsum()
+    ref['obv'] = (np.sign(c.diff()).fillna(0) * v).cumsum()
+    pandas_time = time.perf_counter() - start
+
+    worst = max(float(np.nanmax(np.abs(fused[key] - ref[key].values) / np.abs(ref[key].values).clip(1e-9)))
+                for key in ref)
+    print(f"{n_bars} bars: fused {fused_time * 1000:.1f} ms, pandas {pandas_time * 1000:.1f} ms, "
+          f"max relative difference {worst:.2e}")
+
+    tickers = 500
+    panel = np.tile(close[:2000], (tickers, 1))
+    start = time.perf_counter()
+    compute_indicators(panel, panel * 1.01, panel * 0.99, np.ones_like(panel), specs)
+    print(f"{tickers} tickers x 2000 bars (2-D): fused {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,101 @@
+import json
+import math
+import numpy as np
+import pandas as pd
+
+# Elements formatted per write; bounds the temporary strings held at once
+CHUNK_SIZE = 8192
+
+MINUTES_PER_DAY = 1440
+
+def _date_unit(values, chunk_size):
+    """'D' if every datetime64 value falls on midnight, else 'm'
+
+    Matches trading_calendar.format_dates: daily bars as YYYY-MM-DD and
+    intraday bars as YYYY-MM-DDTHH:MM. Checked chunk by chunk so the scan
+    holds no more temporaries than the encoding itself.
+    """
+    for start in range(0, len(values), chunk_size):
+        minutes = values[start:start + chunk_size].astype('datetime64[m]').view(np.int64)
+        if (minutes % MINUTES_PER_DAY).any():
+            return 'm'
+    return 'D'
+
+def _encode_array(values, chunk_size):
+    """Yield a 1-D NumPy array as a JSON array, one chunk at a time"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        unit = _date_unit(values, chunk_size)
+    yield '['
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        if start:
+            yield ','
+        if np.issubdtype(chunk.dtype, np.datetime64):
+            yield '"' + '","'.join(np.datetime_as_string(chunk, unit=unit).tolist()) + '"'
+            continue
+        if np.issubdtype(chunk.dtype, np.floating):
+            # astype(str) gives the shortest round-trip repr for the array's own
+            # precision, so float32 values don't expand to 17 digits
+            text = chunk.astype(str)
+            if not np.isfinite(chunk).all():
+                text = np.where(np.isfinite(chunk), text, 'null')
+        elif np.issubdtype(chunk.dtype, np.integer) or chunk.dtype == np.bool_:
+            text = chunk.astype(np.int64).astype(str)
+        else:
+            yield ','.join(json.dumps(_plain(v)) for v in chunk)
+            continue
+        yield ','.join(text.tolist())
+    yield ']'
+
+def _plain(value):
+    """Convert a scalar to something json.dumps accepts (NaN becomes null)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        value = pd.Timestamp(value)
+        return value.strftime('%Y-%m-%d' if value == value.normalize() else '%Y-%m-%dT%H:%M')
+    return value
+
+def iter_json(obj, chunk_size=CHUNK_SIZE):
+    """Yield the JSON text of `obj` piece by piece
+
+    NumPy arrays, pandas Series and DatetimeIndexes are encoded straight from
+    their buffers in bounded chunks instead of being turned into lists first.
+    """
+    if isinstance(obj, dict):
+        yield '{'
+        first = True
+        for key, value in obj.items():
+            if not first:
+                yield ','
+            first = False
+            yield json.dumps(str(key))
+            yield ':'
+            yield from iter_json(value, chunk_size)
+        yield '}'
+    elif isinstance(obj, pd.DatetimeIndex):
+        # tz_localize copies the index, so only pay for it on tz-aware ones
+        values = obj.tz_localize(None).values if obj.tz is not None else obj.values
+        yield from _encode_array(values, chunk_size)
+    elif isinstance(obj, pd.Series):
+        yield from _encode_array(obj.to_numpy(), chunk_size)
+    elif isinstance(obj, np.ndarray):
+        yield from _encode_array(obj.ravel(), chunk_size)
+    elif isinstance(obj, (list, tuple)):
+        yield '['
+        for i, value in enumerate(obj):
+            if i:
+                yield ','
+            yield from iter_json(value, chunk_size)
+        yield ']'
+    else:
+        yield json.dumps(_plain(obj))
+
+def write_json(obj, stream, chunk_size=CHUNK_SIZE):
+    """Write `obj` as JSON to a file-like object without building the whole string"""
+    for piece in iter_json(obj, chunk_size):
+        stream.write(piece)
+    stream.flush()
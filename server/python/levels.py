@@ -0,0 +1,314 @@
+import threading
+import numpy as np
+import pandas as pd
+from scipy.signal import argrelextrema
+from trading_calendar import format_dates
+
+# Bars on each side a swing high (low) must be strictly above (below)
+DEFAULT_ORDER = 5
+# Width of a level as a fraction of its lowest pivot;
+# None uses each series' median bar range, so 5m bars cluster tighter than daily
+DEFAULT_TOLERANCE = None
+MIN_TOLERANCE = 0.001
+# Pivots a level needs before it is reported
+DEFAULT_MIN_TOUCHES = 2
+# Pivots kept per cached series (oldest dropped first)
+DEFAULT_MAX_PIVOTS = 2000
+
+def _as_2d(values):
+    return np.atleast_2d(np.asarray(values, dtype=np.float64))
+
+def _epoch_seconds(times):
+    return np.asarray(pd.DatetimeIndex(times).tz_localize(None).values.astype('datetime64[s]').astype(np.int64))
+
+def bar_tolerance(high, low=None):
+    """Per row, the median bar range as a fraction of price (close-to-close moves without low)"""
+    high = _as_2d(high)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if low is None:
+            moves = np.abs(np.diff(np.log(high), axis=1))
+        else:
+            low = _as_2d(low)
+            moves = (high - low) / low
+    if moves.shape[1] == 0:
+        return np.full(high.shape[0], MIN_TOLERANCE)
+    moves[~np.isfinite(moves)] = np.nan
+    with np.errstate(invalid='ignore'):
+        tolerance = np.nanmedian(moves, axis=1) if np.isfinite(moves).any() else np.full(high.shape[0], np.nan)
+    return np.maximum(np.nan_to_num(tolerance, nan=MIN_TOLERANCE), MIN_TOLERANCE)
+
+def find_pivots(high, low=None, order=DEFAULT_ORDER):
+    """Swing highs and lows of a (tickers x bars) array, in one pass per side
+
+    Returns (rows, cols, prices, is_high). Bars closer than `order` to either
+    end are never pivots, as their window isn't complete; NaN bars never are.
+    Without `low`, both sides are found on `high` (e.g. closes).
+    """
+    high = _as_2d(high)
+    low = high if low is None else _as_2d(low)
+    n_bars = high.shape[1]
+    if n_bars <= 2 * order:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, np.zeros(0), np.zeros(0, dtype=bool)
+
+    rows_high, cols_high = argrelextrema(high, np.greater, axis=1, order=order)
+    rows_low, cols_low = argrelextrema(low, np.less, axis=1, order=order)
+    rows = np.concatenate([rows_high, rows_low])
+    cols = np.concatenate([cols_high, cols_low])
+    prices = np.concatenate([high[rows_high, cols_high], low[rows_low, cols_low]])
+    is_high = np.concatenate([np.ones(len(rows_high), dtype=bool), np.zeros(len(rows_low), dtype=bool)])
+    keep = (cols >= order) & (cols < n_bars - order)
+    return rows[keep], cols[keep], prices[keep], is_high[keep]
+
+def cluster_levels(rows, prices, times, tolerance=DEFAULT_TOLERANCE, min_touches=DEFAULT_MIN_TOUCHES):
+    """Group pivots into price levels, every ticker at once
+
+    Within each ticker, pivots are taken in price order and a level takes
+    every pivot within `tolerance` (a fraction; a scalar or one value per
+    row) above its lowest one, so dense pivots can't chain into one wide
+    band. Each step places the next level of every ticker with a single
+    searchsorted over (ticker, log price) keys, so the loop runs once per
+    level, not per pivot. Returns (rows, price, touches, first, last) arrays
+    per level, price being the mean of its pivots and first/last their
+    earliest and latest times.
+    """
+    if len(rows) == 0:
+        empty = np.zeros(0)
+        return np.zeros(0, dtype=np.intp), empty, np.zeros(0, dtype=np.intp), empty, empty
+    order = np.lexsort((prices, rows))
+    rows, prices, times = rows[order], prices[order], times[order]
+    width = np.log1p(np.asarray(tolerance)[rows] if np.ndim(tolerance) else np.full(len(rows), tolerance))
+    # Rows are 64 apart, more than any spread of log prices, so keys sort by (row, price)
+    keys = rows * 64.0 + np.log(np.maximum(prices, 1e-12)) + 32.0
+
+    starts = np.zeros(len(rows), dtype=bool)
+    current = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    while len(current):
+        starts[current] = True
+        following = np.searchsorted(keys, keys[current] + width[current], side='right')
+        inside = following < len(rows)
+        inside[inside] = rows[following[inside]] == rows[current[inside]]
+        current = following[inside]
+
+    cluster = np.cumsum(starts) - 1
+    touches = np.bincount(cluster)
+    level_prices = np.bincount(cluster, weights=prices) / touches
+    bounds = np.flatnonzero(starts)
+    first = np.minimum.reduceat(times, bounds)
+    last = np.maximum.reduceat(times, bounds)
+    keep = touches >= min_touches
+    return rows[bounds][keep], level_prices[keep], touches[keep], first[keep], last[keep]
+
+def level_records(prices, touches, first, last, reference):
+    """Levels as dicts, strongest first; at or below `reference` they are support
+
+    first/last are the formatted times of each level's earliest and latest pivot.
+    """
+    order = np.lexsort((-prices, -touches))
+    return [{
+        'price': round(float(prices[i]), 2),
+        'touches': int(touches[i]),
+        'type': 'support' if prices[i] <= reference else 'resistance',
+        'first_seen': first[i],
+        'last_seen': last[i]
+    } for i in order]
+
+def nearest_levels(prices, reference):
+    """(closest level at or below reference, closest above); None where there is none"""
+    below = prices[prices <= reference]
+    above = prices[prices > reference]
+    return (float(below.max()) if len(below) else None,
+            float(above.min()) if len(above) else None)
+
+class LevelCache:
+    """Pivots per series key, extended as new bars arrive
+
+    A pivot is final once `order` bars follow it, so each key remembers the
+    time of its last final bar; extend() only scans from `order` bars before
+    the earliest of those across the keys it is given, runs one 2-D
+    argrelextrema over that slice and appends the pivots that are new for
+    each key. Clustering runs over the stored pivots, which is cheap next to
+    rescanning the bars. A key whose bars now start before anything cached
+    is rebuilt from scratch.
+    """
+
+    def __init__(self, order=DEFAULT_ORDER, tolerance=DEFAULT_TOLERANCE,
+                 min_touches=DEFAULT_MIN_TOUCHES, max_pivots=DEFAULT_MAX_PIVOTS):
+        self.order = order
+        self.tolerance = tolerance
+        self.min_touches = min_touches
+        self.max_pivots = max_pivots
+        self.pivots = {}        # key -> (times, prices, is_high)
+        self.confirmed = {}     # key -> time of the last bar whose pivots are final
+        self.first = {}         # key -> earliest time the pivots cover
+        self.tolerances = {}    # key -> clustering tolerance, when adaptive
+        self.lock = threading.Lock()
+
+    def extend(self, keys, times, high, low=None):
+        """Add bars on a shared time axis: high/low are (keys x bars), times ascending"""
+        times = _epoch_seconds(times)
+        high = _as_2d(high)
+        n_bars = len(times)
+        if n_bars <= 2 * self.order:
+            return
+        with self.lock:
+            for key in keys:
+                if key in self.first and times[0] < self.first[key]:
+                    self._drop(key)
+            if self.tolerance is None:
+                # Measured once, from the first bars a key is given
+                fresh = [j for j, key in enumerate(keys) if key not in self.tolerances]
+                if fresh:
+                    measured = bar_tolerance(high[fresh], None if low is None else _as_2d(low)[fresh])
+                    self.tolerances.update(zip([keys[j] for j in fresh], measured))
+            low = high if low is None else _as_2d(low)
+            none = np.iinfo(np.int64).min
+            confirmed = np.array([self.confirmed.get(key, none) for key in keys], dtype=np.int64)
+            unseen = np.searchsorted(times, confirmed, side='right')
+            lo = max(0, int(unseen.min()) - self.order)
+            if n_bars - lo <= 2 * self.order:
+                return
+
+            rows, cols, prices, is_high = find_pivots(high[:, lo:], low[:, lo:], self.order)
+            cols = cols + lo
+            new = times[cols] > confirmed[rows]
+            rows, cols, prices, is_high = rows[new], cols[new], prices[new], is_high[new]
+            by_row = np.argsort(rows, kind='stable')
+            bounds = np.searchsorted(rows[by_row], np.arange(len(keys) + 1))
+            final = times[n_bars - 1 - self.order]
+
+            for j, key in enumerate(keys):
+                if bounds[j] == bounds[j + 1] and key in self.pivots:
+                    self.confirmed[key] = max(self.confirmed[key], int(final))
+                    continue
+                picked = by_row[bounds[j]:bounds[j + 1]]
+                picked = picked[np.argsort(cols[picked], kind='stable')]
+                stored = self.pivots.get(key)
+                added = (times[cols[picked]], prices[picked], is_high[picked])
+                if stored is not None:
+                    added = tuple(np.concatenate([old, new]) for old, new in zip(stored, added))
+                if len(added[0]) > self.max_pivots:
+                    added = tuple(values[-self.max_pivots:] for values in added)
+                    self.first[key] = int(added[0][0])
+                else:
+                    self.first[key] = min(self.first.get(key, times[0]), int(times[0]))
+                self.pivots[key] = added
+                self.confirmed[key] = max(self.confirmed.get(key, none), int(final))
+
+    def _drop(self, key):
+        self.pivots.pop(key, None)
+        self.confirmed.pop(key, None)
+        self.first.pop(key, None)
+        self.tolerances.pop(key, None)
+
+    def _gather(self, keys, since, until):
+        """Stored pivots of `keys` in [since, until] as flat (rows, times, prices) arrays"""
+        since = _epoch_seconds([since])[0] if since is not None else None
+        until = _epoch_seconds([until])[0] if until is not None else None
+        rows, times, prices = [], [], []
+        with self.lock:
+            for j, key in enumerate(keys):
+                stored = self.pivots.get(key)
+                if stored is None:
+                    continue
+                mask = np.ones(len(stored[0]), dtype=bool)
+                if since is not None:
+                    mask &= stored[0] >= since
+                if until is not None:
+                    mask &= stored[0] <= until
+                rows.append(np.full(int(mask.sum()), j, dtype=np.intp))
+                times.append(stored[0][mask])
+                prices.append(stored[1][mask])
+        if not rows:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(rows), np.concatenate(times), np.concatenate(prices)
+
+    def level_arrays(self, keys, since=None, until=None):
+        """Clustered levels of every key in one pass: (rows, price, touches, first, last)"""
+        rows, times, prices = self._gather(keys, since, until)
+        tolerance = self.tolerance
+        if tolerance is None:
+            tolerance = np.array([self.tolerances.get(key, MIN_TOLERANCE) for key in keys])
+        return cluster_levels(rows, prices, times, tolerance, self.min_touches)
+
+    def levels(self, keys, references, since=None, until=None, unit='D'):
+        """Per key, its levels as dicts classified against its reference price
+
+        unit='m' formats first/last_seen as YYYY-MM-DDTHH:MM, for intraday bars.
+        """
+        rows, prices, touches, first, last = self.level_arrays(keys, since, until)
+        first = format_dates(first.astype('datetime64[s]'), unit)
+        last = format_dates(last.astype('datetime64[s]'), unit)
+        bounds = np.searchsorted(rows, np.arange(len(keys) + 1))
+        return [level_records(prices[a:b], touches[a:b], first[a:b], last[a:b], reference)
+                for a, b, reference in zip(bounds[:-1], bounds[1:], references)]
+
+    def nearest(self, keys, references, since=None, until=None):
+        """Per key, (nearest support, nearest resistance) around its reference price"""
+        rows, prices, _, _, _ = self.level_arrays(keys, since, until)
+        bounds = np.searchsorted(rows, np.arange(len(keys) + 1))
+        return [nearest_levels(prices[a:b], reference)
+                for a, b, reference in zip(bounds[:-1], bounds[1:], references)]
+
+def detect_levels(high, low=None, close=None, times=None, order=DEFAULT_ORDER,
+                  tolerance=DEFAULT_TOLERANCE, min_touches=DEFAULT_MIN_TOUCHES):
+    """Support/resistance levels of one ticker (1-D input) or a universe (2-D)
+
+    Levels are classified against the last close (or last high). Returns a
+    list of level dicts, or one such list per row for 2-D input.
+    """
+    one_dim = np.ndim(high) == 1
+    high = _as_2d(high)
+    n_rows, n_bars = high.shape
+    keys = list(range(n_rows))
+    times = pd.to_datetime(np.arange(n_bars), unit='D') if times is None else times
+    cache = LevelCache(order, tolerance, min_touches, max_pivots=n_bars)
+    cache.extend(keys, times, high, low)
+    last = _as_2d(close if close is not None else high)[:, -1]
+    levels = cache.levels(keys, last)
+    return levels[0] if one_dim else levels
+
+_default_cache = None
+
+def get_level_cache():
+    """Process-wide level cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LevelCache()
+    return _default_cache
+
+if __name__ == "__main__":
+    # Full 2-D detection over a universe, then incremental updates one bar at a time
+    import sys
+    import time
+
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_bars = 2520
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (n_tickers, n_bars)), axis=1))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, close.shape)))
+    low = close * (1 - np.abs(rng.normal(0, 0.005, close.shape)))
+    times = pd.date_range('2015-01-01', periods=n_bars, freq='D')
+    keys = [f'T{i:04d}' for i in range(n_tickers)]
+
+    cache = LevelCache()
+    start = time.perf_counter()
+    cache.extend(keys, times[:-20], high[:, :-20], low[:, :-20])
+    levels = cache.levels(keys, close[:, -21])
+    elapsed = time.perf_counter() - start
+    print(f"{n_tickers} tickers x {n_bars - 20} bars: {elapsed * 1e3:.0f} ms, "
+          f"{sum(len(l) for l in levels) / n_tickers:.1f} levels per ticker")
+
+    start = time.perf_counter()
+    for bar in range(n_bars - 20, n_bars):
+        cache.extend(keys, times[:bar + 1], high[:, :bar + 1], low[:, :bar + 1])
+    print(f"incremental: {(time.perf_counter() - start) / 20 * 1e3:.1f} ms per new bar")
+
+    start = time.perf_counter()
+    cache.levels(keys, close[:, -1])
+    print(f"re-cluster from cached pivots: {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    full = LevelCache()
+    full.extend(keys, times, high, low)
+    same = all(np.array_equal(a, b) for key in keys for a, b in zip(cache.pivots[key], full.pivots[key]))
+    print(f"incremental pivots match a full rescan: {same}")
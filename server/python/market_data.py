@@ -0,0 +1,506 @@
+import os
+import time
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+from trading_calendar import EXCHANGE_TZ
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Bar intervals, in seconds
+INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '1d': 86400}
+# Intraday bars count from the 09:30 open, so 1h bars run 09:30-10:30 (as on Yahoo)
+SESSION_OPEN_SECONDS = 9 * 3600 + 30 * 60
+# Rows resampled at a time, so minute series of any length need bounded temporaries
+RESAMPLE_CHUNK_ROWS = 1_000_000
+
+def interval_seconds(interval):
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval '{interval}'. Choose from {list(INTERVALS)}")
+    return INTERVALS[interval]
+
+def exchange_now():
+    """Current wall-clock time at the exchange, as a naive timestamp
+
+    Quotes, bars and sessions all count exchange time, whatever zone the
+    server runs in.
+    """
+    return pd.Timestamp.now(tz=EXCHANGE_TZ).tz_localize(None)
+
+def _empty_bars():
+    return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([]), dtype=np.float64)
+
+def _bucket_ids(index, seconds):
+    """Bucket number of every bar time (datetime64 values) and the bucket origin"""
+    t = index.astype('datetime64[s]').astype(np.int64)
+    if seconds >= INTERVALS['1d']:
+        return t // seconds, 0
+    return (t - SESSION_OPEN_SECONDS) // seconds, SESSION_OPEN_SECONDS
+
+def _aggregate(buckets, columns):
+    """One output bar per run of equal bucket ids (the input is sorted)"""
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return buckets[starts], {
+        'Open': columns['Open'][starts],
+        'High': np.fmax.reduceat(columns['High'], starts),
+        'Low': np.fmin.reduceat(columns['Low'], starts),
+        'Close': columns['Close'][ends],
+        'Volume': np.add.reduceat(np.nan_to_num(columns['Volume']), starts)
+    }
+
+def resample_ohlcv(frame, interval, chunk_rows=RESAMPLE_CHUNK_ROWS):
+    """Coarser OHLCV bars from finer ones, labelled by the start of each bar
+
+    Runs as numpy reduceat over sorted bucket ids, so empty periods (nights,
+    weekends) never produce bars. Long series are processed in chunks cut at
+    bucket boundaries, which keeps the temporaries at chunk size.
+    """
+    seconds = interval_seconds(interval)
+    if frame.empty:
+        return _empty_bars()
+    index = pd.DatetimeIndex(frame.index).tz_localize(None).values
+    buckets, origin = _bucket_ids(index, seconds)
+    columns = {col: frame[col].values.astype(np.float64) if col in frame else np.full(len(frame), np.nan)
+               for col in OHLCV_COLUMNS}
+
+    labels, parts = [], {col: [] for col in OHLCV_COLUMNS}
+    start = 0
+    while start < len(buckets):
+        stop = min(start + chunk_rows, len(buckets))
+        if stop < len(buckets) and buckets[stop] == buckets[stop - 1]:
+            # Move the cut back to where the straddling bucket begins
+            cut = start + int(np.searchsorted(buckets[start:stop], buckets[stop - 1], side='left'))
+            stop = cut if cut > start else start + int(np.searchsorted(buckets[start:], buckets[stop - 1], side='right'))
+        chunk_labels, values = _aggregate(buckets[start:stop], {col: v[start:stop] for col, v in columns.items()})
+        labels.append(chunk_labels)
+        for col in OHLCV_COLUMNS:
+            parts[col].append(values[col])
+        start = stop
+
+    labels = np.concatenate(labels) * seconds + origin
+    return pd.DataFrame({col: np.concatenate(parts[col]) for col in OHLCV_COLUMNS},
+                        index=pd.DatetimeIndex(labels.astype('datetime64[s]')))
+
+def _tickers(tickers):
+    return [tickers] if isinstance(tickers, str) else list(tickers)
+
+class MarketDataProvider:
+    """Source of OHLCV bars and live quotes
+
+    history(tickers, start, end, interval) returns an OHLCV DataFrame for a
+    single ticker, or {ticker: DataFrame} for a list (end is exclusive, as in
+    yfinance). quotes(tickers) returns {ticker: {'ticker', 'price', 'open',
+    'volume', 'time'}} for the latest quote of every ticker. Both are bulk
+    calls, so implementations can fetch many tickers at once.
+
+    Implementations fetch bars at the intervals in native_intervals (mapped
+    to how many days back each one reaches, None for no limit) through
+    _fetch(). Other intervals are resampled from the coarsest native
+    interval that divides them. Intraday fetches are kept for cache_ttl
+    seconds, so asking for 5m and then 1h bars of the same range resamples
+    the bars already fetched instead of downloading again. The provider is
+    shared by the server's worker threads, so the cache is only touched
+    under its lock.
+    """
+
+    native_intervals = {'1d': None}
+    cache_ttl = 60
+    cache_size = 16
+
+    def __init__(self):
+        self._bar_cache = {}    # (ticker, interval, start, end) -> (fetched_at, frame), oldest first
+        self._cache_lock = threading.Lock()
+
+    def _fetch(self, tickers, start, end, interval):
+        """{ticker: OHLCV frame} at a native interval"""
+        raise NotImplementedError
+
+    def source_interval(self, interval, start=None):
+        """The native interval a request is fetched at"""
+        seconds = interval_seconds(interval)
+        oldest = pd.Timestamp(start) if start is not None else None
+        candidates = []
+        for native, days in self.native_intervals.items():
+            reaches = days is None or oldest is None or oldest >= pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+            if seconds % INTERVALS[native] == 0 and reaches:
+                candidates.append(native)
+        if not candidates:
+            raise ValueError(f"{type(self).__name__} has no {interval} bars back to {oldest.date()}")
+        return max(candidates, key=INTERVALS.get)
+
+    def _cached(self, ticker, start, end, interval):
+        """A fresh cached frame of a finer interval that covers [start, end), resampled"""
+        now = time.monotonic()
+        found = None
+        with self._cache_lock:
+            for key, (fetched_at, frame) in list(self._bar_cache.items()):
+                cached_ticker, native, cached_start, cached_end = key
+                if now - fetched_at > self.cache_ttl:
+                    del self._bar_cache[key]
+                elif (found is None and cached_ticker == ticker and INTERVALS[interval] % INTERVALS[native] == 0
+                      and cached_start <= start and end <= cached_end):
+                    found = native, frame
+        if found is None:
+            return None
+        # Slicing and resampling don't need the lock; cached frames are never modified
+        native, frame = found
+        frame = frame[(frame.index >= start) & (frame.index < end)]
+        return frame if native == interval else resample_ohlcv(frame, interval)
+
+    def history(self, tickers, start=None, end=None, interval='1d'):
+        interval_seconds(interval)
+        if interval == '1d':
+            bars = self._fetch(_tickers(tickers), start, end, '1d')
+        else:
+            start = pd.Timestamp(start) if start is not None else pd.Timestamp.now().normalize() - pd.Timedelta(days=5)
+            end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+            bars = {}
+            missing = []
+            for ticker in _tickers(tickers):
+                cached = self._cached(ticker, start, end, interval)
+                if cached is not None:
+                    bars[ticker] = cached
+                else:
+                    missing.append(ticker)
+            if missing:
+                source = self.source_interval(interval, start)
+                fetched = self._fetch(missing, start, end, source)
+                with self._cache_lock:
+                    for ticker, frame in fetched.items():
+                        key = (ticker, source, start, end)
+                        # Re-inserting moves a refetched range to the back of the eviction order
+                        self._bar_cache.pop(key, None)
+                        self._bar_cache[key] = (time.monotonic(), frame)
+                    while len(self._bar_cache) > self.cache_size:
+                        del self._bar_cache[next(iter(self._bar_cache))]
+                for ticker, frame in fetched.items():
+                    bars[ticker] = frame if source == interval else resample_ohlcv(frame, interval)
+        if isinstance(tickers, str):
+            return bars.get(tickers, _empty_bars())
+        return bars
+
+    def quotes(self, tickers):
+        raise NotImplementedError
+
+    def now(self):
+        """The provider's clock in exchange time (replays run on recorded time)"""
+        return exchange_now()
+
+class YahooProvider(MarketDataProvider):
+    """Yahoo Finance through yfinance, one download per call
+
+    Yahoo keeps 1m bars for 30 days (served 7 days per request), the other
+    minute intervals for 60 days and 1h bars for 730 days.
+    """
+
+    native_intervals = {'1m': 30, '5m': 60, '15m': 60, '30m': 60, '1h': 730, '1d': None}
+    # Longest range Yahoo serves in one request, per interval
+    request_days = {'1m': 7, '1h': 730}
+
+    def _fetch(self, tickers, start, end, interval):
+        import yfinance as yf
+        if interval == '1d':
+            windows = [(start, end)]
+        else:
+            step = pd.Timedelta(days=self.request_days.get(interval, 60))
+            edges = list(pd.date_range(start, end, freq=step)) + [pd.Timestamp(end)]
+            windows = [(a, b) for a, b in zip(edges[:-1], edges[1:]) if a < b]
+
+        parts = {ticker: [] for ticker in tickers}
+        for window_start, window_end in windows:
+            data = yf.download(tickers, start=window_start, end=window_end, interval=interval,
+                               group_by='ticker', progress=False)
+            for ticker in tickers:
+                if ticker in data.columns.get_level_values(0):
+                    parts[ticker].append(data[ticker].dropna(how='all'))
+
+        bars = {}
+        for ticker, frames in parts.items():
+            if frames:
+                frame = pd.concat(frames) if len(frames) > 1 else frames[0]
+                if interval != '1d':
+                    # Exchange wall-clock time, like the rest of the intraday code
+                    frame.index = pd.DatetimeIndex(frame.index).tz_localize(None)
+                bars[ticker] = frame[~frame.index.duplicated(keep='last')]
+        return bars
+
+    def quotes(self, tickers):
+        import yfinance as yf
+        tickers = _tickers(tickers)
+        data = yf.download(tickers, period='1d', group_by='ticker', progress=False)
+        quotes = {}
+        for ticker in tickers:
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            bars = data[ticker].dropna(how='all')
+            if bars.empty:
+                continue
+            quotes[ticker] = {
+                'ticker': ticker,
+                'price': float(bars['Close'].iloc[-1]),
+                'open': float(bars['Open'].iloc[-1]),
+                'volume': float(bars['Volume'].iloc[-1]),
+                'time': exchange_now()
+            }
+        return quotes
+
+class ReplayProvider(MarketDataProvider):
+    """Replays recorded ticks from a CSV or Parquet file at `speed` times real time
+
+    The file needs time, ticker and price columns (open and volume are
+    optional). Replay time starts at the first recorded tick when the
+    provider is created (or reset) and advances speed times faster than the
+    wall clock; quotes() returns each ticker's last tick at that time and
+    history() builds daily bars from the ticks recorded up to it.
+    """
+
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        if path.endswith('.parquet'):
+            ticks = pd.read_parquet(path)
+        else:
+            ticks = pd.read_csv(path)
+        ticks['time'] = pd.to_datetime(ticks['time'])
+        ticks = ticks.sort_values('time', kind='stable').reset_index(drop=True)
+        self.speed = float(speed)
+        self.times = ticks['time'].values
+        self.ticker = ticks['ticker'].astype(str).values
+        self.price = ticks['price'].values.astype(np.float64)
+        self.open = ticks['open'].values.astype(np.float64) if 'open' in ticks else None
+        self.volume = ticks['volume'].values.astype(np.float64) if 'volume' in ticks else np.zeros(len(ticks))
+        self.reset()
+
+    @classmethod
+    def from_journal(cls, journal, path, speed=1.0):
+        """Export a TickJournal's history to a Parquet/CSV file and replay it"""
+        records = journal.history()
+        frame = pd.DataFrame({
+            # The journal keeps epoch milliseconds; replays run on exchange time
+            'time': pd.to_datetime(records['time'], unit='ms', utc=True).tz_convert(EXCHANGE_TZ).tz_localize(None),
+            'ticker': np.char.decode(records['ticker']),
+            'price': records['price']
+        })
+        if path.endswith('.parquet'):
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        return cls(path, speed)
+
+    def reset(self):
+        self.wall_start = time.monotonic()
+        self.cursor = 0
+        self.latest = {}        # ticker -> index of its last replayed tick
+        self.day_open = {}      # ticker -> (day, first price of that day)
+        self.lock = threading.Lock()
+
+    def now(self):
+        """Current replay time"""
+        if len(self.times) == 0:
+            return exchange_now()
+        elapsed = (time.monotonic() - self.wall_start) * self.speed
+        return pd.Timestamp(self.times[0]) + pd.Timedelta(seconds=elapsed)
+
+    def _played(self):
+        """Number of ticks at or before the current replay time"""
+        return int(np.searchsorted(self.times, np.datetime64(self.now()), side='right'))
+
+    def _advance(self):
+        """Fold the ticks replayed since the last call into the per-ticker state"""
+        played = self._played()
+        with self.lock:
+            for i in range(self.cursor, played):
+                ticker = self.ticker[i]
+                self.latest[ticker] = i
+                day = self.times[i].astype('datetime64[D]')
+                if self.day_open.get(ticker, (None,))[0] != day:
+                    self.day_open[ticker] = (day, self.price[i])
+            self.cursor = max(self.cursor, played)
+
+    def quotes(self, tickers):
+        self._advance()
+        quotes = {}
+        for ticker in _tickers(tickers):
+            i = self.latest.get(ticker)
+            if i is None:
+                continue
+            # Open is the first tick of the day, unless the file records it
+            open_price = self.open[i] if self.open is not None else self.day_open[ticker][1]
+            quotes[ticker] = {'ticker': ticker, 'price': float(self.price[i]), 'open': float(open_price),
+                              'volume': float(self.volume[i]), 'time': pd.Timestamp(self.times[i])}
+        return quotes
+
+    native_intervals = {'1m': None, '1d': None}
+
+    def _fetch(self, tickers, start, end, interval):
+        played = self._played()
+        frame = pd.DataFrame({'ticker': self.ticker[:played], 'price': self.price[:played],
+                              'volume': self.volume[:played]},
+                             index=pd.DatetimeIndex(self.times[:played]))
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+
+        rule = '1D' if interval == '1d' else '1min'
+        bars = {}
+        for ticker, ticks in frame[frame['ticker'].isin(tickers)].groupby('ticker'):
+            ohlc = ticks['price'].resample(rule).ohlc()
+            ohlc.columns = ['Open', 'High', 'Low', 'Close']
+            ohlc['Volume'] = ticks['volume'].resample(rule).sum()
+            bars[ticker] = ohlc.dropna(subset=['Close'])
+        return bars
+
+    def ticks(self):
+        """Yield every recorded tick as a quote dict, paced at the replay speed"""
+        for i in range(len(self.times)):
+            delay = (pd.Timestamp(self.times[i]) - self.now()).total_seconds() / self.speed
+            if delay > 0:
+                time.sleep(delay)
+            yield {'ticker': self.ticker[i], 'price': float(self.price[i]),
+                   'volume': float(self.volume[i]), 'time': pd.Timestamp(self.times[i])}
+
+# First synthetic trading day; every series starts here
+SYNTHETIC_EPOCH = pd.Timestamp('2000-01-03')
+MINUTES_PER_SESSION = 390
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic random-walk prices for any ticker, no network needed
+
+    Daily bars are a geometric random walk seeded from (seed, ticker), so the
+    same request always returns the same data. Each quotes() call moves
+    every requested ticker one intraday step from today's synthetic open,
+    along a walk seeded from (seed, ticker, date).
+    """
+
+    def __init__(self, seed=0, volatility=0.02, intraday_volatility=0.001):
+        super().__init__()
+        self.seed = seed
+        self.volatility = volatility
+        self.intraday_volatility = intraday_volatility
+        self.intraday = {}
+        self.lock = threading.Lock()
+
+    def _rng(self, ticker, *salt):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), *(salt or (0,))])
+
+    def _arrays(self, ticker, n):
+        """The first n synthetic bars of a ticker as {column: array}"""
+        rng = self._rng(ticker)
+        start_price = 20 + 480 * rng.random()
+        close = start_price * np.exp(np.cumsum(rng.normal(0, self.volatility, n)))
+        open_ = close * np.exp(rng.normal(0, self.volatility / 4, n))
+        spread = np.abs(rng.normal(0, self.volatility / 2, n))
+        return {
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': rng.integers(100000, 10000000, n).astype(np.float64)
+        }
+
+    @staticmethod
+    def _bar_count(day):
+        """Business days from the epoch up to and including `day`"""
+        return int(np.busday_count(SYNTHETIC_EPOCH.date(), (pd.Timestamp(day) + pd.Timedelta(days=1)).date()))
+
+    def _bars(self, ticker, dates):
+        """Bars for business days since a fixed epoch, so any range is consistent"""
+        if len(dates) == 0:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=dates)
+        n = self._bar_count(dates[-1])
+        # Only the requested tail is turned into a frame
+        return pd.DataFrame({column: values[n - len(dates):]
+                             for column, values in self._arrays(ticker, n).items()}, index=dates)
+
+    native_intervals = {'1m': None, '1d': None}
+
+    def _minute_bars(self, ticker, daily):
+        """390 one-minute bars per day, bridging each day's open to its close"""
+        n = MINUTES_PER_SESSION
+        steps = np.arange(n + 1) / n
+        parts = []
+        # A block of days at a time keeps the path matrices small
+        for block in range(0, len(daily), 250):
+            days = daily.iloc[block:block + 250]
+            log_open = np.log(days['Open'].values)[:, None]
+            log_close = np.log(days['Close'].values)[:, None]
+            walks = np.zeros((len(days), n + 1))
+            wick = np.empty((len(days), n))
+            for i, day in enumerate(days.index):
+                rng = self._rng(ticker, 1, day.toordinal())
+                walks[i, 1:] = np.cumsum(rng.normal(0, self.intraday_volatility, n))
+                wick[i] = np.abs(rng.normal(0, self.intraday_volatility / 2, n))
+            # Brownian bridge: pinned to the day's open at 09:30 and its close at 16:00
+            path = np.exp(log_open + steps * (log_close - log_open) + walks - steps * walks[:, -1:])
+            opens, closes = path[:, :-1], path[:, 1:]
+            # More volume near the open and the close
+            weights = 1 + 8 * (steps[:-1] - 0.5) ** 2
+            volume = days['Volume'].values[:, None] * weights / weights.sum()
+            times = days.index.values[:, None] + np.timedelta64(SESSION_OPEN_SECONDS, 's') + \
+                np.arange(n).astype('timedelta64[m]')
+            parts.append(pd.DataFrame({
+                'Open': opens.ravel(),
+                'High': (np.maximum(opens, closes) * (1 + wick)).ravel(),
+                'Low': (np.minimum(opens, closes) * (1 - wick)).ravel(),
+                'Close': closes.ravel(),
+                'Volume': volume.ravel()
+            }, index=pd.DatetimeIndex(times.ravel())))
+        return pd.concat(parts) if parts else _empty_bars()
+
+    def _fetch(self, tickers, start, end, interval):
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+        start = pd.Timestamp(start) if start is not None else end - pd.DateOffset(years=1)
+        # End is exclusive, as with yfinance
+        dates = pd.bdate_range(max(start, SYNTHETIC_EPOCH).normalize(), end - pd.Timedelta(days=1))
+        bars = {ticker: self._bars(ticker, dates) for ticker in tickers}
+        if interval == '1m':
+            bars = {ticker: self._minute_bars(ticker, daily) for ticker, daily in bars.items()}
+            bars = {ticker: frame[(frame.index >= start) & (frame.index < end)] for ticker, frame in bars.items()}
+        return bars
+
+    def quotes(self, tickers):
+        now = exchange_now()
+        today = now.normalize()
+        quotes = {}
+        for ticker in _tickers(tickers):
+            with self.lock:
+                state = self.intraday.get(ticker)
+                if state is None or state['day'] != today:
+                    # Start the day from the last synthetic daily bar
+                    bars = self._arrays(ticker, self._bar_count(today))
+                    state = {'day': today, 'open': float(bars['Open'][-1]), 'volume': float(bars['Volume'][-1]),
+                             'rng': self._rng(ticker, today.toordinal()), 'walk': 0.0, 'step': 0}
+                    self.intraday[ticker] = state
+                state['walk'] += state['rng'].normal(0, self.intraday_volatility)
+                state['step'] += 1
+                quotes[ticker] = {
+                    'ticker': ticker,
+                    'price': state['open'] * float(np.exp(state['walk'])),
+                    'open': state['open'],
+                    'volume': state['volume'] * min(1.0, state['step'] / 390),
+                    'time': now
+                }
+        return quotes
+
+_provider = None
+
+def get_provider():
+    """Process-wide provider chosen by MARKET_DATA_PROVIDER
+
+    'yahoo' (default), 'synthetic' or 'replay:<path>'; REPLAY_SPEED sets the
+    replay speed and SYNTHETIC_SEED the synthetic seed.
+    """
+    global _provider
+    if _provider is None:
+        spec = os.environ.get('MARKET_DATA_PROVIDER', 'yahoo')
+        if spec == 'synthetic':
+            _provider = SyntheticProvider(seed=int(os.environ.get('SYNTHETIC_SEED', 0)))
+        elif spec.startswith('replay:'):
+            _provider = ReplayProvider(spec.split(':', 1)[1], speed=float(os.environ.get('REPLAY_SPEED', 1)))
+        elif spec == 'yahoo':
+            _provider = YahooProvider()
+        else:
+            raise ValueError(f"Unknown MARKET_DATA_PROVIDER '{spec}'")
+    return _provider
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from json_stream import write_json
+from market_data import get_provider
+from trading_calendar import get_trading_calendar, EXCHANGE_TZ
+
+# Matches the defaults of the predictionHistory schema in server/models/Stock.js
+DEFAULT_HORIZON = 1
+DEFAULT_MODEL = 'random_forest'
+
+# Columns of the outstanding/reconciled prediction frames
+PREDICTION_COLUMNS = ['doc_id', 'position', 'ticker', 'date', 'predicted_price', 'signal', 'horizon', 'model']
+RESULT_COLUMNS = ['actual_price', 'accuracy']
+
+def _prediction_rows(documents):
+    """Flatten stock documents into one row per predictionHistory entry"""
+    rows = []
+    for doc in documents:
+        for position, entry in enumerate(doc.get('predictionHistory') or []):
+            rows.append({
+                'doc_id': doc.get('_id', doc.get('ticker')),
+                'position': position,
+                'ticker': doc['ticker'],
+                'date': entry.get('date'),
+                'predicted_price': entry.get('predictedPrice'),
+                'signal': entry.get('signal'),
+                'horizon': entry.get('horizon', DEFAULT_HORIZON),
+                'model': entry.get('model', DEFAULT_MODEL),
+                'actual_price': entry.get('actualPrice'),
+                'accuracy': entry.get('accuracy')
+            })
+    frame = pd.DataFrame(rows, columns=PREDICTION_COLUMNS + RESULT_COLUMNS)
+    frame['date'] = pd.to_datetime(frame['date'], utc=True, format='ISO8601').dt.tz_localize(None).dt.normalize()
+    frame[['predicted_price', 'actual_price', 'accuracy']] = frame[
+        ['predicted_price', 'actual_price', 'accuracy']].astype(np.float64)
+    return frame
+
+class FilePredictionStore:
+    """Stock documents kept in a JSON file, in the same shape as the Mongo collection
+
+    Stands in for MongoDB in tests and local runs; write-backs rewrite the
+    file once per batch (atomically), not once per prediction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def predictions(self):
+        return _prediction_rows(self._read())
+
+    def write_back(self, results):
+        if results.empty:
+            return 0
+        documents = self._read()
+        by_id = {doc.get('_id', doc.get('ticker')): doc for doc in documents}
+        for doc_id, position, actual, accuracy in zip(results['doc_id'], results['position'],
+                                                      results['actual_price'], results['accuracy']):
+            entry = by_id[doc_id]['predictionHistory'][position]
+            entry['actualPrice'] = float(actual)
+            entry['accuracy'] = float(accuracy)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(documents, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+        return len(results)
+
+class MongoPredictionStore:
+    """The stocks collection written by the Node server (server/models/Stock.js)"""
+
+    def __init__(self, uri=None, collection='stocks'):
+        # Only needed when reconciling against MongoDB
+        from pymongo import MongoClient
+        uri = uri or os.environ.get('MONGO_URI', 'mongodb://localhost:27017/stock_analysis')
+        self.client = MongoClient(uri)
+        self.collection = self.client.get_default_database()[collection]
+
+    def predictions(self):
+        cursor = self.collection.find({'predictionHistory.0': {'$exists': True}},
+                                      {'ticker': 1, 'predictionHistory': 1})
+        return _prediction_rows(cursor)
+
+    def write_back(self, results):
+        from pymongo import UpdateOne
+        updates = [
+            # The date in the filter guards against the array having been trimmed meanwhile
+            UpdateOne(
+                {'_id': doc_id, f'predictionHistory.{position}.date': {'$gte': date.to_pydatetime(),
+                                                                       '$lt': (date + pd.Timedelta(days=1)).to_pydatetime()}},
+                {'$set': {f'predictionHistory.{position}.actualPrice': float(actual),
+                          f'predictionHistory.{position}.accuracy': float(accuracy)}}
+            )
+            for doc_id, position, date, actual, accuracy in zip(
+                results['doc_id'], results['position'], results['date'],
+                results['actual_price'], results['accuracy'])
+        ]
+        if not updates:
+            return 0
+        return self.collection.bulk_write(updates, ordered=False).modified_count
+
+def open_store(spec=None):
+    """A store from a spec: a mongodb:// URI, or a path to a JSON file"""
+    spec = spec or os.environ.get('PREDICTION_STORE') or os.environ.get('MONGO_URI', 'mongodb://localhost:27017/stock_analysis')
+    if spec.startswith('mongodb://') or spec.startswith('mongodb+srv://'):
+        return MongoPredictionStore(spec)
+    return FilePredictionStore(spec)
+
+def fetch_closes(tickers, start, end):
+    """Daily closes of all tickers in one bulk request, as a dates x tickers frame"""
+    bars = get_provider().history(list(tickers), start=start, end=end + pd.Timedelta(days=1))
+    closes = pd.DataFrame({ticker: frame['Close'] for ticker, frame in bars.items()})
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+    return closes
+
+def attach_actuals(predictions, closes):
+    """Join each prediction with the realized close of its date and the close before it
+
+    Predictions whose date has no close yet (or was not a trading day) are dropped.
+    """
+    # One long (date, ticker) table for both the close and the previous session's close
+    long = closes.stack().rename('actual_price').to_frame()
+    long['previous_close'] = closes.shift(1).stack()
+    long.index.names = ['date', 'ticker']
+    merged = predictions.drop(columns=RESULT_COLUMNS, errors='ignore').merge(
+        long.reset_index(), on=['date', 'ticker'], how='inner')
+    return merged[merged['actual_price'].notna()]
+
+def score(frame):
+    """Per-prediction error columns, computed over the whole frame at once"""
+    error = frame['predicted_price'].values - frame['actual_price'].values
+    actual = frame['actual_price'].values
+    previous = frame['previous_close'].values
+    scored = frame.assign(
+        error=error,
+        abs_pct_error=np.abs(error) / actual * 100,
+        # Same definition as updatePredictionActual in Stock.js
+        accuracy=100 - np.abs(error) / actual * 100,
+        direction_hit=np.where(np.isnan(previous), np.nan,
+                               (np.sign(frame['predicted_price'].values - previous) ==
+                                np.sign(actual - previous)).astype(np.float64))
+    )
+    return scored
+
+def summarize(scored, by=('ticker', 'horizon')):
+    """Error metrics grouped by ticker and horizon (or any other columns)"""
+    if scored.empty:
+        return pd.DataFrame()
+    grouped = scored.assign(abs_error=scored['error'].abs(),
+                            squared_error=scored['error'] ** 2).groupby(list(by))
+    summary = grouped.agg(
+        samples=('error', 'size'),
+        mae=('abs_error', 'mean'),
+        mse=('squared_error', 'mean'),
+        mape=('abs_pct_error', 'mean'),
+        direction_accuracy=('direction_hit', 'mean')
+    )
+    summary['rmse'] = np.sqrt(summary.pop('mse'))
+    return summary.reset_index()
+
+def rolling_accuracy(scored, window=20):
+    """Live accuracy per model over its last `window` reconciled predictions
+
+    Returns the rolling series (one row per prediction, ordered by date) and
+    the latest value per model.
+    """
+    if scored.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    ordered = scored.sort_values(['model', 'date'])
+    rolling = ordered.groupby('model')[['abs_pct_error', 'direction_hit']].rolling(window, min_periods=1).mean()
+    series = ordered[['model', 'date', 'ticker']].assign(
+        rolling_mape=rolling['abs_pct_error'].values,
+        rolling_direction_accuracy=rolling['direction_hit'].values
+    )
+    latest = series.groupby('model').tail(1).reset_index(drop=True)
+    return series.reset_index(drop=True), latest
+
+def last_closed_session(as_of):
+    """The latest date whose session had closed at `as_of` (naive times are exchange time)
+
+    Today only counts once the closing bell has rung; before that its close
+    is still a moving intraday price.
+    """
+    day = as_of.normalize()
+    close = get_trading_calendar().session_close(day)
+    if close is not None and as_of.time() >= close:
+        return day
+    return day - pd.Timedelta(days=1)
+
+def reconcile(store, as_of=None, window=20, close_source=fetch_closes):
+    """Fill in actual prices and accuracy for every matured prediction in one pass
+
+    Loads all predictions, looks up the realized closes of every ticker with
+    a single bulk fetch, scores them column-wise, writes the outstanding ones
+    back in one bulk update and reports accuracy by ticker/horizon and the
+    rolling live accuracy per model. Returns a summary dict.
+
+    A prediction matures once the session of its date has closed, so with a
+    date-only as_of that date's own predictions are still pending.
+    """
+    as_of = pd.Timestamp(as_of or datetime.now(EXCHANGE_TZ).replace(tzinfo=None))
+    cutoff = last_closed_session(as_of)
+    predictions = store.predictions()
+    matured = predictions[predictions['date'] <= cutoff]
+    matured = matured.assign(outstanding=matured['actual_price'].isna())
+
+    scored = pd.DataFrame()
+    updated = 0
+    if not matured.empty:
+        # One extra week in front so the first predictions have a previous close
+        closes = close_source(sorted(matured['ticker'].unique()),
+                              matured['date'].min() - pd.Timedelta(days=7), cutoff)
+        scored = score(attach_actuals(matured, closes))
+        updated = store.write_back(scored[scored['outstanding']])
+    _, latest = rolling_accuracy(scored, window)
+
+    return {
+        'as_of': str(as_of.date()),
+        'outstanding': int(matured['outstanding'].sum()) if not matured.empty else 0,
+        'reconciled': int(updated),
+        'by_ticker_horizon': summarize(scored).to_dict('records'),
+        'live_accuracy': latest.to_dict('records')
+    }
+
+if __name__ == "__main__":
+    # Usage: reconcile_predictions.py [store] [--as-of=YYYY-MM-DD[THH:MM]] [--window=N]
+    # where store is a mongodb:// URI or a JSON file (default: MONGO_URI)
+    as_of = None
+    window = 20
+    for arg in sys.argv:
+        if arg.startswith('--as-of='):
+            as_of = arg.split('=', 1)[1]
+        elif arg.startswith('--window='):
+            window = int(arg.split('=', 1)[1])
+    args = [arg for arg in sys.argv if not arg.startswith('--')]
+
+    result = reconcile(open_store(args[1] if len(args) > 1 else None), as_of, window)
+    write_json(result, sys.stdout)
+    sys.stdout.write('\n')
@@ -1,105 +1,275 @@
 import numpy as np
-import pandas as pd
-import yfinance as yfn
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.ensemble import RandomForestRegressor
-from scipy.signal import argrelextrema
-from datetime import datetime, timedelta
+from datetime import datetime
 import sys
 import json
+from trading_calendar import get_trading_calendar, format_dates
+from json_stream import write_json
+from indicators import IndicatorSet, compute_indicators
+from feature_store import get_feature_store
+from downsample import downsample_indices
+from market_data import get_provider, interval_seconds
+from levels import get_level_cache, nearest_levels
+
+# Dtype policies for the analysis pipeline. "series" covers prices and the
+# indicator/prediction arrays, "signals" the -1/0/1 signal vector and
+# "features" the training matrix handed to sklearn (trees work in float32
+# internally, so float32 features avoid a conversion copy on fit/predict).
+# Regression targets and accuracy metrics always stay float64. float32 halves
+# the memory of long series but rounds prices and predictions, so it is opt-in.
+DTYPE_POLICIES = {
+    'float64': {
+        'series': np.float64,
+        'signals': np.float64,
+        'features': np.float64
+    },
+    'float32': {
+        'series': np.float32,
+        'signals': np.int8,
+        'features': np.float32
+    }
+}
+DEFAULT_DTYPE_POLICY = 'float64'
+
+class AnalysisCancelled(Exception):
+    """Raised by a progress_callback to abort analyze_stock"""
+
+# Windows predicted at a time, so long minute series never materialize the
+# whole (bars x lookback) window matrix
+PREDICT_CHUNK_ROWS = 65536
+
+# Most windows the forest is fitted on; longer training ranges (minute bars
+# over months) are thinned to an even stride across the whole range
+MAX_TRAIN_ROWS = 5000
+
+# Percentiles of the per-tree predictions returned as prediction intervals
+PREDICTION_QUANTILES = (5, 50, 95)
+
+def get_dtype_policy(name=None):
+    """Look up a dtype policy by name"""
+    name = name or DEFAULT_DTYPE_POLICY
+    if name not in DTYPE_POLICIES:
+        raise ValueError(f"Unknown dtype policy '{name}'. Choose from {sorted(DTYPE_POLICIES)}")
+    return DTYPE_POLICIES[name]
+
+def memory_report(arrays, policy_name):
+    """Summarize the bytes held by the analysis arrays against a float64 baseline"""
+    sizes = {name: int(arr.nbytes) for name, arr in arrays.items()}
+    total = sum(sizes.values())
+    baseline = sum(int(arr.size) * 8 for arr in arrays.values())
+    return {
+        'dtype_policy': policy_name,
+        'arrays': sizes,
+        'total_bytes': total,
+        'float64_bytes': baseline,
+        'saved_percent': round((1 - total / baseline) * 100, 2) if baseline else 0.0
+    }
 
 def calculate_ema(prices, period):
     """Calculate Exponential Moving Average"""
     # Make sure prices is a 1D array
     prices = np.array(prices).flatten()
-    return pd.Series(prices).ewm(span=period, adjust=False).mean().values
+    return compute_indicators(prices, indicators=[f'ema_{period}'])[f'ema_{period}']
 
 def calculate_rsi(prices, period=14):
     """Calculate Relative Strength Index"""
     # Make sure prices is a 1D array
     prices = np.array(prices).flatten()
+    return compute_indicators(prices, indicators=[f'rsi_{period}'])[f'rsi_{period}']
+
+def forecast_path(model, windows, horizon, price_columns=None):
+    """Recursively forecast `horizon` steps ahead from every row of `windows`
+
+    Each step is a single batched predict over all windows; the prediction is
+    appended to each window and its oldest value dropped, so the model is
+    trained once and reused for every step. Only the first `price_columns`
+    columns are rolled; any feature columns after them are held at their
+    last known values.
+    """
+    windows = np.array(windows, copy=True)
+    price_columns = price_columns or windows.shape[1]
+    path = np.empty((windows.shape[0], horizon), dtype=np.float64)
     
-    # Calculate price changes
-    deltas = np.diff(prices)
-    seed = deltas[:period+1]
-    
-    # Handle potential zero values in the denominator
-    up = seed[seed >= 0].sum()/period
-    down = -seed[seed < 0].sum()/period
-    
-    # Avoid division by zero
-    if down == 0:
-        rs = 100.0
-    else:
-        rs = up/down
+    for step in range(horizon):
+        step_predictions = model.predict(windows)
+        path[:, step] = step_predictions
+        windows[:, :price_columns - 1] = windows[:, 1:price_columns]
+        windows[:, price_columns - 1] = step_predictions
+        
+    return path
+
+def tree_value_table(model):
+    """Node values of every tree of a fitted forest in one flat array
+
+    Returns (values, offsets); node i of tree t is values[offsets[t] + i].
+    """
+    values = [estimator.tree_.value.reshape(-1) for estimator in model.estimators_]
+    offsets = np.cumsum([0] + [len(tree_values) for tree_values in values[:-1]])
+    return np.concatenate(values), offsets
+
+def tree_predictions(model, X, table):
+    """(rows x trees) matrix of every tree's prediction
+
+    One apply() finds each row's leaf in every tree and one gather reads the
+    leaf values, so it costs about the same as predict(), whose result is
+    the row mean of this matrix.
+    """
+    values, offsets = table
+    return values[model.apply(X) + offsets]
+
+def forecast_step_errors(path, prices, first_target):
+    """Per-step RMSE, MAE and MAPE of forecast paths against realized prices
+
+    Row j of `path` starts at prices[first_target + j]; steps that run past the
+    end of the series are ignored.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n_rows, horizon = path.shape
+    targets = first_target + np.arange(n_rows)[:, None] + np.arange(horizon)[None, :]
+    valid = targets < len(prices)
+    actual = prices[np.minimum(targets, len(prices) - 1)]
     
-    rsi = np.zeros_like(prices)
-    rsi[:period] = 100. - 100./(1. + rs)
+    errors = np.where(valid, path - actual, 0.0)
+    counts = valid.sum(axis=0)
+    safe_counts = np.maximum(counts, 1)
+    rmse = np.sqrt((errors ** 2).sum(axis=0) / safe_counts)
+    mae = np.abs(errors).sum(axis=0) / safe_counts
+    mape = (np.abs(errors) / actual).sum(axis=0) / safe_counts * 100
     
-    # Calculate RSI based on smoothed averages
-    for i in range(period, len(prices)):
-        delta = deltas[i-1]
-        if delta > 0:
-            upval = delta
-            downval = 0.
-        else:
-            upval = 0.
-            downval = -delta
-            
-        up = (up * (period - 1) + upval) / period
-        down = (down * (period - 1) + downval) / period
-        
-        # Avoid division by zero
-        if down == 0:
-            rs = 100.0
+    step_errors = []
+    for step in range(horizon):
+        if counts[step] == 0:
+            step_errors.append({'rmse': None, 'mae': None, 'mape': None, 'samples': 0})
         else:
-            rs = up/down
-            
-        rsi[i] = 100. - 100./(1. + rs)
-        
-    return rsi
+            step_errors.append({
+                'rmse': float(rmse[step]),
+                'mae': float(mae[step]),
+                'mape': float(mape[step]),
+                'samples': int(counts[step])
+            })
+    return step_errors
+
+def analyze_stock(ticker, start_date, end_date, lookback_period=60, dtype_policy=None,
+                  progress_callback=None, forecast_horizon=5, as_arrays=False, compact=False,
+                  indicators=None, feature_set=None, max_points=None, interval='1d'):
+    """Analyze stock with a simple predictive model
+
+    interval is the bar size ('1m', '5m', '15m', '30m', '1h' or '1d').
+    Indicator periods, the lookback window and the forecast all count bars,
+    and intraday dates are returned as YYYY-MM-DDTHH:MM.
+
+    forecast_horizon is the number of bars (trading days for daily bars) in
+    the returned forecast path; every step reuses the same fitted model.
+    next_day_prediction and the test windows also get prediction intervals,
+    the PREDICTION_QUANTILES percentiles of the forest's per-tree predictions.
+
+    With as_arrays=True the series are returned as NumPy arrays (and dates as
+    a DatetimeIndex) for json_stream.write_json instead of as Python lists.
+    compact=True drops stock_data columns that duplicate other fields
+    (Close is already returned as prices).
+
+    indicators is an optional list of extra indicator specs ('macd',
+    'bollinger', 'atr_14', 'vwap', 'obv', ...) returned under 'indicators'.
+
+    feature_set names a feature set from feature_store.FEATURE_SETS whose
+    precomputed columns are added to the price windows for training and
+    prediction.
+
+    max_points caps the number of points in the returned series; longer
+    ranges are downsampled with LTTB. Buy/sell markers are then returned
+    exactly under 'signal_markers' rather than only at the sampled bars.
+
+    progress_callback, if given, is called with each completed stage:
+    'fetched', 'indicators', 'trained' and 'predicted'. It may raise
+    AnalysisCancelled to stop the analysis; that is re-raised to the caller
+    instead of being returned as an error.
+    """
+    def report(stage):
+        if progress_callback:
+            progress_callback(stage)
 
-def analyze_stock(ticker, start_date, end_date, lookback_period=60):
-    """Analyze stock with a simple predictive model"""
     try:
+        policy_name = dtype_policy or DEFAULT_DTYPE_POLICY
+        policy = get_dtype_policy(policy_name)
+        series_dtype = policy['series']
+
         # Fetch stock data
-        stock_data = yfn.download(ticker, start=start_date, end=end_date)
+        bar_seconds = interval_seconds(interval)
+        intraday = interval != '1d'
+        date_unit = 'm' if intraday else 'D'
+        # Cached features and levels of intraday bars are kept apart from the daily ones
+        series_key = f"{ticker}_{interval}" if intraday else ticker
+        stock_data = get_provider().history(ticker, start=start_date, end=end_date, interval=interval)
         
         if stock_data.empty:
             return {"error": f"No data available for {ticker}"}
+        report('fetched')
             
         # Extract prices and dates
-        prices = stock_data['Close'].values.flatten()  # Ensure 1D array
+        prices = stock_data['Close'].values.flatten().astype(series_dtype)  # Ensure 1D array
         dates = stock_data.index
         
         if len(prices) < lookback_period:
             return {"error": f"Insufficient data points. Need at least {lookback_period}."}
             
-        # Calculate indicators
-        ema_20 = calculate_ema(prices, 20)
-        ema_50 = calculate_ema(prices, 50)
-        rsi = calculate_rsi(prices)
-        
-        # Prepare data for prediction model
-        X = []
-        y = []
-        
-        for i in range(lookback_period, len(prices)):
-            X.append(prices[i-lookback_period:i])
-            y.append(prices[i])
-            
-        X = np.array(X)
-        y = np.array(y)
+        # Calculate indicators in one pass over the OHLCV data
+        def column(name):
+            return stock_data[name].values.flatten() if name in stock_data else None
+        
+        indicator_set = IndicatorSet(prices, column('High'), column('Low'), column('Volume'))
+        computed = indicator_set.compute(['ema_20', 'ema_50', 'rsi_14'] + list(indicators or []))
+        computed = {name: values.astype(series_dtype, copy=False) for name, values in computed.items()}
+        ema_20 = computed.pop('ema_20')
+        ema_50 = computed.pop('ema_50')
+        rsi = computed.pop('rsi_14')
+        
+        # Support/resistance levels from swing highs and lows; the cache only
+        # scans the bars added since this series was last analyzed
+        high, low = column('High'), column('Low')
+        level_cache = get_level_cache()
+        level_cache.extend([series_key], dates, high if high is not None else prices,
+                           low if low is not None else prices)
+        levels = level_cache.levels([series_key], [float(prices[-1])], since=dates[0], until=dates[-1],
+                                    unit=date_unit)[0]
+        nearest_support, nearest_resistance = nearest_levels(
+            np.array([level['price'] for level in levels]), float(prices[-1]))
+        report('indicators')
+        
+        # Prepare data for prediction model: row j is the window of prices
+        # [j, j + lookback) and its target the price right after it. The
+        # windows are a strided view; rows are only copied a chunk at a time.
+        price_windows = np.lib.stride_tricks.sliding_window_view(prices, lookback_period)[:-1]
+        y = prices[lookback_period:].astype(np.float64)
+        
+        # Add stored features known at the end of each window (row i-1)
+        feature_names = []
+        if feature_set:
+            store = get_feature_store()
+            store.sync(series_key, stock_data)
+            _, feature_matrix, feature_names = store.load(series_key, feature_set, dates)
+            feature_matrix = np.nan_to_num(feature_matrix, nan=0.0, posinf=0.0, neginf=0.0)
+            feature_matrix = feature_matrix.astype(policy['features'], copy=False)
+        
+        def windows(lo, hi, step=1):
+            """Model input rows lo..hi-1, every step-th one"""
+            rows = price_windows[lo:hi:step].astype(policy['features'])
+            if feature_names:
+                rows = np.hstack([rows, feature_matrix[lookback_period - 1 + lo:lookback_period - 1 + hi:step]])
+            return rows
         
         # Split into training and testing
-        train_size = int(len(X) * 0.8)
-        X_train, X_test = X[:train_size], X[train_size:]
+        n_windows = len(price_windows)
+        train_size = int(n_windows * 0.8)
         y_train, y_test = y[:train_size], y[train_size:]
         
-        # Train a model
+        # Train a model on at most MAX_TRAIN_ROWS windows; only the sampled
+        # rows are copied out of the strided view
+        train_step = max(1, -(-train_size // MAX_TRAIN_ROWS))
+        X_train = windows(0, train_size, train_step)
         model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
+        model.fit(X_train, y_train[::train_step])
+        report('trained')
         
         # Make predictions
         predictions = np.zeros_like(prices)
@@ -107,68 +277,104 @@ def analyze_stock(ticker, start_date, end_date, lookback_period=60):
         # For the first lookback_period days, prediction is just the price
         predictions[:lookback_period] = prices[:lookback_period]
         
-        # For the rest, use the model
-        test_predictions = model.predict(X_test)
+        # For the rest, use the model; the test windows are predicted chunk by
+        # chunk. Every tree's prediction is kept: their mean is the forest's
+        # prediction and their percentiles give the prediction intervals.
+        forecast_horizon = max(1, int(forecast_horizon))
+        tree_table = tree_value_table(model)
+        prediction_chunks, quantile_chunks, path_chunks = [], [], []
+        for lo in range(train_size, n_windows, PREDICT_CHUNK_ROWS):
+            rows = windows(lo, min(lo + PREDICT_CHUNK_ROWS, n_windows))
+            per_tree = tree_predictions(model, rows, tree_table)
+            prediction_chunks.append(per_tree.mean(axis=1))
+            quantile_chunks.append(np.percentile(per_tree, PREDICTION_QUANTILES, axis=1))
+            path_chunks.append(forecast_path(model, rows, forecast_horizon, lookback_period))
+        test_predictions = np.concatenate(prediction_chunks or [np.zeros(0)]).astype(series_dtype, copy=False)
+        test_quantiles = np.hstack(quantile_chunks or [np.zeros((len(PREDICTION_QUANTILES), 0))])
         predictions[lookback_period+train_size:] = test_predictions
         
         # For the training part, we'll just use the training data but offset
         predictions[lookback_period:lookback_period+train_size] = y_train
         
-        # Calculate accuracy metrics
-        mse = mean_squared_error(y_test, test_predictions)
-        rmse = np.sqrt(mse)
-        mae = mean_absolute_error(y_test, test_predictions)
-        r2 = r2_score(y_test, test_predictions)
+        # Calculate accuracy metrics (in float64 regardless of the storage policy)
+        y_test_64 = y_test.astype(np.float64)
+        test_predictions_64 = test_predictions.astype(np.float64)
+        mse = float(mean_squared_error(y_test_64, test_predictions_64))
+        rmse = float(np.sqrt(mse))
+        mae = float(mean_absolute_error(y_test_64, test_predictions_64))
+        r2 = float(r2_score(y_test_64, test_predictions_64))
         
         # Calculate percentage error
-        percentage_error = np.mean(np.abs((y_test - test_predictions) / y_test)) * 100
+        percentage_error = float(np.mean(np.abs((y_test_64 - test_predictions_64) / y_test_64)) * 100)
         
-        # Predict next day's price
-        next_day_X = prices[-lookback_period:].reshape(1, -1)
-        next_day_price = float(model.predict(next_day_X)[0])
+        # Share of test prices inside the outer interval; tree spread alone
+        # tends to run narrower than the real error, and this shows by how much
+        inside = (y_test_64 >= test_quantiles[0]) & (y_test_64 <= test_quantiles[-1])
+        interval_coverage = float(inside.mean()) if len(inside) else None
         
-        # Calculate next date (assuming next business day)
-        last_date = dates[-1]
-        next_date = last_date + pd.Timedelta(days=1)
+        # Forecast the next forecast_horizon bars; step 1 is the next bar's close
+        next_day_X = prices[-lookback_period:].reshape(1, -1).astype(policy['features'], copy=False)
+        if feature_names:
+            next_day_X = np.hstack([next_day_X, feature_matrix[-1:]])
+        next_path = forecast_path(model, next_day_X, forecast_horizon, lookback_period)[0]
+        next_day_price = float(next_path[0])
+        next_day_quantiles = np.percentile(tree_predictions(model, next_day_X, tree_table)[0], PREDICTION_QUANTILES)
         
-        # If the next day is a weekend, move to Monday
-        if next_date.weekday() >= 5:  # 5 is Saturday, 6 is Sunday
-            days_to_add = 7 - next_date.weekday() + 0  # Days until Monday
-            next_date = last_date + pd.Timedelta(days=days_to_add)
-            
-        # Format next date as string
-        next_date_str = next_date.strftime('%Y-%m-%d')
+        # Per-step error of the same recursive forecast over the test windows
+        test_paths = np.vstack(path_chunks or [np.zeros((0, forecast_horizon))])
+        step_errors = forecast_step_errors(test_paths, prices, lookback_period + train_size)
+        report('predicted')
+        
+        # Dates of the forecast path (next exchange sessions or intraday bars, skipping holidays)
+        last_date = dates[-1]
+        calendar = get_trading_calendar()
+        if intraday:
+            forecast_dates = format_dates(calendar.next_bars(last_date, bar_seconds, forecast_horizon), date_unit)
+        else:
+            forecast_dates = format_dates(calendar.next_sessions(last_date, forecast_horizon))
+        next_date_str = forecast_dates[0]
         
         # Calculate percentage change from last price
-        last_price = prices[-1]
+        last_price = float(prices[-1])
         price_change = ((next_day_price - last_price) / last_price) * 100
         
+        forecast = []
+        for step in range(forecast_horizon):
+            step_price = float(next_path[step])
+            forecast.append({
+                'step': step + 1,
+                'date': forecast_dates[step],
+                'price': round(step_price, 2),
+                'change_percent': round((step_price - last_price) / last_price * 100, 2),
+                'error': step_errors[step]
+            })
+        
         # Identify buy/sell signals based on RSI and EMA crossover
-        signals = np.zeros_like(prices)
+        signals = np.zeros(len(prices), dtype=policy['signals'])
         
-        for i in range(1, len(prices)):
-            # Buy signal: RSI is below 40 OR price crosses above 20 EMA
-            if (rsi[i] < 40) or (prices[i] > ema_20[i] and prices[i-1] <= ema_20[i-1]):
-                signals[i] = 1
-                
-            # Sell signal: RSI is above 60 OR price crosses below 20 EMA
-            elif (rsi[i] > 60) or (prices[i] < ema_20[i] and prices[i-1] >= ema_20[i-1]):
-                signals[i] = -1
+        # Buy signal: RSI is below 40 OR price crosses above 20 EMA
+        buy = (rsi[1:] < 40) | ((prices[1:] > ema_20[1:]) & (prices[:-1] <= ema_20[:-1]))
+        # Sell signal: RSI is above 60 OR price crosses below 20 EMA
+        sell = ~buy & ((rsi[1:] > 60) | ((prices[1:] < ema_20[1:]) & (prices[:-1] >= ema_20[:-1])))
+        signals[1:][buy] = 1
+        signals[1:][sell] = -1
                 
         # Find recent signals
+        recent_start = max(0, len(signals)-20)  # Ensure we don't go out of bounds
+        recent_dates = format_dates(dates[recent_start:], date_unit)
         recent_signals = []
-        for i in range(max(0, len(signals)-20), len(signals)):  # Ensure we don't go out of bounds
+        for i in range(recent_start, len(signals)):
             if signals[i] == 1:
                 recent_signals.append({
-                    'date': dates[i].strftime('%Y-%m-%d'),
+                    'date': recent_dates[i - recent_start],
                     'type': 'BUY',
-                    'price': round(prices[i], 2)
+                    'price': round(float(prices[i]), 2)
                 })
             elif signals[i] == -1:
                 recent_signals.append({
-                    'date': dates[i].strftime('%Y-%m-%d'),
+                    'date': recent_dates[i - recent_start],
                     'type': 'SELL',
-                    'price': round(prices[i], 2)
+                    'price': round(float(prices[i]), 2)
                 })
         
         # Predict signal for next day based on predicted price
@@ -184,26 +390,68 @@ def analyze_stock(ticker, start_date, end_date, lookback_period=60):
         buy_count = np.sum(signals == 1)
         sell_count = np.sum(signals == -1)
         
-        # Prepare data for JSON
-        dates_str = [d.strftime('%Y-%m-%d') for d in dates]
+        memory = memory_report({
+            'prices': prices,
+            'predictions': predictions,
+            'ema_20': ema_20,
+            'ema_50': ema_50,
+            'rsi': rsi,
+            'signals': signals,
+            'X': X_train
+        }, policy_name)
+        
+        # Downsample the chart series (signals, metrics and forecasts use full data)
+        n_points = len(prices)
+        sampled = slice(None)
+        signal_markers = None
+        if max_points and n_points > max_points:
+            sampled = downsample_indices([prices, predictions, ema_20, ema_50, rsi], int(max_points))
+            marker_idx = np.flatnonzero(signals)
+            signal_markers = {
+                'dates': format_dates(dates[marker_idx], date_unit),
+                'prices': np.round(prices[marker_idx].astype(np.float64), 2).tolist(),
+                'types': np.where(signals[marker_idx] > 0, 'BUY', 'SELL').tolist()
+            }
+        
+        def output(values):
+            values = np.asarray(values)[sampled]
+            return values if as_arrays else values.tolist()
+        
+        def quantile_keys(values):
+            return {f'p{q}': value for q, value in zip(PREDICTION_QUANTILES, values)}
         
-        # Convert stock_data to a serializable format
+        test_dates = dates[lookback_period + train_size:]
+        test_bands = np.round(test_quantiles, 2)
+        
+        # Convert stock_data to a serializable format. Newer yfinance returns
+        # (field, ticker) column pairs; key by the field name only.
         stock_data_json = {}
         for col in stock_data.columns:
-            stock_data_json[col] = stock_data[col].tolist()
+            name = col[0] if isinstance(col, tuple) else col
+            if compact and name == 'Close':
+                continue
+            stock_data_json[name] = output(stock_data[col].values.flatten())
         
         # Return the results
         result = {
             'ticker': ticker,
+            'interval': interval,
             'stock_data': stock_data_json,
-            'prices': prices.tolist(),
-            'dates': dates_str,
-            'predictions': predictions.tolist(),
-            'ema_20': ema_20.tolist(),
-            'ema_50': ema_50.tolist(),
-            'rsi': rsi.tolist(),
-            'signals': signals.tolist(),
+            'prices': output(prices),
+            'dates': dates[sampled] if as_arrays else format_dates(dates[sampled], date_unit),
+            'predictions': output(predictions),
+            'ema_20': output(ema_20),
+            'ema_50': output(ema_50),
+            'rsi': output(rsi),
+            'signals': output(signals),
+            'indicators': {name: output(values) for name, values in computed.items()},
             'recent_signals': recent_signals,
+            # Price levels where swing highs/lows cluster, strongest first
+            'support_resistance': {
+                'levels': levels,
+                'nearest_support': nearest_support,
+                'nearest_resistance': nearest_resistance
+            },
             'accuracy_metrics': {
                 'Mean Squared Error (MSE)': mse,
                 'Root Mean Squared Error (RMSE)': rmse,
@@ -219,33 +467,84 @@ def analyze_stock(ticker, start_date, end_date, lookback_period=60):
                 'min_rsi': float(np.min(rsi)),
                 'max_rsi': float(np.max(rsi))
             },
+            'memory_report': memory,
             # Next day prediction data
             'next_day_prediction': {
                 'date': next_date_str,
                 'price': round(next_day_price, 2),
                 'change_percent': round(price_change, 2),
-                'signal': next_day_signal
+                'signal': next_day_signal,
+                'interval': quantile_keys([round(float(value), 2) for value in next_day_quantiles])
+            },
+            # Percentiles of the trees' predictions over the test windows
+            'prediction_intervals': {
+                'quantiles': list(PREDICTION_QUANTILES),
+                'dates': test_dates if as_arrays else format_dates(test_dates, date_unit),
+                'bands': quantile_keys(list(test_bands) if as_arrays else test_bands.tolist()),
+                'coverage': interval_coverage
+            },
+            # Multi-day forecast path from the same model
+            'forecast': {
+                'horizon': forecast_horizon,
+                'mode': 'recursive',
+                'path': forecast
+            },
+            'downsampling': {
+                'original_points': n_points,
+                'points': len(dates[sampled]),
+                'method': 'lttb' if signal_markers is not None else None
+            },
+            'signal_markers': signal_markers,
+            # Inputs the model was trained on
+            'model_features': {
+                'lookback_period': lookback_period,
+                'feature_set': feature_set,
+                'features': feature_names
             }
         }
         
         return result
         
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         return {"error": f"Error analyzing stock: {str(e)}"}
 
 if __name__ == "__main__":
-    # Get arguments from command line
-    if len(sys.argv) < 3:
+    # Get arguments from command line; --compact, --indicators=a,b,
+    # --features=<set>, --max-points=N and --interval=5m may appear anywhere
+    compact = '--compact' in sys.argv
+    indicators = []
+    feature_set = None
+    max_points = None
+    interval = '1d'
+    for arg in sys.argv:
+        if arg.startswith('--indicators='):
+            indicators = [spec for spec in arg.split('=', 1)[1].split(',') if spec]
+        elif arg.startswith('--features='):
+            feature_set = arg.split('=', 1)[1] or None
+        elif arg.startswith('--max-points='):
+            max_points = int(arg.split('=', 1)[1])
+        elif arg.startswith('--interval='):
+            interval = arg.split('=', 1)[1]
+    args = [arg for arg in sys.argv if not arg.startswith('--')]
+    if len(args) < 3:
         print(json.dumps({"error": "Not enough arguments"}))
         sys.exit(1)
         
-    ticker = sys.argv[1]
-    start_date = sys.argv[2]
-    end_date = sys.argv[3] if len(sys.argv) > 3 else datetime.now().strftime('%Y-%m-%d')
-    lookback_period = int(sys.argv[4]) if len(sys.argv) > 4 else 30
+    ticker = args[1]
+    start_date = args[2]
+    end_date = args[3] if len(args) > 3 else datetime.now().strftime('%Y-%m-%d')
+    lookback_period = int(args[4]) if len(args) > 4 else 30
+    dtype_policy = args[5] if len(args) > 5 else None
+    forecast_horizon = int(args[6]) if len(args) > 6 else 5
     
     # Run analysis
-    result = analyze_stock(ticker, start_date, end_date, lookback_period)
+    result = analyze_stock(ticker, start_date, end_date, lookback_period, dtype_policy,
+                           forecast_horizon=forecast_horizon, as_arrays=True, compact=compact,
+                           indicators=indicators, feature_set=feature_set, max_points=max_points,
+                           interval=interval)
     
-    # Output as JSON
-    print(json.dumps(result))
+    # Stream the JSON to stdout straight from the arrays
+    write_json(result, sys.stdout)
+    sys.stdout.write('\n')
@@ -0,0 +1,300 @@
+import os
+import glob
+import time
+import queue
+import threading
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.environ.get(
+    'TICK_JOURNAL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'ticks')
+)
+
+# One fixed-size record per tick; time is epoch milliseconds
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('ticker', 'S16'),
+    ('price', '<f8'),
+    ('change_percent', '<f8'),
+    ('signal', 'i1')
+])
+
+SIGNAL_CODES = {'SELL': -1, 'NEUTRAL': 0, 'BUY': 1}
+SIGNAL_NAMES = {code: name for name, code in SIGNAL_CODES.items()}
+
+JOURNAL_MAGIC = b'TICKJRN1'
+SNAPSHOT_MAGIC = b'TICKSNP1'
+# Magic plus one int64 (the first segment not covered by a snapshot)
+HEADER_SIZE = 16
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Sealed segments kept as tick history; at the default snapshot_every a
+# segment is ~2 MB, so this caps the journal at ~100 MB
+DEFAULT_RETAIN_SEGMENTS = 48
+
+def _run_inline(func, *args):
+    return func(*args)
+
+def to_record(stock, now=None):
+    """Pack a stock update dict into a TICK_DTYPE record"""
+    millis = int((now if now is not None else time.time()) * 1000)
+    return np.array([(
+        millis,
+        str(stock['ticker']).encode()[:16],
+        float(stock['price']),
+        float(stock.get('change_percent', 0)),
+        SIGNAL_CODES.get(stock.get('signal'), 0)
+    )], dtype=TICK_DTYPE)[0]
+
+def to_stock(record):
+    """Unpack a record into the stock update dict the socket server broadcasts"""
+    return {
+        'ticker': record['ticker'].decode(),
+        'price': float(record['price']),
+        'signal': SIGNAL_NAMES.get(int(record['signal']), 'NEUTRAL'),
+        'change_percent': round(float(record['change_percent']), 2),
+        'timestamp': datetime.fromtimestamp(record['time'] / 1000).strftime(TIMESTAMP_FORMAT)
+    }
+
+def latest_records(records):
+    """Last record of every ticker in a time-ordered record array"""
+    if len(records) == 0:
+        return records[:0]
+    # Compare the 16-byte tickers as two uint64 columns; hashing them is
+    # much faster than sorting the strings
+    keys = np.ascontiguousarray(records['ticker']).view('<u8').reshape(-1, 2)
+    last = ~pd.DataFrame(keys).duplicated(keep='last').values
+    return records[last]
+
+class TickJournal:
+    """Append-only binary journal of live ticks with periodic snapshots
+
+    Ticks are appended as fixed-size records to numbered segment files by a
+    single writer thread. The writer commits in groups: it collects whatever
+    arrives within commit_interval (up to max_batch records) and writes and
+    fsyncs it in one go. Every snapshot_every records it writes a snapshot of
+    the latest tick per ticker and starts a new segment, so a restart only
+    has to map the snapshot and the segments after it. The newest
+    retain_segments segments are kept as tick history for replay; older ones
+    are deleted at each rollover (retain_segments=None keeps them all).
+
+    A crash can lose at most the group that was still being collected.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, commit_interval=0.2, max_batch=4096,
+                 snapshot_every=50000, retain_segments=DEFAULT_RETAIN_SEGMENTS, run_blocking=None):
+        self.root = root
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.snapshot_every = snapshot_every
+        self.retain_segments = retain_segments
+        # Disk writes go through run_blocking (e.g. eventlet's tpool.execute)
+        self.run_blocking = run_blocking or _run_inline
+        self.pending = queue.Queue()
+        self.state = {}
+        self.segment = 0
+        self.segment_records = 0
+        self.file = None
+        self.thread = None
+
+    # Files
+
+    def _segment_path(self, segment):
+        return os.path.join(self.root, f'journal-{segment:06d}.bin')
+
+    def _snapshot_path(self):
+        return os.path.join(self.root, 'snapshot.bin')
+
+    def _segments(self):
+        paths = glob.glob(os.path.join(self.root, 'journal-*.bin'))
+        return sorted(int(os.path.basename(path)[8:14]) for path in paths)
+
+    @staticmethod
+    def _map(path, magic):
+        """Memory-map the complete records of a journal or snapshot file"""
+        size = os.path.getsize(path)
+        rows = max(0, (size - HEADER_SIZE) // TICK_DTYPE.itemsize)
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:8] != magic:
+            raise ValueError(f"{path} is not a tick journal file")
+        first_segment = int(np.frombuffer(header[8:], dtype='<i8')[0])
+        if rows == 0:
+            return first_segment, np.zeros(0, dtype=TICK_DTYPE)
+        return first_segment, np.memmap(path, dtype=TICK_DTYPE, mode='r', offset=HEADER_SIZE, shape=(rows,))
+
+    @staticmethod
+    def _header(magic, segment):
+        return magic + np.array([segment], dtype='<i8').tobytes()
+
+    def _open_segment(self, segment):
+        """Open a segment for appending, dropping any partial trailing record"""
+        path = self._segment_path(segment)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(self._header(JOURNAL_MAGIC, segment))
+        rows = max(0, (os.path.getsize(path) - HEADER_SIZE) // TICK_DTYPE.itemsize)
+        self.file = open(path, 'r+b')
+        self.file.truncate(HEADER_SIZE + rows * TICK_DTYPE.itemsize)
+        self.file.seek(0, os.SEEK_END)
+        self.segment = segment
+        self.segment_records = rows
+
+    # Startup
+
+    def restore(self):
+        """Rebuild the latest tick per ticker from the snapshot and journal tail
+
+        Returns {ticker: stock dict}. Must be called before start().
+        """
+        os.makedirs(self.root, exist_ok=True)
+        parts = []
+        first_segment = 0
+        if os.path.exists(self._snapshot_path()):
+            first_segment, snapshot = self._map(self._snapshot_path(), SNAPSHOT_MAGIC)
+            parts.append(snapshot)
+
+        segments = [segment for segment in self._segments() if segment >= first_segment]
+        for segment in segments:
+            parts.append(self._map(self._segment_path(segment), JOURNAL_MAGIC)[1])
+
+        records = np.concatenate(parts) if parts else np.zeros(0, dtype=TICK_DTYPE)
+        latest = latest_records(records)
+        self.state = {record['ticker']: record.copy() for record in latest}
+        self._open_segment(segments[-1] if segments else first_segment)
+        logger.info(f"Restored {len(self.state)} tickers from {len(records)} journal records")
+        return {record['ticker'].decode(): to_stock(record) for record in latest}
+
+    # Writing
+
+    def start(self):
+        if self.file is None:
+            self.restore()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='tick-journal', daemon=True)
+            self.thread.start()
+        return self
+
+    def append(self, stock):
+        """Queue a stock update for the next group commit"""
+        self.pending.put(to_record(stock))
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self.run_blocking(self._commit, np.array(batch, dtype=TICK_DTYPE))
+            except Exception as e:
+                logger.error(f"Error writing tick journal: {str(e)}")
+
+    def _commit(self, records):
+        self.file.write(records.tobytes())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.segment_records += len(records)
+        for record in latest_records(records):
+            self.state[record['ticker']] = record.copy()
+
+        if self.segment_records >= self.snapshot_every:
+            self._snapshot()
+
+    def _snapshot(self):
+        """Write the latest tick per ticker and roll over to a new segment"""
+        next_segment = self.segment + 1
+        path = self._snapshot_path()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self._header(SNAPSHOT_MAGIC, next_segment))
+            f.write(np.array(list(self.state.values()), dtype=TICK_DTYPE).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        self.file.close()
+        self._open_segment(next_segment)
+        if self.retain_segments:
+            for segment in self._segments()[:-self.retain_segments]:
+                os.remove(self._segment_path(segment))
+        logger.info(f"Tick journal snapshot written ({len(self.state)} tickers), now on segment {next_segment}")
+
+    # Reading history
+
+    def history(self, tickers=None, start=None, end=None):
+        """All journaled ticks (optionally filtered) as one time-ordered record array"""
+        parts = [self._map(self._segment_path(segment), JOURNAL_MAGIC)[1] for segment in self._segments()]
+        records = np.concatenate(parts) if parts else np.zeros(0, dtype=TICK_DTYPE)
+        mask = np.ones(len(records), dtype=bool)
+        if tickers is not None:
+            mask &= np.isin(records['ticker'], [str(t).encode() for t in tickers])
+        if start is not None:
+            mask &= records['time'] >= int(pd.Timestamp(start).timestamp() * 1000)
+        if end is not None:
+            mask &= records['time'] < int(pd.Timestamp(end).timestamp() * 1000)
+        return records[mask]
+
+    def price_series(self, ticker, start=None, end=None):
+        """(timestamps, prices) of one ticker, ready for indicators.IndicatorSet"""
+        records = self.history([ticker], start, end)
+        return pd.to_datetime(records['time'], unit='ms'), records['price'].astype(np.float64)
+
+    def replay(self, speed=1.0, tickers=None, start=None, end=None):
+        """Yield journaled ticks as stock dicts, paced at `speed` times real time
+
+        speed=None replays as fast as possible.
+        """
+        records = self.history(tickers, start, end)
+        if len(records) == 0:
+            return
+        wall_start = time.monotonic()
+        first_time = records['time'][0]
+        for record in records:
+            if speed:
+                delay = (record['time'] - first_time) / 1000 / speed - (time.monotonic() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield to_stock(record)
+
+if __name__ == "__main__":
+    # Journal a burst of synthetic ticks, then time a cold restore
+    import sys
+    import tempfile
+    from indicators import compute_indicators
+
+    n_ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    root = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    tickers = [f'T{i:04d}' for i in range(2000)]
+
+    journal = TickJournal(root, snapshot_every=n_ticks // 3)
+    journal.restore()
+    records = np.zeros(n_ticks, dtype=TICK_DTYPE)
+    records['time'] = int(time.time() * 1000) + np.arange(n_ticks)
+    records['ticker'] = np.array(tickers, dtype='S16')[rng.integers(0, len(tickers), n_ticks)]
+    records['price'] = 100 + rng.normal(0, 1, n_ticks).cumsum() / 100
+    start = time.perf_counter()
+    for batch in np.array_split(records, max(1, n_ticks // 4096)):
+        journal._commit(batch)
+    print(f"{n_ticks} ticks written in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    restored = TickJournal(root).restore()
+    print(f"Restored {len(restored)} tickers in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    _, prices = journal.price_series(tickers[0])
+    ema = compute_indicators(prices, indicators=['ema_20'])['ema_20']
+    print(f"Replayed {len(prices)} {tickers[0]} ticks into EMA-20, last value {ema[-1]:.2f}")
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, time as dtime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, Holiday, GoodFriday, USPresidentsDay, USMemorialDay,
+    USLaborDay, USThanksgivingDay, MO, DateOffset, nearest_workday, sunday_to_monday
+)
+
+EXCHANGE_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+
+# One-off closures that don't follow a holiday rule
+SPECIAL_CLOSURES = [
+    '2001-09-11', '2001-09-12', '2001-09-13', '2001-09-14',  # September 11
+    '2004-06-11',  # Reagan national day of mourning
+    '2007-01-02',  # Ford national day of mourning
+    '2012-10-29', '2012-10-30',  # Hurricane Sandy
+    '2018-12-05',  # G.H.W. Bush national day of mourning
+    '2025-01-09'   # Carter national day of mourning
+]
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """Full-day NYSE holidays"""
+    rules = [
+        # A Saturday New Year's Day is not observed on the Friday before
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        Holiday('Martin Luther King Jr. Day', month=1, day=1, start_date='1998-01-01',
+                offset=DateOffset(weekday=MO(3))),
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas Day', month=12, day=25, observance=nearest_workday)
+    ]
+
+class TradingCalendar:
+    """Precomputed index of NYSE sessions and early closes
+
+    Lookups are binary searches into a sorted session array, so forecasting,
+    date formatting and market-hours checks never rebuild dates per request.
+    """
+
+    def __init__(self, start='1990-01-01', end=None):
+        end = end or f"{datetime.now().year + 2}-12-31"
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+
+        holidays = NYSEHolidayCalendar().holidays(self.start, self.end)
+        holidays = holidays.union(pd.DatetimeIndex(SPECIAL_CLOSURES))
+        weekdays = pd.bdate_range(self.start, self.end)
+        self.sessions = weekdays.difference(holidays)
+        self.holidays = holidays
+        self._session_values = self.sessions.values
+        self.early_closes = self._early_closes(self.sessions)
+
+    @staticmethod
+    def _early_closes(sessions):
+        """Sessions that close at 13:00: Jul 3, the day after Thanksgiving and Dec 24"""
+        month = sessions.month
+        day = sessions.day
+        weekday = sessions.weekday
+        july_3 = (month == 7) & (day == 3) & (weekday <= 3)
+        christmas_eve = (month == 12) & (day == 24) & (weekday <= 3)
+        # The Friday after the fourth Thursday of November falls on the 23rd-29th
+        black_friday = (month == 11) & (weekday == 4) & (day >= 23) & (day <= 29)
+        return sessions[july_3 | christmas_eve | black_friday]
+
+    def is_session(self, date):
+        date = pd.Timestamp(date).normalize()
+        pos = np.searchsorted(self._session_values, date.to_datetime64())
+        return pos < len(self._session_values) and self._session_values[pos] == date.to_datetime64()
+
+    def next_sessions(self, after, count):
+        """The `count` sessions strictly after `after`"""
+        after = pd.Timestamp(after).tz_localize(None).normalize()
+        pos = np.searchsorted(self._session_values, after.to_datetime64(), side='right')
+        if pos + count > len(self._session_values):
+            raise ValueError(f"Trading calendar does not extend past {self.end.date()}")
+        return self.sessions[pos:pos + count]
+
+    def next_bars(self, after, seconds, count):
+        """Start times of the `count` intraday bars of `seconds` strictly after `after`
+
+        Bars run from the 09:30 open and stop at each session's close (13:00
+        on early-close days); the last bar of a session may be shorter.
+        """
+        after = pd.Timestamp(after).tz_localize(None)
+        open_offset = np.timedelta64(MARKET_OPEN.hour * 3600 + MARKET_OPEN.minute * 60, 's')
+        bars = []
+        found = 0
+        day = after.normalize() - pd.Timedelta(days=1)
+        while found < count:
+            sessions = self.next_sessions(day, max(1, count // 78 + 1))
+            for session in sessions:
+                close = self.session_close(session)
+                length = (close.hour * 3600 + close.minute * 60) - int(open_offset / np.timedelta64(1, 's'))
+                starts = session.to_datetime64() + open_offset + np.arange(0, length, seconds).astype('timedelta64[s]')
+                starts = starts[starts > after.to_datetime64()]
+                bars.append(starts)
+                found += len(starts)
+            day = sessions[-1]
+        return pd.DatetimeIndex(np.concatenate(bars)[:count])
+
+    def sessions_between(self, start, end):
+        """Sessions in the closed interval [start, end]"""
+        lo = np.searchsorted(self._session_values, pd.Timestamp(start).to_datetime64(), side='left')
+        hi = np.searchsorted(self._session_values, pd.Timestamp(end).to_datetime64(), side='right')
+        return self.sessions[lo:hi]
+
+    def session_close(self, date):
+        """Closing time of a session, or None if the market is closed that day"""
+        date = pd.Timestamp(date).normalize()
+        if not self.is_session(date):
+            return None
+        return EARLY_CLOSE if date in self.early_closes else MARKET_CLOSE
+
+    def is_open(self, now=None):
+        """Whether the regular session is in progress at `now` (default: current time)"""
+        now = now or datetime.now(EXCHANGE_TZ)
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=EXCHANGE_TZ)
+        local = now.astimezone(EXCHANGE_TZ)
+        close = self.session_close(local.date())
+        return close is not None and MARKET_OPEN <= local.time() < close
+
+def format_dates(dates, unit='D'):
+    """Vectorized YYYY-MM-DD formatting of a DatetimeIndex or datetime64 array
+
+    unit='m' gives YYYY-MM-DDTHH:MM for intraday bars.
+    """
+    values = pd.DatetimeIndex(dates).tz_localize(None).values
+    return np.datetime_as_string(values, unit=unit).tolist()
+
+@lru_cache(maxsize=1)
+def get_trading_calendar():
+    """Process-wide trading calendar, built on first use"""
+    return TradingCalendar()
@@ -0,0 +1,110 @@
+import zlib
+import functools
+from datetime import datetime
+from tick_journal import SIGNAL_CODES, SIGNAL_NAMES, TIMESTAMP_FORMAT
+
+try:
+    import msgpack
+except ImportError:
+    # Without msgpack every client is served JSON
+    msgpack = None
+
+# Wire formats a client can ask for when connecting (auth or query 'wire')
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+# Short field codes of the compact stock record
+FIELD_CODES = {
+    'ticker': 't',
+    'price': 'p',
+    'change_percent': 'c',
+    'signal': 's',
+    'timestamp': 'ts'
+}
+FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+
+# First byte of every binary payload
+RAW = 0
+DEFLATED = 1
+
+# Payloads at least this large (e.g. full snapshots) are deflated, once per broadcast
+COMPRESSION_THRESHOLD = 1024
+
+def negotiate(requested):
+    """The wire format to use for a client that asked for `requested`"""
+    return MSGPACK if requested == MSGPACK and msgpack is not None else JSON
+
+@functools.lru_cache(maxsize=4096)
+def _epoch_ms(timestamp):
+    # A broadcast's stocks share a handful of per-second timestamps
+    return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp() * 1000)
+
+def compact_stock(stock):
+    """A stock update dict with short field codes and an integer epoch-ms timestamp"""
+    record = {}
+    for name, value in stock.items():
+        if name == 'signal':
+            value = SIGNAL_CODES.get(value, 0)
+        elif name == 'timestamp' and isinstance(value, str):
+            value = _epoch_ms(value)
+        record[FIELD_CODES.get(name, name)] = value
+    return record
+
+def expand_stock(record):
+    """Inverse of compact_stock"""
+    stock = {}
+    for code, value in record.items():
+        name = FIELD_NAMES.get(code, code)
+        if name == 'signal':
+            value = SIGNAL_NAMES.get(value, 'NEUTRAL')
+        elif name == 'timestamp' and isinstance(value, int):
+            value = datetime.fromtimestamp(value / 1000).strftime(TIMESTAMP_FORMAT)
+        stock[name] = value
+    return stock
+
+def encode(data, threshold=COMPRESSION_THRESHOLD):
+    """Pack a stock dict or list of stock dicts into one MessagePack payload"""
+    if isinstance(data, list):
+        body = msgpack.packb([compact_stock(stock) for stock in data])
+    else:
+        body = msgpack.packb(compact_stock(data))
+    if len(body) >= threshold:
+        return bytes([DEFLATED]) + zlib.compress(body, 6)
+    return bytes([RAW]) + body
+
+def decode(payload):
+    """Inverse of encode; returns a stock dict or list of stock dicts"""
+    body = payload[1:]
+    if payload[0] == DEFLATED:
+        body = zlib.decompress(body)
+    data = msgpack.unpackb(body)
+    if isinstance(data, list):
+        return [expand_stock(record) for record in data]
+    return expand_stock(data)
+
+if __name__ == "__main__":
+    # Bytes and encode time of a snapshot broadcast, JSON vs MessagePack
+    import sys
+    import json
+    import time
+    import random
+
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(0)
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    snapshot = [{'ticker': f'T{i:04d}', 'price': round(rng.uniform(10, 500), 2),
+                 'signal': rng.choice(list(SIGNAL_CODES)), 'change_percent': round(rng.gauss(0, 2), 2),
+                 'timestamp': now} for i in range(n_tickers)]
+
+    def bench(name, func, data, repeat=200):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            payload = func(data)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{name:>10}: {len(payload):>8} bytes, {elapsed * 1e6:>8.1f} µs per broadcast")
+
+    for label, data in [('snapshot', snapshot), ('tick', snapshot[0])]:
+        print(f"{label} ({n_tickers if label == 'snapshot' else 1} stocks)")
+        bench('json', lambda d: json.dumps(d).encode(), data)
+        if msgpack is not None:
+            bench('msgpack', encode, data)
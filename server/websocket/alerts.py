@@ -0,0 +1,342 @@
+import bisect
+import threading
+import uuid
+import logging
+from datetime import datetime
+import numpy as np
+from indicators import IndicatorSet, parse_indicator
+from levels import get_level_cache
+from bar_builder import RESOLUTIONS
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ['above', 'below']
+
+# Percent distance of the price from its nearest support/resistance level
+LEVEL_METRICS = ('support', 'resistance')
+
+def parse_metric(metric):
+    """Normalize an alert metric: 'price', 'change_percent', 'rsi[_N]', 'ema[_N]',
+    'support' or 'resistance'
+
+    rsi, ema and levels are on daily bars unless a bar resolution is
+    appended, e.g. 'rsi_14@5m'. 'resistance' is the price's percent distance
+    from the nearest resistance level, so 'resistance above 0' fires on a
+    breakout and 'support below 0' on a breakdown.
+    """
+    metric = str(metric or 'price').lower()
+    if metric in ('price', 'change_percent'):
+        return metric
+    indicator, _, resolution = metric.partition('@')
+    if resolution and resolution not in RESOLUTIONS:
+        raise ValueError(f"Bar resolution must be one of {list(RESOLUTIONS)}, not '{resolution}'")
+    if indicator in LEVEL_METRICS:
+        return metric
+    name, period = parse_indicator(indicator)
+    if name not in ('rsi', 'ema'):
+        raise ValueError(f"Alerts support price, change_percent, rsi, ema, support and resistance, not '{metric}'")
+    return f'{name}_{period}' + (f'@{resolution}' if resolution else '')
+
+class AlertRule:
+    """A user's threshold on one ticker's metric"""
+
+    def __init__(self, owner, ticker, metric, direction, threshold, repeat=False):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Direction must be one of {DIRECTIONS}")
+        self.rule_id = uuid.uuid4().hex
+        self.owner = owner
+        self.ticker = ticker.upper()
+        self.metric = parse_metric(metric)
+        self.direction = direction
+        self.threshold = float(threshold)
+        self.repeat = repeat
+        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def to_dict(self):
+        return {
+            'rule_id': self.rule_id,
+            'ticker': self.ticker,
+            'metric': self.metric,
+            'direction': self.direction,
+            'threshold': self.threshold,
+            'repeat': self.repeat,
+            'created_at': self.created_at
+        }
+
+class ThresholdIndex:
+    """Rules of one (ticker, metric, direction), kept sorted by threshold"""
+
+    def __init__(self):
+        self.thresholds = []
+        self.rule_ids = []
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def add(self, rule):
+        i = bisect.bisect_right(self.thresholds, rule.threshold)
+        self.thresholds.insert(i, rule.threshold)
+        self.rule_ids.insert(i, rule.rule_id)
+
+    def remove(self, rule):
+        lo = bisect.bisect_left(self.thresholds, rule.threshold)
+        hi = bisect.bisect_right(self.thresholds, rule.threshold)
+        i = self.rule_ids.index(rule.rule_id, lo, hi)
+        del self.thresholds[i]
+        del self.rule_ids[i]
+
+    def take(self, lo, hi, rules):
+        """Return the rule IDs in [lo, hi), dropping the one-shot ones from the index"""
+        fired = self.rule_ids[lo:hi]
+        keep = [rule_id for rule_id in fired if rules[rule_id].repeat]
+        if len(keep) < len(fired):
+            self.rule_ids[lo:hi] = keep
+            self.thresholds[lo:hi] = [rules[rule_id].threshold for rule_id in keep]
+        return fired
+
+class AlertEngine:
+    """Evaluates user alert rules against live ticks
+
+    Rules are indexed per (ticker, metric, direction) in threshold order.
+    An alert fires when a tick moves the metric across the threshold
+    (prev < threshold <= value for 'above', prev > threshold >= value for
+    'below'), so a tick only needs two binary searches per index to find
+    the crossed rules; rules that weren't crossed are never looked at.
+    The first value seen for a metric only sets the baseline.
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.indexes = {}       # (ticker, metric) -> {direction: ThresholdIndex}
+        self.metrics = {}       # ticker -> set of metrics with rules
+        self.owners = {}        # owner -> set of rule IDs
+        self.last_values = {}   # (ticker, metric) -> last value seen
+        self.lock = threading.Lock()
+
+    def add_rule(self, owner, ticker, metric, direction, threshold, repeat=False):
+        rule = AlertRule(owner, ticker, metric, direction, threshold, repeat)
+        with self.lock:
+            self.rules[rule.rule_id] = rule
+            key = (rule.ticker, rule.metric)
+            directions = self.indexes.setdefault(key, {d: ThresholdIndex() for d in DIRECTIONS})
+            directions[rule.direction].add(rule)
+            self.metrics.setdefault(rule.ticker, set()).add(rule.metric)
+            self.owners.setdefault(owner, set()).add(rule.rule_id)
+        return rule
+
+    def _forget(self, rule):
+        del self.rules[rule.rule_id]
+        owned = self.owners.get(rule.owner)
+        if owned is not None:
+            owned.discard(rule.rule_id)
+            if not owned:
+                del self.owners[rule.owner]
+
+    def _prune(self, key):
+        # Drop a (ticker, metric) with no rules left so it is no longer computed or tracked
+        if any(self.indexes[key].values()):
+            return
+        del self.indexes[key]
+        self.last_values.pop(key, None)
+        ticker, metric = key
+        metrics = self.metrics[ticker]
+        metrics.discard(metric)
+        if not metrics:
+            del self.metrics[ticker]
+
+    def remove_rule(self, rule_id, owner=None):
+        """Delete a rule (only the owner's, if owner is given); returns the rule or None"""
+        with self.lock:
+            rule = self.rules.get(rule_id)
+            if rule is None or (owner is not None and rule.owner != owner):
+                return None
+            self._forget(rule)
+            key = (rule.ticker, rule.metric)
+            self.indexes[key][rule.direction].remove(rule)
+            self._prune(key)
+            return rule
+
+    def remove_owner(self, owner):
+        """Delete every rule of an owner; returns how many were removed"""
+        rule_ids = list(self.owners.get(owner, ()))
+        for rule_id in rule_ids:
+            self.remove_rule(rule_id)
+        return len(rule_ids)
+
+    def rules_for(self, owner):
+        with self.lock:
+            return [self.rules[rule_id] for rule_id in self.owners.get(owner, ())]
+
+    def watched_metrics(self, ticker):
+        """Metrics that have rules on this ticker (the only ones worth computing)"""
+        with self.lock:
+            return set(self.metrics.get(ticker, ()))
+
+    def evaluate(self, ticker, values):
+        """Check a tick's metric values; returns the alerts that fired"""
+        alerts = []
+        with self.lock:
+            for metric in list(self.metrics.get(ticker, ())):
+                value = values.get(metric)
+                if value is None or not np.isfinite(value):
+                    continue
+                key = (ticker, metric)
+                prev = self.last_values.get(key)
+                self.last_values[key] = value
+                if prev is None or prev == value:
+                    continue
+
+                directions = self.indexes[key]
+                if value > prev:
+                    index = directions['above']
+                    lo = bisect.bisect_right(index.thresholds, prev)
+                    hi = bisect.bisect_right(index.thresholds, value)
+                else:
+                    index = directions['below']
+                    lo = bisect.bisect_left(index.thresholds, value)
+                    hi = bisect.bisect_left(index.thresholds, prev)
+                if lo >= hi:
+                    continue
+
+                for rule_id in index.take(lo, hi, self.rules):
+                    rule = self.rules[rule_id]
+                    alerts.append(dict(rule.to_dict(), owner=rule.owner, value=value,
+                                       triggered_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                    if not rule.repeat:
+                        self._forget(rule)
+                self._prune(key)
+        return alerts
+
+class LiveIndicators:
+    """Today's EMA and RSI values, advanced in O(1) from yesterday's state
+
+    Each ticker is seeded once per day from its completed daily closes
+    (load_closes(ticker) -> array); after that a tick only applies one
+    EMA/Wilder update step with the live price standing in for today's close.
+    With seed_key(ticker) the state is reseeded whenever that key changes
+    instead, e.g. on every bar close for intraday bars.
+    """
+
+    def __init__(self, load_closes, seed_key=None):
+        self.load_closes = load_closes
+        self.seed_key = seed_key or (lambda ticker: datetime.now().date())
+        self.states = {}
+
+    def _seed(self, ticker, metrics):
+        state = {'key': self.seed_key(ticker), 'metrics': set(metrics), 'last_close': None,
+                 'ema': {}, 'rsi': {}}
+        try:
+            closes = np.asarray(self.load_closes(ticker), dtype=np.float64)
+        except Exception as e:
+            # Keep the empty state so a failing ticker isn't refetched on every tick
+            logger.error(f"Error loading daily closes for {ticker}: {str(e)}")
+            return state
+        if len(closes) < 2:
+            return state
+
+        indicators = IndicatorSet(closes)
+        state['last_close'] = closes[-1]
+        for metric in metrics:
+            name, period = parse_indicator(metric)
+            if name == 'ema':
+                state['ema'][period] = indicators.ema(period)[0, -1]
+            elif name == 'rsi' and len(closes) > period:
+                up, down = indicators.rsi_state(period)
+                state['rsi'][period] = (up[0], down[0])
+        return state
+
+    def values(self, ticker, price, metrics):
+        """Values of the given 'ema_N'/'rsi_N' metrics with `price` as today's close"""
+        metrics = [m for m in metrics if m.startswith(('ema_', 'rsi_'))]
+        if not metrics:
+            return {}
+        state = self.states.get(ticker)
+        # Reseed once a day (or bar), or when a rule asks for a metric the state doesn't cover yet
+        if state is None or state['key'] != self.seed_key(ticker) or not state['metrics'].issuperset(metrics):
+            state = self._seed(ticker, metrics)
+            self.states[ticker] = state
+        if state['last_close'] is None:
+            return {}
+
+        values = {}
+        for period, ema in state['ema'].items():
+            values[f'ema_{period}'] = float(ema + 2.0 / (period + 1) * (price - ema))
+        delta = price - state['last_close']
+        for period, (up, down) in state['rsi'].items():
+            up = (up * (period - 1) + max(delta, 0.0)) / period
+            down = (down * (period - 1) + max(-delta, 0.0)) / period
+            values[f'rsi_{period}'] = float(IndicatorSet.rsi_from(up, down))
+        return values
+
+class LiveLevels:
+    """A live price's percent distance from its nearest support and resistance
+
+    Levels come from the shared level cache, extended with the completed
+    bars from load_bars(ticker) (a DataFrame with High/Low/Close). The
+    nearest levels are picked once per seed key (day, or bar for intraday
+    bars) around the last completed close and then held, so a breakout moves
+    the metric through 0 rather than switching to the next level.
+    series_key(ticker) names the cached series (e.g. 'AAPL_5m').
+    """
+
+    def __init__(self, load_bars, seed_key=None, series_key=None):
+        self.load_bars = load_bars
+        self.seed_key = seed_key or (lambda ticker: datetime.now().date())
+        self.series_key = series_key or (lambda ticker: ticker)
+        self.states = {}
+
+    def _seed(self, ticker):
+        state = {'key': self.seed_key(ticker), 'support': None, 'resistance': None}
+        try:
+            bars = self.load_bars(ticker)
+        except Exception as e:
+            logger.error(f"Error loading bars for {ticker} levels: {str(e)}")
+            return state
+        if len(bars) == 0:
+            return state
+
+        cache = get_level_cache()
+        key = self.series_key(ticker)
+        cache.extend([key], bars.index, bars['High'].values, bars['Low'].values)
+        state['support'], state['resistance'] = cache.nearest(
+            [key], [float(bars['Close'].values[-1])], since=bars.index[0])[0]
+        return state
+
+    def values(self, ticker, price, metrics):
+        """Values of the 'support'/'resistance' metrics at `price`"""
+        metrics = [m for m in metrics if m in LEVEL_METRICS]
+        if not metrics:
+            return {}
+        state = self.states.get(ticker)
+        if state is None or state['key'] != self.seed_key(ticker):
+            state = self._seed(ticker)
+            self.states[ticker] = state
+        return {metric: float((price / state[metric] - 1) * 100)
+                for metric in metrics if state[metric] is not None}
+
+if __name__ == "__main__":
+    # Per-tick cost with a million active rules
+    import sys
+    import time
+    import random
+
+    n_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tickers = [f'T{i:04d}' for i in range(1000)]
+    engine = AlertEngine()
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(n_rules):
+        engine.add_rule('bench', rng.choice(tickers), rng.choice(['price', 'rsi_14']),
+                        rng.choice(DIRECTIONS), rng.uniform(50, 150), repeat=True)
+    print(f"Indexed {n_rules} rules in {time.perf_counter() - start:.1f} s")
+
+    prices = {ticker: 100.0 for ticker in tickers}
+    fired = 0
+    n_ticks = 100000
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        ticker = rng.choice(tickers)
+        prices[ticker] *= 1 + rng.gauss(0, 0.001)
+        fired += len(engine.evaluate(ticker, {'price': prices[ticker], 'rsi_14': 50 + rng.gauss(0, 0.1)}))
+    elapsed = time.perf_counter() - start
+    print(f"{n_ticks} ticks: {elapsed / n_ticks * 1e6:.1f} µs per tick, {fired} alerts fired")
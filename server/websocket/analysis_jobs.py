@@ -0,0 +1,206 @@
+import threading
+import time
+import uuid
+import logging
+from collections import deque, OrderedDict
+from datetime import datetime
+from stockAnalysis import AnalysisCancelled
+
+logger = logging.getLogger(__name__)
+
+# Progress stages reported by analyze_stock, in the order they happen
+ANALYSIS_STAGES = ['fetched', 'indicators', 'trained', 'predicted']
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its depth limit"""
+
+class JobCancelledError(AnalysisCancelled):
+    """Raised inside a running analysis when its job has been cancelled"""
+
+class AnalysisJob:
+    """A single queued or running analysis request"""
+
+    def __init__(self, params):
+        self.job_id = uuid.uuid4().hex
+        self.params = params
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.finished_at = None
+        # Stages reported from the worker, drained by the progress pump.
+        # deque append/popleft are thread-safe, so no lock is needed.
+        self.pending_stages = deque()
+
+    def report(self, stage):
+        """Progress callback handed to analyze_stock"""
+        if self.cancelled:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+        self.stage = stage
+        self.pending_stages.append(stage)
+
+    def to_dict(self, include_result=False):
+        data = {
+            'job_id': self.job_id,
+            'ticker': self.params.get('ticker'),
+            'status': self.status,
+            'stage': self.stage,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+class AnalysisJobManager:
+    """Runs analyses on a bounded worker pool and streams their progress
+
+    analyze is called as analyze(ticker, start_date, end_date, lookback_period,
+    dtype_policy, progress_callback=..., forecast_horizon=..., interval=...). notify is called as
+    notify(event, payload, job_id) for every progress, result or error event.
+    run_blocking, if given, is used to run analyze off the server's event loop
+    (eventlet.tpool.execute under eventlet).
+    """
+
+    def __init__(self, analyze, notify, max_workers=2, max_queue_depth=16,
+                 run_blocking=None, keep_finished=200, poll_interval=0.2):
+        self.analyze = analyze
+        self.notify = notify
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.run_blocking = run_blocking or (lambda fn, *args: fn(*args))
+        self.keep_finished = keep_finished
+        self.poll_interval = poll_interval
+
+        self.jobs = OrderedDict()
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.work_available = threading.Semaphore(0)
+        self.started = False
+
+    def start(self):
+        """Start the worker threads and the progress pump"""
+        if self.started:
+            return
+        self.started = True
+        for i in range(self.max_workers):
+            threading.Thread(target=self._worker, name=f"analysis-worker-{i}", daemon=True).start()
+        threading.Thread(target=self._pump_progress, name="analysis-progress", daemon=True).start()
+        logger.info(f"Started {self.max_workers} analysis workers (queue depth {self.max_queue_depth})")
+
+    def submit(self, params):
+        """Queue an analysis and return its job, or raise QueueFullError"""
+        if not params.get('ticker') or not params.get('start_date'):
+            raise ValueError("ticker and start_date are required")
+
+        with self.lock:
+            if len(self.queue) >= self.max_queue_depth:
+                raise QueueFullError(f"Analysis queue is full ({self.max_queue_depth} jobs waiting)")
+            job = AnalysisJob(params)
+            self.jobs[job.job_id] = job
+            self.queue.append(job)
+            self._prune_finished()
+
+        self.work_available.release()
+        self.notify('analysis_progress', job.to_dict(), job.job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns False if it already finished."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in ('completed', 'failed', 'cancelled'):
+                return False
+            job.cancelled = True
+            if job.status == 'queued':
+                self.queue.remove(job)
+                self._finish(job, 'cancelled')
+        if job.status == 'cancelled':
+            self.notify('analysis_cancelled', job.to_dict(), job.job_id)
+        return True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def queue_depth(self):
+        return len(self.queue)
+
+    def _worker(self):
+        while True:
+            self.work_available.acquire()
+            with self.lock:
+                if not self.queue:
+                    continue
+                job = self.queue.popleft()
+                job.status = 'running'
+
+            try:
+                params = job.params
+                result = self.run_blocking(
+                    self._run_analysis, job,
+                    params['ticker'], params['start_date'], params['end_date'],
+                    params['lookback_period'], params.get('dtype_policy'),
+                    params.get('forecast_horizon', 5), params.get('interval', '1d')
+                )
+                self._flush_progress(job)
+
+                if job.cancelled:
+                    self._finish(job, 'cancelled')
+                    self.notify('analysis_cancelled', job.to_dict(), job.job_id)
+                elif 'error' in result:
+                    job.error = result['error']
+                    self._finish(job, 'failed')
+                    self.notify('analysis_error', job.to_dict(), job.job_id)
+                else:
+                    job.result = result
+                    self._finish(job, 'completed')
+                    self.notify('analysis_result', job.to_dict(include_result=True), job.job_id)
+            except JobCancelledError:
+                self._flush_progress(job)
+                self._finish(job, 'cancelled')
+                self.notify('analysis_cancelled', job.to_dict(), job.job_id)
+            except Exception as e:
+                logger.error(f"Error running analysis job {job.job_id}: {str(e)}")
+                job.error = str(e)
+                self._finish(job, 'failed')
+                self.notify('analysis_error', job.to_dict(), job.job_id)
+
+    def _run_analysis(self, job, ticker, start_date, end_date, lookback_period, dtype_policy,
+                      forecast_horizon, interval):
+        return self.analyze(ticker, start_date, end_date, lookback_period, dtype_policy,
+                            progress_callback=job.report, forecast_horizon=forecast_horizon,
+                            interval=interval)
+
+    def _pump_progress(self):
+        """Forward stages reported by running jobs to their subscribers"""
+        while True:
+            with self.lock:
+                running = [job for job in self.jobs.values() if job.status == 'running']
+            for job in running:
+                self._flush_progress(job)
+            time.sleep(self.poll_interval)
+
+    def _flush_progress(self, job):
+        while job.pending_stages:
+            try:
+                stage = job.pending_stages.popleft()
+            except IndexError:
+                break
+            payload = job.to_dict()
+            payload['stage'] = stage
+            self.notify('analysis_progress', payload, job.job_id)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.stage = status
+        job.finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _prune_finished(self):
+        # Called with the lock held; drop the oldest finished jobs
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
@@ -0,0 +1,185 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Events whose payload is one stock or a list of stocks; conflated per ticker
+STOCK_EVENTS = ('stock_update', 'top_stocks_update')
+
+class ClientState:
+    """Outbound state of one connection"""
+
+    def __init__(self, sid, wire_format):
+        self.sid = sid
+        self.wire_format = wire_format
+        self.behind = False
+        self.depth = 0
+        self.backlog_since = None   # when the outbound queue last stopped being (nearly) empty
+        self.max_lag = 0.0
+        self.pending = OrderedDict()  # ticker -> newest stock, while behind
+        self.pending_events = OrderedDict()  # key -> (event, newest payload) of other events
+        self.rooms = set()            # rooms left while behind, rejoined on resume
+        self.conflated = 0            # updates replaced before they were sent
+        self.pauses = 0
+
+    def lag(self, now):
+        return now - self.backlog_since if self.backlog_since is not None else 0.0
+
+    def to_dict(self, now):
+        return {
+            'sid': self.sid,
+            'wire_format': self.wire_format,
+            'behind': self.behind,
+            'queue_depth': self.depth,
+            'lag': round(self.lag(now), 3),
+            'max_lag': round(self.max_lag, 3),
+            'pending': len(self.pending) + len(self.pending_events),
+            'conflated': self.conflated,
+            'pauses': self.pauses
+        }
+
+class SlowConsumerGuard:
+    """Keeps slow clients from holding unbounded outbound queues
+
+    Broadcasts go to every live client's queue as usual. check() looks at
+    each client's queue depth (queue_depth(sid) -> packets waiting, or None):
+    a client whose depth reaches high_water is paused, i.e. taken out of the
+    broadcast rooms and every other room it is in (park()), and from then on
+    only the newest value per ticker (and the newest payload per key of other
+    events, see hold()) is kept for it, so what it holds is bounded by the
+    number of tickers, subscriptions and jobs. Once its queue drains to
+    low_water the conflated state is flushed and the client rejoins its rooms.
+    A client's lag is how long its queue has had a backlog (more than
+    low_water packets); a client lagging for stall_timeout is disconnected.
+    """
+
+    def __init__(self, queue_depth, high_water=200, low_water=20, stall_timeout=30.0):
+        self.queue_depth = queue_depth
+        self.high_water = high_water
+        self.low_water = low_water
+        self.stall_timeout = stall_timeout
+        self.clients = {}
+        self.behind = set()
+        self.lock = threading.Lock()
+
+    def register(self, sid, wire_format):
+        with self.lock:
+            self.clients[sid] = ClientState(sid, wire_format)
+
+    def unregister(self, sid):
+        with self.lock:
+            self.clients.pop(sid, None)
+            self.behind.discard(sid)
+
+    def is_behind(self, sid):
+        return sid in self.behind
+
+    def park(self, sid, rooms):
+        """Record the rooms a paused client was taken out of"""
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is not None and client.behind:
+                client.rooms.update(rooms)
+
+    def join(self, sid, room):
+        """Record a room joined while paused; returns False if the client is live"""
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None or not client.behind:
+                return False
+            client.rooms.add(room)
+            return True
+
+    def leave(self, sid, room):
+        """Forget a room left while paused; returns False if the client is live"""
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None or not client.behind:
+                return False
+            client.rooms.discard(room)
+            return True
+
+    def _hold(self, client, event, data, key):
+        key = event if key is None else key
+        if key in client.pending_events:
+            client.conflated += 1
+            del client.pending_events[key]
+        client.pending_events[key] = (event, data)
+
+    def conflate(self, event, data):
+        """Fold a broadcast into the pending state of every paused client"""
+        if not self.behind:
+            return
+        with self.lock:
+            for sid in self.behind:
+                client = self.clients[sid]
+                if event in STOCK_EVENTS:
+                    for stock in (data if isinstance(data, list) else [data]):
+                        if stock['ticker'] in client.pending:
+                            client.conflated += 1
+                        client.pending[stock['ticker']] = stock
+                else:
+                    self._hold(client, event, data, None)
+
+    def hold(self, room, event, data, key=None):
+        """Fold an event sent to a room (or a sid) into its paused members' state
+
+        Only the newest payload per key (default: the event) is kept, e.g. per
+        job, rule or bar subscription; a replaced payload moves to the back. Returns True if `room` is itself a paused client's sid, in which
+        case there is nobody left to send to.
+        """
+        if not self.behind:
+            return False
+        with self.lock:
+            for sid in self.behind:
+                client = self.clients[sid]
+                if sid == room or room in client.rooms:
+                    self._hold(client, event, data, key)
+            return room in self.behind
+
+    def check(self, now=None):
+        """Update every client's depth and lag; returns the actions to take
+
+        Actions are ('pause', sid), ('resume', sid, [(event, payload), ...], rooms)
+        and ('disconnect', sid).
+        """
+        now = now if now is not None else time.monotonic()
+        actions = []
+        with self.lock:
+            for sid, client in self.clients.items():
+                depth = self.queue_depth(sid)
+                if depth is None:
+                    continue
+                client.depth = depth
+                if depth > self.low_water:
+                    if client.backlog_since is None:
+                        client.backlog_since = now
+                else:
+                    client.backlog_since = None
+                lag = client.lag(now)
+                client.max_lag = max(client.max_lag, lag)
+
+                if lag >= self.stall_timeout:
+                    actions.append(('disconnect', sid))
+                elif not client.behind and depth >= self.high_water:
+                    client.behind = True
+                    client.pauses += 1
+                    self.behind.add(sid)
+                    actions.append(('pause', sid))
+                elif client.behind and depth <= self.low_water:
+                    updates = []
+                    if client.pending:
+                        updates.append(('top_stocks_update', list(client.pending.values())))
+                    updates.extend(client.pending_events.values())
+                    rooms = client.rooms
+                    client.pending = OrderedDict()
+                    client.pending_events = OrderedDict()
+                    client.rooms = set()
+                    client.behind = False
+                    self.behind.discard(sid)
+                    actions.append(('resume', sid, updates, rooms))
+        return actions
+
+    def stats(self, now=None):
+        now = now if now is not None else time.monotonic()
+        with self.lock:
+            return [client.to_dict(now) for client in self.clients.values()]
@@ -0,0 +1,352 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+import socketio
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+import wire_format
+
+# Needs the asyncio client extra: pip install "python-socketio[asyncio_client]"
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stock_socket_server.py')
+
+# Injected ticks use their own tickers; the price encodes the tick's sequence number
+INJECT_TICKERS = [f'LT{i:03d}' for i in range(10)]
+INJECT_BASE_PRICE = 1000.0
+INJECT_PRICE_STEP = 0.01
+
+def inject_tick(seq):
+    ticker = INJECT_TICKERS[seq % len(INJECT_TICKERS)]
+    price = round(INJECT_BASE_PRICE + seq * INJECT_PRICE_STEP, 2)
+    return {'ticker': ticker, 'price': price, 'signal': 'NEUTRAL', 'change_percent': round(seq % 700 / 100 - 3.5, 2)}
+
+def message_key(stock):
+    """Identifies one broadcast across all clients"""
+    return f"{stock['ticker']}:{stock['price']!r}"
+
+class ServerProcess:
+    """stock_socket_server.py in a subprocess, fed by an offline market data provider"""
+
+    def __init__(self, port=8001, provider='synthetic', poll_interval=10, tickers=None):
+        self.port = port
+        self.provider = provider
+        self.poll_interval = poll_interval
+        self.tickers = tickers or ['AAPL', 'MSFT', 'AMZN', 'GOOGL']
+        self.workdir = tempfile.mkdtemp(prefix='socket-load-')
+        self.process = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self, timeout=60):
+        env = dict(
+            os.environ,
+            SOCKET_PORT=str(self.port),
+            MARKET_DATA_PROVIDER=self.provider,
+            MARKET_HOURS_ONLY='0',
+            POLL_INTERVAL=str(self.poll_interval),
+            TRACKED_TICKERS=','.join(self.tickers),
+            TICK_JOURNAL_DIR=os.path.join(self.workdir, 'ticks')
+        )
+        self.log = open(os.path.join(self.workdir, 'server.log'), 'wb')
+        self.process = subprocess.Popen([sys.executable, SERVER_SCRIPT], env=env,
+                                        stdout=self.log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}, see {self.log.name}")
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Server did not start listening on port {self.port}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+
+def process_usage(pid):
+    """(CPU seconds, RSS bytes) of a process, read from /proc (Linux only)"""
+    with open(f'/proc/{pid}/stat') as f:
+        # Fields after the parenthesised command name; utime and stime are the 12th and 13th
+        fields = f.read().rsplit(')', 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    rss = 0
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1]) * 1024
+                break
+    return cpu, rss
+
+class UsageSampler:
+    """Samples a process's CPU % and peak RSS while a load step runs"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.peak_rss = max(self.peak_rss, process_usage(self.pid)[1])
+
+    def start(self):
+        self.start_cpu, self.peak_rss = process_usage(self.pid)
+        self.start_time = time.monotonic()
+        self.task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        self.task.cancel()
+        cpu, rss = process_usage(self.pid)
+        elapsed = time.monotonic() - self.start_time
+        return {'cpu_percent': (cpu - self.start_cpu) / elapsed * 100 if elapsed > 0 else 0.0,
+                'rss_mb': max(self.peak_rss, rss) / 2 ** 20}
+
+# Worker processes: each holds a share of the clients and records what they receive
+
+async def _connect_clients(url, count, event, transports, concurrency, wire, received):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect(index):
+        sio = socketio.AsyncClient(reconnection=False)
+
+        def on_message(data):
+            now = time.time()
+            if isinstance(data, bytes):
+                data = wire_format.decode(data)
+            # top_stocks_update carries a list; its first entry identifies the broadcast
+            stock = data[0] if isinstance(data, list) else data
+            if stock:
+                received.append((index, message_key(stock), now))
+
+        sio.on(event, on_message)
+        async with semaphore:
+            try:
+                await sio.connect(url, transports=transports, auth={'wire': wire}, wait_timeout=30)
+            except Exception:
+                return None
+        return sio
+
+    clients = await asyncio.gather(*(connect(i) for i in range(count)))
+    return [sio for sio in clients if sio is not None]
+
+async def _worker_main(conn, url, event, transports, concurrency, wire):
+    loop = asyncio.get_running_loop()
+    clients = []
+    received = []
+    while True:
+        command, args = await loop.run_in_executor(None, conn.recv)
+        if command == 'connect':
+            received.clear()
+            clients = await _connect_clients(url, args['clients'], event, transports, concurrency, wire, received)
+            conn.send(len(clients))
+        elif command == 'collect':
+            # Wait for the drain deadline, or until every client has every expected message
+            expected = args['expected'] * len(clients)
+            while time.time() < args['deadline'] and (not expected or len(received) < expected):
+                await asyncio.sleep(0.05)
+            window = [r for r in received if r[2] >= args['since']]
+            conn.send(([r[0] for r in window], [r[1] for r in window],
+                       np.array([r[2] for r in window], dtype=np.float64)))
+            await asyncio.gather(*(sio.disconnect() for sio in clients), return_exceptions=True)
+            clients = []
+        elif command == 'stop':
+            conn.close()
+            return
+
+def _worker(conn, url, event, transports, concurrency, wire):
+    asyncio.run(_worker_main(conn, url, event, transports, concurrency, wire))
+
+# Load steps
+
+def latency_stats(latencies):
+    if len(latencies) == 0:
+        return {'p50_ms': np.nan, 'p99_ms': np.nan, 'max_ms': np.nan}
+    latencies = np.asarray(latencies) * 1000
+    return {'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max())}
+
+async def inject_ticks(url, n_ticks, rate, first_seq):
+    """Send n_ticks stock_update events at `rate` per second; returns {key: send time}"""
+    injector = socketio.AsyncClient(reconnection=False)
+    await injector.connect(url, transports=['websocket'])
+    sent = {}
+    start = time.monotonic()
+    for i in range(n_ticks):
+        delay = start + i / rate - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tick = inject_tick(first_seq + i)
+        sent[message_key(tick)] = time.time()
+        if i == n_ticks - 1:
+            # Wait for the server's ack, or disconnecting can cut off the last tick
+            await injector.call('stock_update', tick, timeout=30)
+        else:
+            await injector.emit('stock_update', tick)
+    await injector.disconnect()
+    return sent
+
+def _share(total, parts):
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+class LoadTest:
+    """Connects a growing number of clients to the socket server and measures delivery
+
+    source='inject' sends stock_update events from an extra client and
+    measures end-to-end latency (send to receipt) of the stock_update
+    broadcasts. Any other source ('synthetic' or 'replay:<file>') is handed
+    to the server as its market data provider; the poll loop's
+    top_stocks_update broadcasts are measured as fan-out latency, i.e. from
+    the first client to receive a broadcast to each of the others.
+    Messages a client hasn't received by the drain deadline count as
+    dropped. Clients are spread over `workers` processes so the harness's
+    own event loop doesn't become the bottleneck. wire='msgpack' makes the
+    clients negotiate the binary wire format.
+    """
+
+    def __init__(self, url, source='inject', workers=4, transports=('websocket',),
+                 connect_concurrency=200, server_pid=None, wire=wire_format.JSON):
+        self.url = url
+        self.source = source
+        self.event = 'stock_update' if source == 'inject' else 'top_stocks_update'
+        self.server_pid = server_pid
+        self.pipes = []
+        self.processes = []
+        for _ in range(workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, daemon=True,
+                                              args=(child, url, self.event, list(transports),
+                                                    connect_concurrency, wire))
+            process.start()
+            self.pipes.append(parent)
+            self.processes.append(process)
+        self.next_seq = 0
+
+    async def _ask(self, commands):
+        loop = asyncio.get_running_loop()
+        for pipe, command in zip(self.pipes, commands):
+            pipe.send(command)
+        return await asyncio.gather(*(loop.run_in_executor(None, pipe.recv) for pipe in self.pipes))
+
+    async def step(self, n_clients, n_ticks=200, rate=20.0, duration=30.0, drain=5.0):
+        shares = _share(n_clients, len(self.pipes))
+        connected = sum(await self._ask([('connect', {'clients': share}) for share in shares]))
+
+        sampler = UsageSampler(self.server_pid) if self.server_pid else None
+        if sampler:
+            sampler.start()
+        since = time.time()
+        if self.source == 'inject':
+            sent = await inject_ticks(self.url, n_ticks, rate, self.next_seq)
+            self.next_seq += n_ticks
+        else:
+            await asyncio.sleep(duration)
+        deadline = time.time() + drain
+        expected = n_ticks if self.source == 'inject' else 0
+        replies = await self._ask([('collect', {'since': since, 'deadline': deadline, 'expected': expected})] * len(self.pipes))
+        usage = sampler.stop() if sampler else {'cpu_percent': np.nan, 'rss_mb': np.nan}
+
+        clients, keys, times = [], [], []
+        for worker, (indexes, worker_keys, worker_times) in enumerate(replies):
+            # Client indexes are per worker; make them unique
+            clients.extend((worker, index) for index in indexes)
+            keys.extend(worker_keys)
+            times.append(worker_times)
+        times = np.concatenate(times) if times else np.zeros(0)
+
+        if self.source == 'inject':
+            send_times = np.array([sent.get(key, np.nan) for key in keys])
+            matched = ~np.isnan(send_times)
+            latencies = times[matched] - send_times[matched]
+            delivered = len({(client, key) for client, key, hit in zip(clients, keys, matched) if hit})
+            broadcasts = n_ticks
+        else:
+            # Latency relative to the earliest receipt of the same broadcast
+            first = {}
+            for key, t in zip(keys, times):
+                first[key] = min(first.get(key, t), t)
+            latencies = np.array([t - first[key] for key, t in zip(keys, times)])
+            delivered = len(set(zip(clients, keys)))
+            broadcasts = len(first)
+        expected_total = connected * broadcasts
+
+        return dict({'clients': n_clients, 'connected': connected, 'broadcasts': broadcasts,
+                     'delivered': delivered, 'dropped': max(0, expected_total - delivered)},
+                    **latency_stats(latencies), **usage)
+
+    def close(self):
+        for pipe in self.pipes:
+            pipe.send(('stop', None))
+        for process in self.processes:
+            process.join(timeout=10)
+
+def format_row(row):
+    return (f"{row['clients']:>8} {row['connected']:>9} {row['broadcasts']:>10} {row['dropped']:>8} "
+            f"{row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} "
+            f"{row['cpu_percent']:>7.1f} {row['rss_mb']:>8.1f}")
+
+async def run(client_counts, source, url=None, server_pid=None, workers=4, ticks=200, rate=20.0,
+              duration=30.0, drain=5.0, port=8001, poll_interval=10, wire=wire_format.JSON):
+    """Run one load step per client count and return a list of result rows"""
+    server = None
+    if url is None:
+        # Injected ticks don't need the poll loop; keep it quiet unless it is the source
+        provider = 'synthetic' if source == 'inject' else source
+        server = ServerProcess(port, provider, poll_interval).start()
+        url, server_pid = server.url, server.process.pid
+
+    load = LoadTest(url, source, workers=workers, server_pid=server_pid, wire=wire)
+    rows = []
+    print(f"{'clients':>8} {'connected':>9} {'broadcasts':>10} {'dropped':>8} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'cpu %':>7} {'rss MB':>8}")
+    try:
+        for n_clients in client_counts:
+            row = await load.step(n_clients, ticks, rate, duration, drain)
+            print(format_row(row), flush=True)
+            rows.append(row)
+    finally:
+        load.close()
+        if server is not None:
+            server.stop()
+    return rows
+
+if __name__ == "__main__":
+    # Usage: load_test.py [--clients=100,500,1000,2000] [--source=inject|synthetic|replay:<file>]
+    #                     [--ticks=200] [--rate=20] [--duration=30] [--drain=5] [--workers=4]
+    #                     [--port=8001] [--poll-interval=1] [--wire=json|msgpack]
+    #                     [--url=http://host:port [--server-pid=N]]
+    # Without --url a server is started locally on --port; with --url, CPU/RSS
+    # are only reported if --server-pid is given.
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    source = options.get('source', 'inject')
+    asyncio.run(run(
+        [int(n) for n in options.get('clients', '100,500,1000,2000').split(',')],
+        source,
+        url=options.get('url'),
+        server_pid=int(options['server-pid']) if 'server-pid' in options else None,
+        workers=int(options.get('workers', 4)),
+        ticks=int(options.get('ticks', 200)),
+        rate=float(options.get('rate', 20)),
+        duration=float(options.get('duration', 30)),
+        drain=float(options.get('drain', 5)),
+        port=int(options.get('port', 8001)),
+        poll_interval=float(options.get('poll-interval', 10 if source == 'inject' else 1)),
+        wire=options.get('wire', wire_format.JSON)
+    ))
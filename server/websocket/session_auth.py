@@ -0,0 +1,34 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+def verify_token(token, secret, now=None):
+    """Claims of an HS256 JWT issued by the Node auth routes, or None
+
+    Only the algorithm the auth routes sign with (HS256, shared JWT_SECRET)
+    is accepted; a bad signature, a malformed token or an expired 'exp'
+    all give None.
+    """
+    if not token or not secret:
+        return None
+    try:
+        header, payload, signature = token.split('.')
+        if json.loads(_b64decode(header)).get('alg') != 'HS256':
+            return None
+        expected = hmac.new(secret.encode(), f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if not isinstance(claims, dict):
+        return None
+    exp = claims.get('exp')
+    if exp is not None and (now if now is not None else time.time()) >= exp:
+        return None
+    return claims
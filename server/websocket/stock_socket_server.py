@@ -1,16 +1,34 @@
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, request
-from flask_socketio import SocketIO, emit
-import yfinance as yf
+from eventlet import tpool
+from flask import Flask, request, jsonify
+from flask_socketio import SocketIO, join_room, leave_room
 import time
 import threading
 import random
 import logging
 import os
+import sys
 import json
-from datetime import datetime
+import pandas as pd
+from datetime import datetime, timedelta
+
+# The analysis code lives next to the Node server's Python scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from stockAnalysis import analyze_stock
+from trading_calendar import get_trading_calendar
+from analysis_jobs import AnalysisJobManager, QueueFullError
+from tick_journal import TickJournal, DEFAULT_RETAIN_SEGMENTS
+from top_movers import TopMovers
+from alerts import AlertEngine, LiveIndicators, LiveLevels
+from session_auth import verify_token
+from market_data import get_provider
+from backpressure import SlowConsumerGuard
+from bar_builder import BarBuilder, RESOLUTIONS, parse_retention, epoch_seconds
+from correlation import RollingCovariance
+import global_model
+import wire_format
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -24,26 +42,406 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
 # Store connected clients
 connected_clients = {}
-# Tracked stocks
-top_stocks = ['AAPL', 'MSFT', 'AMZN', 'GOOGL']
+# Clients that negotiated the MessagePack wire format
+msgpack_clients = set()
+# Tracked stocks (comma-separated TRACKED_TICKERS overrides the default list)
+top_stocks = [t.strip().upper() for t in os.environ.get('TRACKED_TICKERS', 'AAPL,MSFT,AMZN,GOOGL').split(',') if t.strip()]
+# Tickers ranked by the size of their move; clients get the top N
+top_movers = TopMovers(int(os.environ.get('TOP_MOVERS_SIZE', 10)))
 # Store the latest stock data
 latest_stock_data = {}
+# Only poll for quotes while the exchange is open (set MARKET_HOURS_ONLY=0 to always poll)
+market_hours_only = os.environ.get('MARKET_HOURS_ONLY', '1') != '0'
+# Seconds between polls of the market data provider
+poll_interval = float(os.environ.get('POLL_INTERVAL', 10))
+# Shared with the auth routes; signed-in users' alert rules outlive their sockets
+jwt_secret = os.environ.get('JWT_SECRET')
+# Yahoo by default; MARKET_DATA_PROVIDER=synthetic or replay:<file> runs offline
+market_data = get_provider()
+
+def outbound_queue_depth(client_id):
+    """Packets waiting in a client's Engine.IO send queue, or None if it is gone"""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(client_id, '/')
+    eio_socket = socketio.server.eio.sockets.get(eio_sid) if eio_sid else None
+    return eio_socket.queue.qsize() if eio_socket is not None else None
+
+# Clients that fall behind get conflated updates; stalled ones are dropped
+client_guard = SlowConsumerGuard(
+    outbound_queue_depth,
+    high_water=int(os.environ.get('CLIENT_QUEUE_HIGH_WATER', 200)),
+    low_water=int(os.environ.get('CLIENT_QUEUE_LOW_WATER', 20)),
+    stall_timeout=float(os.environ.get('CLIENT_STALL_TIMEOUT', 30))
+)
+
+# Ticks are aggregated into 1m/5m/15m/1h bars (BAR_RETENTION='1m=1440,...' bounds memory)
+bar_builder = BarBuilder(retention=parse_retention(os.environ.get('BAR_RETENTION')))
+# Cumulative day volume last seen per ticker, to turn quotes into per-tick volume
+last_volume = {}
+
+# Rolling correlation/covariance of the tracked universe over the last
+# CORRELATION_WINDOW bars of CORRELATION_RESOLUTION (a session of 5m bars by default)
+correlation_resolution = os.environ.get('CORRELATION_RESOLUTION', '5m')
+rolling_correlation = RollingCovariance(
+    top_stocks,
+    window=int(os.environ.get('CORRELATION_WINDOW', 78)),
+    seconds=RESOLUTIONS[correlation_resolution]
+)
+# sid -> the matrix view it subscribed to; subscribers of a view share its room
+correlation_views = {}
+
+# Every live tick is journaled so a restart can restore the last prices at once
+tick_journal = TickJournal(
+    snapshot_every=int(os.environ.get('TICK_JOURNAL_SNAPSHOT_EVERY', 50000)),
+    retain_segments=int(os.environ.get('TICK_JOURNAL_RETAIN_SEGMENTS', DEFAULT_RETAIN_SEGMENTS)) or None,
+    run_blocking=tpool.execute
+)
+
+def load_daily_bars(ticker):
+    """Completed daily bars (today's partial bar excluded), to seed live indicators and levels"""
+    today = datetime.now().date()
+    return market_data.history(ticker, start=today - timedelta(days=365), end=today)
+
+def load_daily_closes(ticker):
+    return load_daily_bars(ticker)['Close'].values
+
+def load_closed_bars(ticker, resolution):
+    """Retained closed bars with the provider's column names"""
+    return bar_builder.bars(ticker, resolution, include_open=False).rename(columns=str.capitalize)
+
+# User alert rules, checked against every tick
+alert_engine = AlertEngine()
+live_indicators = LiveIndicators(load_daily_closes)
+# Support/resistance distances ('resistance', 'support@5m'), from the shared level cache
+live_levels = LiveLevels(load_daily_bars)
+# Intraday indicators ('rsi_14@5m'), reseeded from the retained bars whenever one closes
+bar_indicators = {
+    resolution: LiveIndicators(
+        lambda ticker, resolution=resolution: bar_builder.closes(ticker, resolution),
+        seed_key=lambda ticker, resolution=resolution: bar_builder.bar_count(ticker, resolution))
+    for resolution in RESOLUTIONS
+}
+bar_levels = {
+    resolution: LiveLevels(
+        lambda ticker, resolution=resolution: load_closed_bars(ticker, resolution),
+        seed_key=lambda ticker, resolution=resolution: bar_builder.bar_count(ticker, resolution),
+        series_key=lambda ticker, resolution=resolution: f"{ticker}_{resolution}")
+    for resolution in RESOLUTIONS
+}
+
+def check_alerts(stock):
+    """Send every alert a tick triggers to the room of the rule's owner"""
+    ticker = stock['ticker']
+    metrics = alert_engine.watched_metrics(ticker)
+    if not metrics:
+        return
+    values = {'price': stock['price'], 'change_percent': stock['change_percent']}
+    daily = [m for m in metrics if '@' not in m]
+    values.update(live_indicators.values(ticker, stock['price'], daily))
+    values.update(live_levels.values(ticker, stock['price'], daily))
+    for resolution, indicators in bar_indicators.items():
+        suffix = f'@{resolution}'
+        wanted = [m[:-len(suffix)] for m in metrics if m.endswith(suffix)]
+        if wanted:
+            computed = indicators.values(ticker, stock['price'], wanted)
+            computed.update(bar_levels[resolution].values(ticker, stock['price'], wanted))
+            values.update({f'{metric}{suffix}': value for metric, value in computed.items()})
+    for alert in alert_engine.evaluate(ticker, values):
+        emit_to(alert['owner'], 'alert_triggered', alert, key=alert['rule_id'])
+
+def bar_room(ticker, resolution):
+    return f"bars:{ticker}:{resolution}"
+
+def publish_bar(bar):
+    """Send a closed bar to its subscribers and fold it into the rolling correlation"""
+    room = bar_room(bar['ticker'], bar['resolution'])
+    emit_to(room, 'bar_close', bar, key=room)
+    if bar['resolution'] == correlation_resolution:
+        if rolling_correlation.add_bar(bar['ticker'], epoch_seconds(bar['start']), bar['close']):
+            push_correlation()
+
+def add_bar_tick(ticker, t, price, volume=0.0):
+    """Aggregate a tick into bars and send the bars it closed to their subscribers"""
+    for bar in bar_builder.add(ticker, epoch_seconds(t), price, volume):
+        publish_bar(bar)
+
+def close_due_bars():
+    """Close bars whose period ended without a new tick"""
+    while True:
+        try:
+            now = epoch_seconds(market_data.now())
+            for bar in bar_builder.close_due(now):
+                publish_bar(bar)
+            if rolling_correlation.flush_due(now):
+                push_correlation()
+        except Exception as e:
+            logger.error(f"Error closing bars: {str(e)}")
+        time.sleep(1)
+
+def bar_records(frame):
+    return [dict(bar, start=start.strftime("%Y-%m-%d %H:%M:%S"))
+            for start, bar in zip(frame.index, frame.to_dict('records'))]
+
+def parse_correlation_params(data):
+    """Normalize a correlation view: {kind, tickers, shrinkage}"""
+    data = data or {}
+    tickers = data.get('tickers')
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+    shrinkage = data.get('shrinkage') or None
+    if shrinkage is not None and shrinkage != 'oas':
+        shrinkage = float(shrinkage)
+    return {
+        'kind': data.get('kind') or 'correlation',
+        'tickers': tuple(t.strip().upper() for t in tickers if t.strip()) if tickers else None,
+        'shrinkage': shrinkage
+    }
+
+def correlation_matrix(view):
+    # Large universes take a while to serialize; keep that off the event loop
+    return tpool.execute(rolling_correlation.matrix, view['kind'], view['tickers'], view['shrinkage'])
+
+def correlation_room(view):
+    tickers = ','.join(view['tickers']) if view['tickers'] else '*'
+    return f"correlation:{view['kind']}:{view['shrinkage']}:{tickers}"
+
+def push_correlation():
+    """Build and send the updated matrix once per distinct view, to the view's room"""
+    views = {correlation_room(view): view for view in list(correlation_views.values())}
+    for room, view in views.items():
+        emit_to(room, 'correlation_update', correlation_matrix(view))
+
+def seed_correlation():
+    """Fill the correlation window from provider history so it is usable at startup"""
+    seconds = RESOLUTIONS[correlation_resolution]
+    # Sessions are 6.5 hours; leave room for weekends and holidays
+    days = int(rolling_correlation.window * seconds / 23400 * 1.5) + 5
+    try:
+        history = market_data.history(top_stocks, start=datetime.now() - timedelta(days=days),
+                                      interval=correlation_resolution)
+        closes = pd.DataFrame({ticker: frame['Close'] for ticker, frame in history.items() if not frame.empty})
+        if not closes.empty:
+            rolling_correlation.seed(closes.sort_index())
+            logger.info(f"Seeded correlation window with {len(rolling_correlation)} {correlation_resolution} bars")
+    except Exception as e:
+        logger.error(f"Error seeding correlation window: {str(e)}")
+
+def session_user(auth):
+    """User ID from the auth routes' JWT (connect auth {'token': ...} or the token cookie)
+
+    Tokens are only trusted when JWT_SECRET is set, so the socket server
+    never accepts tokens signed with a default secret.
+    """
+    token = auth.get('token') if isinstance(auth, dict) else None
+    claims = verify_token(token or request.cookies.get('token'), jwt_secret)
+    user_id = (claims or {}).get('id')
+    return str(user_id) if user_id else None
+
+def alert_owner():
+    # Rules of a signed-in user outlive the connection; otherwise they belong to
+    # the socket. Never taken from event data, so one client can't claim another's rules.
+    user_id = connected_clients.get(request.sid, {}).get('user_id')
+    return f"user:{user_id}" if user_id else request.sid
+
+def wire_room(fmt):
+    return f"wire:{fmt}"
+
+# Events sent in each client's negotiated wire format; the rest are always JSON
+WIRE_EVENTS = ('stock_update', 'top_stocks_update', 'top_movers_update')
+
+def broadcast(event, stocks):
+    """Send a stock update (dict or list) to every client in its negotiated wire format
+
+    Each format is encoded once per broadcast, not once per recipient.
+    """
+    socketio.emit(event, stocks, to=wire_room(wire_format.JSON))
+    if msgpack_clients:
+        socketio.emit(event, wire_format.encode(stocks), to=wire_room(wire_format.MSGPACK))
+    # Paused clients aren't in the rooms; they only keep the newest values
+    client_guard.conflate(event, stocks)
+
+def emit_to(room, event, payload, key=None):
+    """Send an event to a room or a sid; paused clients get it conflated instead"""
+    if not client_guard.hold(room, event, payload, key):
+        socketio.emit(event, payload, to=room)
+
+def enter_room(room):
+    # A paused client rejoins its rooms when it resumes
+    if not client_guard.join(request.sid, room):
+        join_room(room)
+
+def exit_room(room):
+    if not client_guard.leave(request.sid, room):
+        leave_room(room)
+
+def send_to_client(client_id, event, stocks):
+    if connected_clients.get(client_id, {}).get('wire_format') == wire_format.MSGPACK:
+        stocks = wire_format.encode(stocks)
+    socketio.emit(event, stocks, to=client_id)
+
+def drop_client(client_id):
+    """Close a stalled client's connection without waiting for its queue to drain"""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(client_id, '/')
+    eio_socket = socketio.server.eio.sockets.pop(eio_sid, None) if eio_sid else None
+    if eio_socket is None:
+        return
+    # Free the backlog now rather than when the writer gets around to it
+    while not eio_socket.queue.empty():
+        eio_socket.queue.get_nowait()
+        eio_socket.queue.task_done()
+    eio_socket.close(wait=False, abort=True)
+
+def watch_client_queues():
+    """Pause, resume or drop clients according to their outbound backlog"""
+    interval = float(os.environ.get('CLIENT_QUEUE_CHECK_INTERVAL', 0.5))
+    while True:
+        try:
+            for action in client_guard.check():
+                client_id = action[1]
+                if action[0] == 'pause':
+                    # Out of every room, not just the broadcasts: bars, alerts and
+                    # job events are held by the guard until it catches up
+                    rooms = [room for room in socketio.server.rooms(client_id, namespace='/')
+                             if room != client_id]
+                    for room in rooms:
+                        socketio.server.leave_room(client_id, room, namespace='/')
+                    client_guard.park(client_id, rooms)
+                    logger.warning(f"Client {client_id} fell behind; conflating its updates")
+                elif action[0] == 'resume':
+                    # Catch up first, then rejoin the live broadcasts and subscriptions
+                    for event, payload in action[2]:
+                        if event in WIRE_EVENTS:
+                            send_to_client(client_id, event, payload)
+                        else:
+                            socketio.emit(event, payload, to=client_id)
+                    for room in action[3]:
+                        socketio.server.enter_room(client_id, room, namespace='/')
+                    logger.info(f"Client {client_id} caught up")
+                elif action[0] == 'disconnect':
+                    logger.warning(f"Disconnecting stalled client {client_id}")
+                    drop_client(client_id)
+        except Exception as e:
+            logger.error(f"Error checking client queues: {str(e)}")
+        time.sleep(interval)
+
+def top_movers_payload():
+    return [latest_stock_data[ticker] for ticker in top_movers.ranking() if ticker in latest_stock_data]
+
+def notify_analysis_event(event, payload, job_id):
+    # Every job has its own room; the submitter joins it automatically.
+    # A paused subscriber only gets the job's latest event.
+    emit_to(job_id, event, payload, key=job_id)
+
+# Analysis jobs run in native threads (tpool) so model fits don't block the event loop
+analysis_jobs = AnalysisJobManager(
+    analyze_stock,
+    notify_analysis_event,
+    max_workers=int(os.environ.get('ANALYSIS_WORKERS', 2)),
+    max_queue_depth=int(os.environ.get('ANALYSIS_QUEUE_DEPTH', 16)),
+    run_blocking=tpool.execute
+)
+
+def parse_analysis_params(data):
+    """Normalize analysis job parameters from a socket or HTTP request"""
+    data = data or {}
+    return {
+        'ticker': str(data.get('ticker', '')).upper(),
+        'start_date': data.get('start_date'),
+        'end_date': data.get('end_date') or datetime.now().strftime('%Y-%m-%d'),
+        'lookback_period': int(data.get('lookback_period') or 30),
+        'dtype_policy': data.get('dtype_policy'),
+        'forecast_horizon': int(data.get('forecast_horizon') or 5),
+        'interval': data.get('interval') or '1d'
+    }
 
 @app.route('/')
 def index():
     return "Stock Analysis WebSocket Server"
 
+@app.route('/clients', methods=['GET'])
+def list_clients():
+    """Outbound queue depth and lag of every connection"""
+    return jsonify(client_guard.stats())
+
+@app.route('/bars/<ticker>', methods=['GET'])
+def get_bars(ticker):
+    """Retained bars of a ticker: ?resolution=1m|5m|15m|1h&limit=N"""
+    try:
+        frame = bar_builder.bars(ticker.upper(), request.args.get('resolution', '1m'),
+                                 limit=request.args.get('limit', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(bar_records(frame))
+
+@app.route('/correlation', methods=['GET'])
+def get_correlation():
+    """Rolling matrix of the tracked universe: ?kind=correlation|covariance&tickers=A,B&shrinkage=oas|0.2"""
+    try:
+        return jsonify(correlation_matrix(parse_correlation_params(request.args)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/screen', methods=['GET'])
+def screen():
+    """Next-bar predictions for every tracked ticker from the persisted global model
+
+    ?lookback=N&interval=1d pick the model; train it with global_model.py train.
+    """
+    try:
+        result = tpool.execute(global_model.score, top_stocks,
+                               request.args.get('lookback', 60, type=int), request.args.get('interval', '1d'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if 'error' in result:
+        return jsonify(result), 404
+    return jsonify(result)
+
+@app.route('/analysis_jobs', methods=['POST'])
+def create_analysis_job():
+    try:
+        job = analysis_jobs.submit(parse_analysis_params(request.get_json(silent=True)))
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(job.to_dict()), 202
+
+@app.route('/analysis_jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict(include_result=True))
+
+@app.route('/analysis_jobs/<job_id>', methods=['DELETE'])
+def cancel_analysis_job(job_id):
+    if not analysis_jobs.cancel(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify(analysis_jobs.get(job_id).to_dict())
+
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     client_id = request.sid
-    logger.info(f"Client connected: {client_id}")
+    # Clients opt in to MessagePack with auth {'wire': 'msgpack'} or ?wire=msgpack
+    requested = (auth or {}).get('wire') if isinstance(auth, dict) else None
+    fmt = wire_format.negotiate(requested or request.args.get('wire'))
+    logger.info(f"Client connected: {client_id} ({fmt})")
     connected_clients[client_id] = {
-        'connected_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        'connected_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'wire_format': fmt,
+        'user_id': session_user(auth)
     }
+    join_room(wire_room(fmt))
+    if connected_clients[client_id]['user_id']:
+        # A signed-in user's rules outlive the socket; their alerts go to this room
+        join_room(alert_owner())
+    if fmt == wire_format.MSGPACK:
+        msgpack_clients.add(client_id)
+    client_guard.register(client_id, fmt)
     
     # Send initial stock data if available
     if latest_stock_data:
-        emit('top_stocks_update', list(latest_stock_data.values()), to=client_id)
+        send_to_client(client_id, 'top_stocks_update', list(latest_stock_data.values()))
+        send_to_client(client_id, 'top_movers_update', top_movers_payload())
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -51,6 +449,10 @@ def handle_disconnect():
     logger.info(f"Client disconnected: {client_id}")
     if client_id in connected_clients:
         del connected_clients[client_id]
+    msgpack_clients.discard(client_id)
+    client_guard.unregister(client_id)
+    alert_engine.remove_owner(client_id)
+    correlation_views.pop(client_id, None)
 
 @socketio.on('stock_update')
 def handle_stock_update(data):
@@ -71,67 +473,202 @@ def handle_stock_update(data):
                 'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
+            tick_journal.append(latest_stock_data[ticker])
+            add_bar_tick(ticker, market_data.now(), float(price), float(data.get('volume', 0)))
+            check_alerts(latest_stock_data[ticker])
+            
             # Broadcast to all clients
-            socketio.emit('stock_update', latest_stock_data[ticker])
+            broadcast('stock_update', latest_stock_data[ticker])
             logger.info(f"Broadcasted {ticker} update to all clients")
+            
+            if top_movers.update(ticker, change_percent):
+                broadcast('top_movers_update', top_movers_payload())
     except Exception as e:
         logger.error(f"Error handling stock update: {str(e)}")
 
+@socketio.on('submit_analysis')
+def handle_submit_analysis(data):
+    """Queue an analysis; the ack carries the job ID and progress follows as events"""
+    try:
+        params = parse_analysis_params(data)
+        job = analysis_jobs.submit(params)
+    except (QueueFullError, ValueError) as e:
+        return {'error': str(e)}
+    enter_room(job.job_id)
+    logger.info(f"Queued analysis job {job.job_id} for {params['ticker']}")
+    return job.to_dict()
+
+@socketio.on('watch_analysis')
+def handle_watch_analysis(data):
+    """Subscribe to progress events of a job submitted elsewhere (e.g. over HTTP)"""
+    job = analysis_jobs.get((data or {}).get('job_id'))
+    if job is None:
+        return {'error': 'Job not found'}
+    enter_room(job.job_id)
+    return job.to_dict(include_result=True)
+
+@socketio.on('cancel_analysis')
+def handle_cancel_analysis(data):
+    job_id = (data or {}).get('job_id')
+    if not analysis_jobs.cancel(job_id):
+        return {'error': 'Job not found or already finished'}
+    return analysis_jobs.get(job_id).to_dict()
+
+@socketio.on('subscribe_bars')
+def handle_subscribe_bars(data):
+    """Receive bar_close events of {ticker, resolution}; the ack carries the last `limit` bars"""
+    data = data or {}
+    ticker = str(data.get('ticker', '')).upper()
+    resolution = data.get('resolution', '1m')
+    try:
+        frame = bar_builder.bars(ticker, resolution, limit=int(data.get('limit') or 100))
+    except ValueError as e:
+        return {'error': str(e)}
+    enter_room(bar_room(ticker, resolution))
+    return bar_records(frame)
+
+@socketio.on('unsubscribe_bars')
+def handle_unsubscribe_bars(data):
+    data = data or {}
+    exit_room(bar_room(str(data.get('ticker', '')).upper(), data.get('resolution', '1m')))
+    return {'ok': True}
+
+@socketio.on('subscribe_correlation')
+def handle_subscribe_correlation(data=None):
+    """Receive correlation_update whenever a bar row is committed; the ack carries the current matrix"""
+    try:
+        view = parse_correlation_params(data)
+        matrix = correlation_matrix(view)
+    except ValueError as e:
+        return {'error': str(e)}
+    previous = correlation_views.get(request.sid)
+    if previous is not None:
+        exit_room(correlation_room(previous))
+    correlation_views[request.sid] = view
+    enter_room(correlation_room(view))
+    return matrix
+
+@socketio.on('unsubscribe_correlation')
+def handle_unsubscribe_correlation(data=None):
+    view = correlation_views.pop(request.sid, None)
+    if view is not None:
+        exit_room(correlation_room(view))
+    return {'ok': True}
+
+@socketio.on('add_alert')
+def handle_add_alert(data):
+    """Create an alert rule: {ticker, metric, direction, threshold[, repeat]}"""
+    data = data or {}
+    try:
+        owner = alert_owner()
+        rule = alert_engine.add_rule(owner, str(data.get('ticker', '')), data.get('metric', 'price'),
+                                     data.get('direction'), data.get('threshold'),
+                                     repeat=bool(data.get('repeat', False)))
+    except (TypeError, ValueError) as e:
+        return {'error': str(e)}
+    enter_room(owner)
+    logger.info(f"Added alert {rule.rule_id}: {rule.ticker} {rule.metric} {rule.direction} {rule.threshold}")
+    return rule.to_dict()
+
+@socketio.on('remove_alert')
+def handle_remove_alert(data):
+    rule = alert_engine.remove_rule((data or {}).get('rule_id'), owner=alert_owner())
+    if rule is None:
+        return {'error': 'Alert not found'}
+    return rule.to_dict()
+
+@socketio.on('list_alerts')
+def handle_list_alerts(data=None):
+    owner = alert_owner()
+    enter_room(owner)
+    return [rule.to_dict() for rule in alert_engine.rules_for(owner)]
+
 def fetch_stock_data():
-    """Fetch real-time stock data from Yahoo Finance API"""
+    """Poll the market data provider for the latest quotes"""
+    calendar = get_trading_calendar()
     while True:
         try:
+            # Outside trading hours prices don't move; keep serving the last snapshot
+            if market_hours_only and latest_stock_data and not calendar.is_open():
+                time.sleep(60)
+                continue
+            
             logger.info("Fetching stock updates...")
             updated_stocks = []
+            movers_changed = False
+            
+            # One bulk request for every tracked ticker
+            try:
+                quotes = market_data.quotes(top_stocks)
+            except Exception as e:
+                logger.error(f"Error fetching quotes: {str(e)}")
+                quotes = {}
             
-            for ticker in top_stocks:
+            for ticker, quote in quotes.items():
                 try:
-                    # Get real data from Yahoo Finance
-                    stock = yf.Ticker(ticker)
-                    data = stock.history(period="1d")
+                    current_price = float(quote['price'])
+                    open_price = float(quote['open'])
+                    change_percent = ((current_price - open_price) / open_price) * 100
+                    
+                    # Determine signal based on price movement
+                    signal = 'NEUTRAL'
+                    if change_percent > 1.5:
+                        signal = 'BUY'
+                    elif change_percent < -1.5:
+                        signal = 'SELL'
                     
-                    if not data.empty:
-                        current_price = float(data['Close'].iloc[-1])
-                        open_price = float(data['Open'].iloc[-1])
-                        change_percent = ((current_price - open_price) / open_price) * 100
-                        
-                        # Determine signal based on price movement
-                        signal = 'NEUTRAL'
-                        if change_percent > 1.5:
-                            signal = 'BUY'
-                        elif change_percent < -1.5:
-                            signal = 'SELL'
-                        
-                        # Store the stock data
-                        stock_data = {
-                            'ticker': ticker,
-                            'price': current_price,
-                            'signal': signal,
-                            'change_percent': round(change_percent, 2),
-                            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }
-                        
-                        latest_stock_data[ticker] = stock_data
-                        updated_stocks.append(stock_data)
-                        logger.info(f"Updated {ticker}: ${current_price:.2f} ({change_percent:.2f}%)")
+                    # Store the stock data
+                    stock_data = {
+                        'ticker': ticker,
+                        'price': current_price,
+                        'signal': signal,
+                        'change_percent': round(change_percent, 2),
+                        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    }
+                    
+                    latest_stock_data[ticker] = stock_data
+                    updated_stocks.append(stock_data)
+                    tick_journal.append(stock_data)
+                    # Quotes carry the day's cumulative volume; bars want what traded since the last one
+                    volume = float(quote.get('volume', 0))
+                    add_bar_tick(ticker, quote.get('time') or market_data.now(), current_price,
+                                 max(volume - last_volume.get(ticker, volume), 0.0))
+                    last_volume[ticker] = volume
+                    movers_changed |= top_movers.update(ticker, change_percent)
+                    check_alerts(stock_data)
+                    logger.info(f"Updated {ticker}: ${current_price:.2f} ({change_percent:.2f}%)")
                     
                 except Exception as e:
-                    logger.error(f"Error fetching data for {ticker}: {str(e)}")
+                    logger.error(f"Error processing data for {ticker}: {str(e)}")
             
             # Broadcast updates to all clients
             if updated_stocks:
-                socketio.emit('top_stocks_update', updated_stocks)
+                broadcast('top_stocks_update', updated_stocks)
                 logger.info(f"Broadcasted updates for {len(updated_stocks)} stocks to all clients")
             
-            # Sleep for 10 seconds before the next update
-            time.sleep(10)
+            # Only push the movers list when its membership or order changed
+            if movers_changed:
+                broadcast('top_movers_update', top_movers_payload())
+            
+            # Wait before the next update
+            time.sleep(poll_interval)
             
         except Exception as e:
             logger.error(f"Error in stock update thread: {str(e)}")
             time.sleep(10)  # On error, wait and try again
 
 if __name__ == "__main__":
+    # Serve the last journaled prices until the first poll completes
+    latest_stock_data.update(tick_journal.restore())
+    for stock in latest_stock_data.values():
+        top_movers.update(stock['ticker'], stock['change_percent'])
+    tick_journal.start()
     # Start the stock data thread
     threading.Thread(target=fetch_stock_data, daemon=True).start()
-    logger.info("Starting WebSocket server on port 8001...")
-    socketio.run(app, host='0.0.0.0', port=8001)
\ No newline at end of file
+    threading.Thread(target=watch_client_queues, daemon=True).start()
+    threading.Thread(target=close_due_bars, daemon=True).start()
+    threading.Thread(target=seed_correlation, daemon=True).start()
+    analysis_jobs.start()
+    port = int(os.environ.get('SOCKET_PORT', 8001))
+    logger.info(f"Starting WebSocket server on port {port}...")
+    socketio.run(app, host='0.0.0.0', port=port)
\ No newline at end of file
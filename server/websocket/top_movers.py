@@ -0,0 +1,122 @@
+import heapq
+import threading
+
+class TopMovers:
+    """Ranks tickers by |change %| and tracks the top N incrementally
+
+    All tickers live in an indexed binary max-heap (a position map lets a
+    ticker's entry be moved up or down in place), so each tick costs
+    O(log n). The top N is re-read from the heap only when a tick could
+    affect it: the ticker was already in the top N, or its new move beats
+    the current N-th. Reading it walks just the top of the heap, O(N log N).
+
+    Equal moves rank by ticker, so ties never reorder the top N by
+    themselves.
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        self.heap = []          # [(abs change, ticker)], largest first
+        self.position = {}      # ticker -> index in heap
+        self.top = []           # current top N tickers, in order
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.heap)
+
+    @staticmethod
+    def _ranks_above(a, b):
+        """Whether heap entry a ranks before b: larger move, then smaller ticker"""
+        return a[0] > b[0] or (a[0] == b[0] and a[1] < b[1])
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.position[heap[i][1]] = i
+        self.position[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._ranks_above(self.heap[i], self.heap[parent]):
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        n = len(self.heap)
+        while True:
+            largest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._ranks_above(self.heap[child], self.heap[largest]):
+                    largest = child
+            if largest == i:
+                break
+            self._swap(i, largest)
+            i = largest
+
+    def _read_top(self):
+        """The N largest entries, found by expanding the heap from its root"""
+        result = []
+        frontier = [(-self.heap[0][0], self.heap[0][1], 0)] if self.heap else []
+        while frontier and len(result) < self.size:
+            _, ticker, i = heapq.heappop(frontier)
+            result.append(ticker)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    key, child_ticker = self.heap[child]
+                    heapq.heappush(frontier, (-key, child_ticker, child))
+        return result
+
+    def update(self, ticker, change_percent):
+        """Record a tick; returns True if the top N membership or order changed"""
+        key = abs(float(change_percent))
+        with self.lock:
+            i = self.position.get(ticker)
+            if i is None:
+                self.heap.append((key, ticker))
+                i = len(self.heap) - 1
+                self.position[ticker] = i
+                self._sift_up(i)
+            else:
+                old_key = self.heap[i][0]
+                self.heap[i] = (key, ticker)
+                if key > old_key:
+                    self._sift_up(i)
+                elif key < old_key:
+                    self._sift_down(i)
+
+            # Ticks outside the top N that don't beat the N-th can't change it
+            if len(self.top) == self.size and ticker not in self.top:
+                nth = self.heap[self.position[self.top[-1]]]
+                if not self._ranks_above((key, ticker), nth):
+                    return False
+
+            top = self._read_top()
+            if top == self.top:
+                return False
+            self.top = top
+            return True
+
+    def remove(self, ticker):
+        """Stop ranking a ticker; returns True if the top N changed"""
+        with self.lock:
+            i = self.position.pop(ticker, None)
+            if i is None:
+                return False
+            last = self.heap.pop()
+            if i < len(self.heap):
+                self.heap[i] = last
+                self.position[last[1]] = i
+                self._sift_up(i)
+                self._sift_down(self.position[last[1]])
+
+            top = self._read_top()
+            changed = top != self.top
+            self.top = top
+            return changed
+
+    def ranking(self):
+        """Current top N tickers, largest move first"""
+        with self.lock:
+            return list(self.top)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'server', 'python'))
+sys.path.insert(0, os.path.join(ROOT, 'server', 'websocket'))
+sys.path.insert(0, os.path.join(ROOT, 'attached_assets'))
+
+# Tests never hit the network
+os.environ.setdefault('MARKET_DATA_PROVIDER', 'synthetic')
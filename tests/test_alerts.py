@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alerts import AlertEngine, LiveLevels, parse_metric
+from session_auth import verify_token
+
+def test_removing_last_rule_prunes_its_index():
+    engine = AlertEngine()
+    a = engine.add_rule('sid-1', 'AAPL', 'price', 'above', 200)
+    b = engine.add_rule('sid-1', 'AAPL', 'rsi_14', 'below', 30)
+    engine.evaluate('AAPL', {'price': 190, 'rsi_14': 40})
+
+    assert engine.remove_rule(a.rule_id, owner='sid-2') is None
+    engine.remove_rule(a.rule_id)
+    assert ('AAPL', 'price') not in engine.indexes
+    assert ('AAPL', 'price') not in engine.last_values
+    assert engine.watched_metrics('AAPL') == {'rsi_14'}
+
+    engine.remove_owner('sid-1')
+    assert engine.indexes == {} and engine.metrics == {} and engine.owners == {}
+    assert engine.last_values == {}
+    assert b.rule_id not in engine.rules
+
+def test_fired_one_shot_rules_prune_their_index():
+    engine = AlertEngine()
+    engine.add_rule('sid-1', 'AAPL', 'price', 'above', 200)
+    engine.add_rule('sid-1', 'AAPL', 'price', 'above', 300, repeat=True)
+    engine.evaluate('AAPL', {'price': 190})
+    assert len(engine.evaluate('AAPL', {'price': 250})) == 1
+    assert engine.watched_metrics('AAPL') == {'price'}
+    assert len(engine.evaluate('AAPL', {'price': 310})) == 1
+    # The repeating rule keeps the index alive
+    assert ('AAPL', 'price') in engine.indexes
+
+def test_parse_metric():
+    assert parse_metric('RSI') == 'rsi_14'
+    assert parse_metric('ema_50@5m') == 'ema_50@5m'
+    assert parse_metric('resistance@1h') == 'resistance@1h'
+    with pytest.raises(ValueError):
+        parse_metric('macd')
+    with pytest.raises(ValueError):
+        parse_metric('support@2m')
+
+def test_resistance_alert_fires_on_breakout():
+    # Daily bars swinging between 99.5 and 110.5
+    close = 105 + 5 * np.sin(2 * np.pi * np.arange(200) / 20)
+    bars = pd.DataFrame({'High': close + 0.5, 'Low': close - 0.5, 'Close': close},
+                        index=pd.date_range('2024-01-01', periods=200, freq='D'))
+    loads = []
+
+    def load_bars(ticker):
+        loads.append(ticker)
+        return bars
+    live = LiveLevels(load_bars, seed_key=lambda ticker: 'day-1', series_key=lambda ticker: 'test-levels')
+    engine = AlertEngine()
+    engine.add_rule('sid-1', 'LVL', 'resistance', 'above', 0)
+
+    inside = live.values('LVL', 109.0, ['resistance', 'support', 'price'])
+    assert set(inside) == {'resistance', 'support'}
+    assert inside['resistance'] == pytest.approx((109.0 / 110.5 - 1) * 100, abs=0.01)
+    assert inside['support'] == pytest.approx((109.0 / 99.5 - 1) * 100, abs=0.01)
+    assert engine.evaluate('LVL', inside) == []
+
+    breakout = live.values('LVL', 111.0, ['resistance'])
+    assert len(engine.evaluate('LVL', breakout)) == 1
+    # Levels are held for the seed key, not reloaded per tick
+    assert loads == ['LVL']
+
+def sign(claims, secret, alg='HS256'):
+    def encode(data):
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+    header = encode(json.dumps({'alg': alg, 'typ': 'JWT'}).encode())
+    payload = encode(json.dumps(claims).encode())
+    signature = hmac.new(secret.encode(), f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+    return f'{header}.{payload}.{encode(signature)}'
+
+def test_verify_token():
+    token = sign({'id': 'u1', 'exp': 2000}, 'secret')
+    assert verify_token(token, 'secret', now=1000) == {'id': 'u1', 'exp': 2000}
+    assert verify_token(token, 'secret', now=2000) is None
+    assert verify_token(token, 'other', now=1000) is None
+    assert verify_token(token, None, now=1000) is None
+    assert verify_token(sign({'id': 'u1'}, 'secret', alg='none'), 'secret') is None
+    # A forged payload under a genuine signature
+    header, _, signature = token.split('.')
+    forged = base64.urlsafe_b64encode(json.dumps({'id': 'u2'}).encode()).rstrip(b'=').decode()
+    assert verify_token(f'{header}.{forged}.{signature}', 'secret', now=1000) is None
+    assert verify_token('not-a-token', 'secret') is None
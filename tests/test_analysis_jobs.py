@@ -0,0 +1,34 @@
+import threading
+
+from stockAnalysis import analyze_stock
+from analysis_jobs import AnalysisJobManager
+
+def test_cancel_running_job_stops_analysis():
+    events = []
+    done = threading.Event()
+    stages = []
+
+    def notify(event, payload, job_id):
+        events.append((event, payload.get('stage')))
+        if event in ('analysis_cancelled', 'analysis_result', 'analysis_error'):
+            done.set()
+
+    def analyze(*args, progress_callback=None, **kwargs):
+        def callback(stage):
+            stages.append(stage)
+            if stage == 'fetched':
+                manager.cancel(job.job_id)
+            progress_callback(stage)
+        return analyze_stock(*args, progress_callback=callback, **kwargs)
+
+    manager = AnalysisJobManager(analyze, notify, max_workers=1, poll_interval=0.01)
+    manager.start()
+    job = manager.submit({'ticker': 'MSFT', 'start_date': '2022-01-01',
+                          'end_date': '2023-01-01', 'lookback_period': 10})
+    assert done.wait(60)
+
+    assert job.status == 'cancelled'
+    assert job.error is None
+    assert events[-1][0] == 'analysis_cancelled'
+    # job.report raised at the stage that cancelled, so nothing later ran
+    assert stages == ['fetched']
@@ -0,0 +1,42 @@
+from backpressure import SlowConsumerGuard
+
+def paused_guard(depths):
+    guard = SlowConsumerGuard(depths.get, high_water=10, low_water=2)
+    guard.register('slow', 'json')
+    guard.register('fast', 'json')
+    depths.update(slow=10, fast=0)
+    assert guard.check(now=0) == [('pause', 'slow')]
+    guard.park('slow', ['wire:json', 'bars:AAPL:1m', 'job-1'])
+    return guard
+
+def test_room_events_are_held_for_paused_clients():
+    depths = {}
+    guard = paused_guard(depths)
+
+    # Live clients are sent to as usual
+    assert not guard.hold('fast', 'correlation_update', {'n': 1})
+    assert not guard.hold('bars:AAPL:1m', 'bar_close', {'close': 1}, key='bars:AAPL:1m')
+    assert guard.hold('slow', 'correlation_update', {'n': 1})
+    assert guard.hold('slow', 'correlation_update', {'n': 2})
+    guard.hold('bars:AAPL:1m', 'bar_close', {'close': 2}, key='bars:AAPL:1m')
+    guard.hold('bars:MSFT:1m', 'bar_close', {'close': 3}, key='bars:MSFT:1m')
+    guard.hold('job-1', 'analysis_progress', {'stage': 'trained'}, key='job-1')
+    guard.hold('job-1', 'analysis_result', {'stage': 'completed'}, key='job-1')
+    guard.conflate('stock_update', {'ticker': 'AAPL', 'price': 1})
+
+    # Joined while paused: rejoined on resume instead of receiving directly
+    assert guard.join('slow', 'user:u1')
+    assert not guard.join('fast', 'user:u1')
+    assert guard.leave('slow', 'job-1')
+
+    depths['slow'] = 0
+    [(action, sid, updates, rooms)] = guard.check(now=1)
+    assert (action, sid) == ('resume', 'slow')
+    assert updates == [
+        ('top_stocks_update', [{'ticker': 'AAPL', 'price': 1}]),
+        ('correlation_update', {'n': 2}),
+        ('bar_close', {'close': 2}),
+        ('analysis_result', {'stage': 'completed'}),
+    ]
+    assert rooms == {'wire:json', 'bars:AAPL:1m', 'user:u1'}
+    assert not guard.hold('slow', 'correlation_update', {'n': 3})
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from bar_builder import BarBuilder, epoch_seconds
+from market_data import SyntheticProvider
+
+def test_bars_align_to_session_open():
+    builder = BarBuilder()
+    closed = []
+    minutes = pd.date_range('2024-01-02 09:30', '2024-01-02 11:45', freq='min')
+    for i, t in enumerate(minutes):
+        closed += builder.add('AAPL', epoch_seconds(t), 100.0 + i, 1.0)
+    hourly = [bar for bar in closed if bar['resolution'] == '1h']
+    assert [bar['start'] for bar in hourly] == ['2024-01-02 09:30:00', '2024-01-02 10:30:00']
+    assert hourly[0]['open'] == 100.0 and hourly[0]['close'] == 159.0
+    assert hourly[0]['ticks'] == 60
+
+def test_hourly_bars_match_provider_bars():
+    provider = SyntheticProvider(seed=0)
+    minutes = provider.history('AAPL', start='2024-01-02', end='2024-01-03', interval='1m')
+    hours = provider.history('AAPL', start='2024-01-02', end='2024-01-03', interval='1h')
+    builder = BarBuilder(resolutions={'1h': 3600})
+    for t, row in minutes.iterrows():
+        builder.add('AAPL', epoch_seconds(t), row['Close'], row['Volume'])
+    builder.close_due(epoch_seconds(minutes.index[-1]) + 3600)
+    built = builder.bars('AAPL', '1h', limit=None)
+    assert list(built.index) == list(hours.index)
+
+def test_aware_timestamps_bucket_in_exchange_time():
+    naive = pd.Timestamp('2024-01-02 09:45')
+    utc = naive.tz_localize('America/New_York').tz_convert('UTC')
+    assert epoch_seconds(utc) == epoch_seconds(naive)
+    builder = BarBuilder(resolutions={'1h': 3600})
+    builder.add('AAPL', epoch_seconds(utc), 100.0, 1.0)
+    closed = builder.close_due(epoch_seconds(naive) + 3600)
+    assert [bar['start'] for bar in closed] == ['2024-01-02 09:30:00']
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_renderer import CHART_TYPES, ChartRenderer, results_hash
+
+PNG_MAGIC = b'\x89PNG'
+
+def make_results(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    dates = pd.bdate_range('2012-01-02', periods=n)
+    return {
+        'ticker': 'MSFT',
+        'dates': dates,
+        'prices': prices,
+        'predictions': prices * 1.01,
+        'ema_20': pd.Series(prices).ewm(span=20, adjust=False).mean().values,
+        'ema_50': pd.Series(prices).ewm(span=50, adjust=False).mean().values,
+        'rsi': rng.uniform(10, 90, n),
+        'signals': rng.choice([-1, 0, 0, 0, 1], n),
+        'stock_data': pd.DataFrame({'Volume': rng.integers(1000, 10000, n).astype(np.float64)}, index=dates),
+        'next_day_prediction': {'date': '2023-07-03', 'price': 101.5, 'signal': 'BUY'}
+    }
+
+@pytest.fixture
+def renderer():
+    renderer = ChartRenderer(max_points=200)
+    yield renderer
+    renderer.executor.shutdown()
+
+def test_renders_every_chart_and_caches_them(renderer, monkeypatch):
+    results = make_results()
+    charts = renderer.render_all(results)
+    assert list(charts) == CHART_TYPES
+    assert all(data.startswith(PNG_MAGIC) for data in charts.values())
+
+    def fail(*args):
+        raise AssertionError("cached charts were rendered again")
+    monkeypatch.setattr(renderer, '_render', fail)
+    assert renderer.render_all(results) == charts
+
+def test_cache_is_bounded_by_bytes(renderer):
+    first = renderer.render_all(make_results(seed=0), chart_types=['price'])['price']
+    renderer.max_bytes = len(first) + 1
+    second = make_results(seed=1)
+    renderer.render_all(second, chart_types=['price'])
+    # The older chart is evicted once both no longer fit
+    assert list(renderer.cache) == [(results_hash(second), 'price', 'png')]
+    assert renderer.cache_bytes == len(renderer.cache[(results_hash(second), 'price', 'png')])
+
+def test_hash_follows_the_data():
+    results = make_results()
+    assert results_hash(results) == results_hash(make_results())
+    results['prices'] = results['prices'].copy()
+    results['prices'][-1] += 1.0
+    assert results_hash(results) != results_hash(make_results())
+
+def test_plotted_series_are_downsampled(renderer):
+    results = make_results()
+    sample = renderer._sample(results)
+    assert len(sample['prices']) <= 200
+    assert sample['dates'][0] == results['dates'][0]
+    assert sample['dates'][-1] == results['dates'][-1]
@@ -0,0 +1,31 @@
+import numpy as np
+
+from downsample import downsample_indices, lttb_indices
+
+def test_lttb_keeps_endpoints_and_length():
+    y = np.sin(np.linspace(0, 20, 1000))
+    idx = lttb_indices(y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    y[802] = -50.0
+    idx = lttb_indices(y, 20)
+    assert 437 in idx and 802 in idx
+
+def test_short_series_are_returned_whole():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10.0), 50), np.arange(10))
+    np.testing.assert_array_equal(downsample_indices([np.arange(10.0)], 50), np.arange(10))
+
+def test_shared_indices_respect_the_budget_and_keep():
+    rng = np.random.default_rng(0)
+    series = [np.cumsum(rng.normal(size=5000)) for _ in range(3)]
+    keep = [17, 2500, 4999]
+    idx = downsample_indices(series, 300, keep=keep)
+    assert len(idx) <= 300
+    assert set(keep) <= set(idx.tolist())
+    assert idx[0] == 0 and idx[-1] == 4999
+    assert np.all(np.diff(idx) > 0)
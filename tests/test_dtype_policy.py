@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import stockAnalysis
+from stockAnalysis import analyze_stock
+
+ARGS = ('MSFT', '2020-01-01', '2024-01-01')
+
+@pytest.fixture(scope='module')
+def results():
+    return {policy: analyze_stock(*ARGS, dtype_policy=policy) for policy in (None, 'float64', 'float32')}
+
+def test_default_policy_is_float64(results):
+    assert stockAnalysis.DEFAULT_DTYPE_POLICY == 'float64'
+    default, full = results[None], results['float64']
+    assert 'error' not in default
+    assert default['accuracy_metrics'] == full['accuracy_metrics']
+    assert default['next_day_prediction'] == full['next_day_prediction']
+    assert default['predictions'] == full['predictions']
+
+def test_float32_stays_close_to_float64(results):
+    full, half = results['float64'], results['float32']
+    assert half['signals'] == full['signals']
+    for name, value in full['accuracy_metrics'].items():
+        assert half['accuracy_metrics'][name] == pytest.approx(value, rel=0.05), name
+    np.testing.assert_allclose(half['predictions'], full['predictions'], rtol=0.05)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from feature_store import FeatureStore, FEATURE_NAMES, _compute_features
+from market_data import SyntheticProvider
+
+@pytest.fixture
+def bars():
+    return SyntheticProvider(seed=0).history('MSFT', start='2020-01-01', end='2022-06-01')
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(root=str(tmp_path))
+
+def expected(frame):
+    features = _compute_features(frame)
+    return np.column_stack([features[name] for name in FEATURE_NAMES])
+
+def test_append_continues_stored_history(store, bars):
+    assert store.sync('MSFT', bars.iloc[:300]) == 300
+    assert store.sync('MSFT', bars) == len(bars) - 300
+    dates, matrix, _ = store.load('MSFT')
+    assert dates.equals(bars.index)
+    # The warmup tail lets the recursive indicators converge before the appended rows
+    np.testing.assert_allclose(matrix[300:], expected(bars)[300:], atol=1e-4)
+
+def test_gap_replaces_stored_history(store, bars):
+    store.sync('MSFT', bars.iloc[:300])
+    later = bars.iloc[400:]
+    store.sync('MSFT', later)
+    dates, matrix, _ = store.load('MSFT')
+    assert dates.equals(later.index)
+    # Nothing is computed across the missing bars: the first return is undefined
+    assert np.isnan(matrix[0, FEATURE_NAMES.index('return_1')])
+    np.testing.assert_allclose(matrix, expected(later), atol=1e-6)
+
+def test_earlier_start_backfills_and_rebuilds(store, bars):
+    store.sync('MSFT', bars.iloc[300:])
+    assert store.sync('MSFT', bars) == len(bars)
+    dates, matrix, _ = store.load('MSFT')
+    assert dates.equals(bars.index)
+    np.testing.assert_allclose(matrix, expected(bars), atol=1e-6)
+    # Later appends keep working on the rebuilt files
+    assert store.sync('MSFT', bars) == 0
+
+def test_appending_the_next_bar_keeps_stored_history(store, bars):
+    store.sync('MSFT', bars.iloc[:300])
+    assert store.sync('MSFT', bars.iloc[300:301]) == 1
+    dates, matrix, _ = store.load('MSFT')
+    assert len(dates) == 301
+    np.testing.assert_allclose(matrix[-1], expected(bars.iloc[:301])[-1], atol=1e-4)
+
+def test_intraday_append_across_the_session_close(store):
+    minutes = SyntheticProvider(seed=0).history('MSFT', start='2024-01-02', end='2024-01-06', interval='5m')
+    # 78 five-minute bars make a session; the next bar is the following 09:30
+    store.sync('MSFT_5m', minutes.iloc[:78])
+    assert store.sync('MSFT_5m', minutes.iloc[78:79]) == 1
+    assert len(store.load('MSFT_5m')[0]) == 79
+    # Skipping bars is a gap
+    store.sync('MSFT_5m', minutes.iloc[90:])
+    assert store.load('MSFT_5m')[0].equals(minutes.index[90:])
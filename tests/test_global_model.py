@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import global_model
+from global_model import GlobalModel, normalized_windows
+from market_data import get_provider
+
+TICKERS = ['AAPL', 'MSFT', 'NVDA']
+
+@pytest.fixture(scope='module')
+def history():
+    # Ends on the Friday before Christmas 2023
+    return get_provider().history(TICKERS, start='2021-01-01', end='2023-12-23')
+
+@pytest.fixture(scope='module')
+def model(history):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setitem(global_model.FOREST_PARAMS, 'n_estimators', 10)
+        return GlobalModel(lookback=20).fit(history)
+
+def test_normalized_windows():
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.02, 100)))
+    windows, scales, targets = normalized_windows(closes, 10)
+    returns = np.diff(np.log(closes))
+    assert windows.shape == (90, 10) and len(scales) == 90 and len(targets) == 89
+    np.testing.assert_allclose(windows.std(axis=1), 1.0, rtol=1e-5)
+    # Row j predicts the return right after its window, in the window's units
+    np.testing.assert_allclose(windows[5] * scales[5], returns[5:15], rtol=1e-5)
+    assert targets[5] == pytest.approx(returns[15] / scales[5])
+    # Scale-free: the same moves at ten times the price give the same windows
+    np.testing.assert_allclose(normalized_windows(closes * 10, 10)[0], windows, rtol=1e-5)
+
+def test_fit_reports_every_model(model):
+    evaluation = model.evaluation
+    assert evaluation['tickers'] == len(TICKERS)
+    assert evaluation['train_rows'] > evaluation['test_rows'] > 0
+    assert set(evaluation['models']) == {'global', 'naive', 'per_ticker'}
+    assert set(evaluation['models']['global']) == {'rmse', 'mae', 'mape', 'r2', 'direction_accuracy'}
+    # The naive model never predicts a move
+    assert evaluation['models']['naive']['direction_accuracy'] is None
+    assert 0 <= evaluation['global_better_mape'] <= len(TICKERS)
+
+def test_predict_next_scores_every_ticker(model, history):
+    predictions = model.predict_next(history)
+    assert sorted(p['ticker'] for p in predictions) == TICKERS
+    # Next session after the Friday before Christmas
+    assert {p['date'] for p in predictions} == {'2023-12-26'}
+    changes = [p['change_percent'] for p in predictions]
+    assert changes == sorted(changes, reverse=True)
+    for p in predictions:
+        assert p['price'] == round(float(history[p['ticker']]['Close'].iloc[-1]), 2)
+
+def test_save_and_load(model, history, tmp_path, monkeypatch):
+    path = model.save(str(tmp_path / 'global.joblib'))
+    loaded = GlobalModel.load(path)
+    assert loaded.info() == model.info()
+    assert loaded.predict_next(history) == model.predict_next(history)
+
+    assert GlobalModel.load(str(tmp_path / 'missing.joblib')) is None
+    monkeypatch.setattr(global_model, 'MODEL_VERSION', global_model.MODEL_VERSION + 1)
+    assert GlobalModel.load(path) is None
+
+def test_score_needs_a_trained_model(model, tmp_path, monkeypatch):
+    monkeypatch.setattr(global_model, 'model_path', lambda interval, lookback: str(tmp_path / 'global.joblib'))
+    assert 'error' in global_model.score(TICKERS, lookback=20)
+    model.save(str(tmp_path / 'global.joblib'))
+    result = global_model.score(TICKERS, lookback=20)
+    assert result['model']['lookback'] == 20
+    assert len(result['predictions']) == len(TICKERS)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorSet, compute_indicators, ema, parse_indicator
+
+@pytest.fixture(scope='module')
+def ohlcv():
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+    high = close * (1 + rng.uniform(0, 0.01, 500))
+    low = close * (1 - rng.uniform(0, 0.01, 500))
+    volume = rng.integers(100000, 1000000, 500).astype(np.float64)
+    return close, high, low, volume
+
+def test_parse_indicator():
+    assert parse_indicator('ema_50') == ('ema', 50)
+    assert parse_indicator('rsi') == ('rsi', 14)
+    assert parse_indicator('vwap') == ('vwap', None)
+    with pytest.raises(ValueError):
+        parse_indicator('stochastic')
+
+def test_output_names(ohlcv):
+    specs = ['ema_12', 'rsi', 'macd', 'bollinger', 'atr', 'vwap', 'obv']
+    results = IndicatorSet(*ohlcv).compute(specs)
+    assert list(results) == ['ema_12', 'rsi_14', 'macd', 'macd_signal', 'macd_hist',
+                             'bb_middle', 'bb_upper', 'bb_lower', 'atr_14', 'vwap', 'obv']
+    assert all(values.shape == (500,) for values in results.values())
+
+def test_values_match_pandas(ohlcv):
+    close, high, low, volume = ohlcv
+    results = compute_indicators(close, high, low, volume, ['ema_20', 'macd', 'bollinger', 'atr', 'vwap', 'obv'])
+    c, h, l, v = pd.Series(close), pd.Series(high), pd.Series(low), pd.Series(volume)
+    macd = c.ewm(span=12, adjust=False).mean() - c.ewm(span=26, adjust=False).mean()
+    prev = c.shift(1)
+    tr = pd.concat([h - l, (h - prev).abs(), (l - prev).abs()], axis=1).max(axis=1)
+    expected = {
+        'ema_20': c.ewm(span=20, adjust=False).mean(),
+        'macd': macd,
+        'macd_signal': macd.ewm(span=9, adjust=False).mean(),
+        'bb_middle': c.rolling(20).mean(),
+        'bb_upper': c.rolling(20).mean() + 2 * c.rolling(20).std(ddof=0),
+        'atr_14': tr.ewm(alpha=1 / 14, adjust=False).mean(),
+        'vwap': ((h + l + c) / 3 * v).cumsum() / v.cumsum(),
+        'obv': (np.sign(c.diff()).fillna(0) * v).cumsum()
+    }
+    for name, values in expected.items():
+        np.testing.assert_allclose(results[name], values.values, rtol=1e-9, err_msg=name)
+
+def test_rsi_range():
+    rising = np.arange(1.0, 101.0)
+    rsi = compute_indicators(rising, indicators=['rsi_14'])['rsi_14']
+    assert rsi[-1] == pytest.approx(100 - 100 / 101)
+    noisy = compute_indicators(100 + np.sin(np.arange(200)), indicators=['rsi_14'])['rsi_14']
+    assert np.all((noisy >= 0) & (noisy <= 100))
+
+def test_panel_rows_match_single_tickers(ohlcv):
+    close = ohlcv[0]
+    panel = np.vstack([close, close[::-1]])
+    np.testing.assert_allclose(ema(panel, 20)[1], ema(close[::-1], 20))
+    results = compute_indicators(panel, indicators=['rsi_14', 'bollinger'])
+    single = compute_indicators(close, indicators=['rsi_14', 'bollinger'])
+    np.testing.assert_allclose(results['rsi_14'][0], single['rsi_14'])
+    np.testing.assert_allclose(results['bb_lower'][0], single['bb_lower'])
+
+def test_volume_indicators_need_volume(ohlcv):
+    with pytest.raises(ValueError):
+        compute_indicators(ohlcv[0], indicators=['obv'])
+
+def test_analysis_returns_requested_indicators():
+    from stockAnalysis import analyze_stock
+    result = analyze_stock('MSFT', '2023-01-01', '2024-01-01', lookback_period=30,
+                           forecast_horizon=1, indicators=['macd', 'vwap'])
+    assert set(result['indicators']) == {'macd', 'macd_signal', 'macd_hist', 'vwap'}
+    assert len(result['indicators']['vwap']) == len(result['prices'])
@@ -0,0 +1,73 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from json_stream import write_json
+from stockAnalysis import analyze_stock
+from trading_calendar import format_dates
+
+def dumps(obj, chunk_size=8192):
+    stream = io.StringIO()
+    write_json(obj, stream, chunk_size)
+    return json.loads(stream.getvalue())
+
+def test_dates_keep_their_resolution():
+    intraday = pd.date_range('2024-01-02 09:30', periods=20, freq='min')
+    daily = pd.date_range('2024-01-02', periods=20, freq='D')
+    # Only the last chunk has a time of day; the whole array still gets minutes
+    mixed = pd.DatetimeIndex(list(daily[:-1]) + [pd.Timestamp('2024-02-01 09:30')])
+    assert dumps(intraday, chunk_size=7) == format_dates(intraday, 'm')
+    assert dumps(daily, chunk_size=7) == format_dates(daily, 'D')
+    assert dumps(mixed, chunk_size=7) == format_dates(mixed, 'm')
+    assert dumps({'at': intraday[1], 'on': daily[1]}) == {'at': '2024-01-02T09:31', 'on': '2024-01-03'}
+
+def test_intraday_arrays_match_list_output():
+    args = ('MSFT', '2024-01-02', '2024-01-09', 10)
+    listed = analyze_stock(*args, interval='5m')
+    streamed = dumps(analyze_stock(*args, interval='5m', as_arrays=True))
+    assert len(set(streamed['dates'])) == len(streamed['dates'])
+    assert streamed['dates'] == listed['dates']
+    assert streamed['prediction_intervals']['dates'] == listed['prediction_intervals']['dates']
+
+class CountingSink:
+    """File-like object that only counts what is written to it"""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+    def flush(self):
+        pass
+
+def minute_bars(years):
+    days = pd.bdate_range('2004-01-02', periods=252 * years).values
+    minutes = np.timedelta64(570, 'm') + np.arange(390).astype('timedelta64[m]')
+    return pd.DatetimeIndex((days[:, None] + minutes).ravel())
+
+def test_twenty_years_of_minute_bars_stream_in_bounded_memory():
+    import tracemalloc
+
+    dates = minute_bars(20)
+    rng = np.random.default_rng(0)
+    prices = (100 * np.exp(np.cumsum(rng.normal(0, 1e-4, len(dates))))).astype(np.float32)
+    sink = CountingSink()
+
+    tracemalloc.start()
+    try:
+        write_json({'dates': dates, 'prices': prices}, sink)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # ~2M bars encode to tens of MB of text; only a chunk of it may be held at once
+    assert len(dates) == 20 * 252 * 390
+    assert sink.chars > 50_000_000
+    assert peak < 8 * 1024 * 1024
+
+    # Every minute survives the round trip
+    parsed = pd.to_datetime(dumps(dates), format='%Y-%m-%dT%H:%M')
+    assert parsed.equals(dates)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from levels import LevelCache, cluster_levels, detect_levels, find_pivots, nearest_levels
+
+def range_bound(n=200, period=20, phase=0):
+    """Bars swinging between 99.5 and 110.5, one swing high and low per period"""
+    close = 105 + 5 * np.sin(2 * np.pi * (np.arange(n) + phase) / period)
+    return close + 0.5, close - 0.5, close
+
+def test_find_pivots_skips_incomplete_windows():
+    high = np.array([1.0, 5.0, 2.0, 3.0, 9.0, 3.0, 2.0, 1.0, 2.0, 3.0])
+    rows, cols, prices, is_high = find_pivots(high, order=2)
+    assert cols[is_high].tolist() == [4]
+    assert cols[~is_high].tolist() == [7]
+    assert prices[is_high].tolist() == [9.0]
+    # Bar 1 (5.0) is too close to the start to be confirmed
+    assert 1 not in cols.tolist()
+
+def test_cluster_levels_respects_tolerance_and_touches():
+    rows = np.zeros(6, dtype=np.intp)
+    prices = np.array([100.0, 100.4, 100.8, 103.0, 110.0, 110.2])
+    times = np.arange(6)
+    level_rows, level_prices, touches, first, last = cluster_levels(rows, prices, times, tolerance=0.005)
+    # 100.8 is more than 0.5% above 100.0, so it starts a level of its own (dropped: one touch)
+    assert level_prices.tolist() == pytest.approx([100.2, 110.1])
+    assert touches.tolist() == [2, 2]
+    assert first.tolist() == [0, 4] and last.tolist() == [1, 5]
+
+def test_detect_levels_finds_range_bounds():
+    high, low, close = range_bound()
+    levels = detect_levels(high, low, close)
+    by_type = {level['type']: level for level in levels}
+    assert by_type['resistance']['price'] == pytest.approx(110.5, abs=0.01)
+    assert by_type['support']['price'] == pytest.approx(99.5, abs=0.01)
+    assert by_type['resistance']['touches'] >= 8
+    assert levels[0]['touches'] >= levels[-1]['touches']
+
+def test_universe_rows_match_single_tickers():
+    a = range_bound()
+    b = range_bound(phase=7)
+    both = detect_levels(np.vstack([a[0], b[0]]), np.vstack([a[1], b[1]]), np.vstack([a[2], b[2]]))
+    assert both[0] == detect_levels(*a)
+    assert both[1] == detect_levels(*b)
+
+def test_incremental_extend_matches_full_scan():
+    high, low, _ = range_bound(300)
+    times = pd.date_range('2024-01-01', periods=300, freq='D')
+    incremental = LevelCache()
+    incremental.extend(['X'], times[:200], high[:200], low[:200])
+    for bar in range(200, 300, 7):
+        incremental.extend(['X'], times[:bar + 1], high[:bar + 1], low[:bar + 1])
+    incremental.extend(['X'], times, high, low)
+    full = LevelCache()
+    full.extend(['X'], times, high, low)
+    for kept, expected in zip(incremental.pivots['X'], full.pivots['X']):
+        np.testing.assert_array_equal(kept, expected)
+
+def test_nearest_levels():
+    prices = np.array([95.0, 100.0, 110.0])
+    assert nearest_levels(prices, 104.0) == (100.0, 110.0)
+    assert nearest_levels(prices, 120.0) == (110.0, None)
+    assert nearest_levels(prices, 90.0) == (None, 95.0)
@@ -0,0 +1,45 @@
+import wire_format
+from live_feed import LiveTickerClient
+
+def test_top_movers_update_is_applied():
+    client = LiveTickerClient(url='http://localhost:0')
+    client._on_top_movers_update([{'ticker': 'NVDA', 'price': 120.0, 'change_percent': 3.2},
+                                  {'ticker': 'AAPL', 'price': 190.0, 'change_percent': -1.1}])
+    assert client.top_movers() == ['NVDA', 'AAPL']
+    version, changed, _ = client.changes_since(0)
+    assert version == 1
+    assert changed['NVDA']['change_percent'] == 3.2
+
+    # The binary wire format decodes to the same update
+    payload = wire_format.encode([{'ticker': 'TSLA', 'price': 250.0, 'change_percent': 4.0}])
+    client._on_top_movers_update(payload)
+    assert client.top_movers() == ['TSLA']
+    assert client.changes_since(version)[1].keys() == {'TSLA'}
+
+def test_each_session_reads_only_what_changed_since_its_cursor():
+    client = LiveTickerClient(url='http://localhost:0')
+    client._on_top_stocks_update([{'ticker': 'AAPL', 'price': 190.0, 'signal': 'NEUTRAL'},
+                                  {'ticker': 'MSFT', 'price': 410.0, 'signal': 'BUY'}])
+    fast, first, _ = client.changes_since(0)
+    assert set(first) == {'AAPL', 'MSFT'}
+
+    # A session that stops refreshing gets the latest state per ticker, not a backlog
+    for price in (191.0, 192.0, 193.0):
+        client._on_stock_update({'ticker': 'AAPL', 'price': price, 'server_time': '10:00:01'})
+    version, changed, server_time = client.changes_since(fast)
+    assert list(changed) == ['AAPL']
+    assert changed['AAPL'] == {'ticker': 'AAPL', 'price': 193.0, 'signal': 'NEUTRAL', 'server_time': '10:00:01'}
+    assert server_time == '10:00:01'
+
+    # Nothing new since the latest cursor; a fresh session still sees everything
+    assert client.changes_since(version)[1] == {}
+    assert set(client.changes_since(0)[1]) == {'AAPL', 'MSFT'}
+    # Entries handed out earlier are never mutated
+    assert first['AAPL']['price'] == 190.0
+
+def test_malformed_updates_are_ignored():
+    client = LiveTickerClient(url='http://localhost:0')
+    client._on_stock_update({'price': 1.0})
+    client._on_top_stocks_update([])
+    client._on_top_stocks_update('not a list')
+    assert client.changes_since(0) == (0, {}, None)
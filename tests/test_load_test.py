@@ -0,0 +1,46 @@
+import asyncio
+import os
+import socket
+
+import numpy as np
+import pytest
+
+import load_test
+from load_test import _share, inject_tick, latency_stats, message_key, process_usage
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def test_injected_ticks_have_distinct_keys():
+    keys = {message_key(inject_tick(seq)) for seq in range(5000)}
+    assert len(keys) == 5000
+    assert inject_tick(0)['ticker'] != inject_tick(1)['ticker']
+
+def test_clients_are_spread_over_workers():
+    assert _share(10, 4) == [3, 3, 2, 2]
+    assert _share(3, 4) == [1, 1, 1, 0]
+
+def test_latency_stats():
+    stats = latency_stats(np.array([0.001, 0.002, 0.003, 0.100]))
+    assert stats['p50_ms'] == pytest.approx(2.5)
+    assert stats['max_ms'] == pytest.approx(100.0)
+    assert np.isnan(latency_stats([])['p99_ms'])
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/stat'), reason='reads /proc')
+def test_process_usage():
+    cpu, rss = process_usage(os.getpid())
+    assert cpu > 0 and rss > 0
+
+# Other tests import eventlet into this process before the harness forks its workers
+@pytest.mark.filterwarnings('ignore:Using fork:DeprecationWarning')
+def test_injected_ticks_reach_every_client():
+    # The harness's asyncio clients need the asyncio_client extra
+    pytest.importorskip('aiohttp')
+    rows = asyncio.run(load_test.run([5], 'inject', workers=1, ticks=20, rate=50.0, drain=5.0,
+                                     port=free_port()))
+    assert rows[0]['connected'] == 5
+    assert rows[0]['broadcasts'] == 20
+    assert rows[0]['delivered'] == 100
+    assert rows[0]['dropped'] == 0
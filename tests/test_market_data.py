@@ -0,0 +1,86 @@
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from market_data import SyntheticProvider
+
+class CountingProvider(SyntheticProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fetches = 0
+
+    def _fetch(self, tickers, start, end, interval):
+        self.fetches += 1
+        return super()._fetch(tickers, start, end, interval)
+
+def test_coarser_interval_is_resampled_from_the_cache():
+    provider = CountingProvider()
+    fine = provider.history('AAPL', start='2024-01-02', end='2024-01-04', interval='5m')
+    hourly = provider.history('AAPL', start='2024-01-02', end='2024-01-04', interval='1h')
+    assert provider.fetches == 1
+    assert hourly['Volume'].sum() == pytest.approx(fine['Volume'].sum())
+    assert hourly.index[0] == pd.Timestamp('2024-01-02 09:30')
+
+def test_cache_is_safe_to_share_between_threads():
+    provider = CountingProvider()
+    provider.cache_size = 2
+    # Every lookup also evicts whatever has expired
+    provider.cache_ttl = 0
+    errors = []
+
+    def work(worker):
+        try:
+            for i in range(40):
+                day = pd.Timestamp('2024-01-02') + pd.Timedelta(days=(worker + i) % 5)
+                provider.history(['AAPL', 'MSFT'], start=day, end=day + pd.Timedelta(days=2), interval='15m')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    # Switch threads as often as possible so evictions interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert len(provider._bar_cache) <= provider.cache_size
+
+def test_cache_lookups_wait_for_the_cache_lock():
+    provider = CountingProvider()
+    assert provider._bar_cache == {}
+    provider.history('AAPL', start='2024-01-02', end='2024-01-04', interval='5m')
+    done = threading.Event()
+
+    def lookup():
+        provider.history('AAPL', start='2024-01-02', end='2024-01-03', interval='15m')
+        done.set()
+
+    with provider._cache_lock:
+        thread = threading.Thread(target=lookup)
+        thread.start()
+        assert not done.wait(0.2)
+    assert done.wait(10)
+    thread.join()
+    assert provider.fetches == 1
+
+def test_quotes_are_stamped_in_exchange_time(monkeypatch):
+    # A server running on Tokyo time still stamps quotes with New York wall-clock time
+    monkeypatch.setenv('TZ', 'Asia/Tokyo')
+    time.tzset()
+    try:
+        provider = SyntheticProvider()
+        quote = provider.quotes(['AAPL'])['AAPL']
+        now = pd.Timestamp.now(tz='America/New_York').tz_localize(None)
+        assert abs(quote['time'] - now) < pd.Timedelta(seconds=5)
+        assert abs(provider.now() - now) < pd.Timedelta(seconds=5)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
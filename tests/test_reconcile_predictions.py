@@ -0,0 +1,52 @@
+import json
+
+import pandas as pd
+import pytest
+
+from reconcile_predictions import FilePredictionStore, reconcile
+
+CLOSES = pd.DataFrame({'AAPL': [100.0, 102.0, 101.0, 105.0]},
+                      index=pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']))
+
+def close_source(tickers, start, end):
+    # Like a live provider, the current session's price is there before the close
+    return CLOSES.loc[:pd.Timestamp(end) + pd.Timedelta(days=1), list(tickers)]
+
+def entry(date, price):
+    return {'date': f'{date}T00:00:00.000Z', 'predictedPrice': price, 'signal': 'BUY'}
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / 'stocks.json'
+    path.write_text(json.dumps([{'_id': 'a1', 'ticker': 'AAPL', 'predictionHistory': [
+        entry('2024-01-03', 101.0),
+        entry('2024-01-04', 103.0),
+        entry('2024-01-05', 104.0)
+    ]}]))
+    return FilePredictionStore(str(path))
+
+def history(store):
+    with open(store.path) as f:
+        return json.load(f)[0]['predictionHistory']
+
+def test_matured_rows_are_filled_and_pending_rows_are_left(store):
+    result = reconcile(store, as_of='2024-01-05', close_source=close_source)
+    assert result['reconciled'] == 2
+    rows = history(store)
+    assert [row.get('actualPrice') for row in rows] == [102.0, 101.0, None]
+    assert rows[0]['accuracy'] == pytest.approx(100 - 1 / 102 * 100)
+
+def test_reconciling_twice_is_idempotent(store):
+    reconcile(store, as_of='2024-01-05', close_source=close_source)
+    before = history(store)
+    result = reconcile(store, as_of='2024-01-05', close_source=close_source)
+    assert result['reconciled'] == 0
+    assert result['outstanding'] == 0
+    assert history(store) == before
+
+def test_same_day_prediction_waits_for_the_close(store):
+    # Mid-session the 2024-01-05 price is still moving
+    reconcile(store, as_of='2024-01-05 12:00', close_source=close_source)
+    assert history(store)[2].get('actualPrice') is None
+    reconcile(store, as_of='2024-01-05 16:05', close_source=close_source)
+    assert history(store)[2]['actualPrice'] == 105.0
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip('flask_socketio')
+pytest.importorskip('eventlet')
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTS)
+
+def run_server(script, tmp_path, **env):
+    """Run `script` against the socket server in a fresh process; returns what it prints as JSON
+
+    The server monkey-patches the process with eventlet on import, so it is
+    kept out of the test runner's own process.
+    """
+    code = textwrap.dedent('''
+        import json, sys
+        sys.path.insert(0, {tests!r})
+        import stock_socket_server as server
+    ''').format(tests=TESTS) + textwrap.dedent(script)
+    env = dict(os.environ, MARKET_DATA_PROVIDER='synthetic', TICK_JOURNAL_DIR=str(tmp_path / 'ticks'),
+               PYTHONPATH=os.pathsep.join([os.path.join(ROOT, 'server', 'websocket'),
+                                           os.path.join(ROOT, 'server', 'python')]), **env)
+    proc = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def test_signed_in_user_gets_alerts_after_reconnecting(tmp_path):
+    received = run_server('''
+        from test_alerts import sign
+        token = sign({'id': 'u1'}, 'secret')
+        first = server.socketio.test_client(server.app, auth={'token': token})
+        first.emit('add_alert', {'ticker': 'AAPL', 'metric': 'price', 'direction': 'above',
+                                 'threshold': 150}, callback=True)
+        first.disconnect()
+
+        second = server.socketio.test_client(server.app, auth={'token': token})
+        second.get_received()
+        server.check_alerts({'ticker': 'AAPL', 'price': 140.0, 'change_percent': 0.0})
+        server.check_alerts({'ticker': 'AAPL', 'price': 155.0, 'change_percent': 0.0})
+        print(json.dumps([[m['name'], m['args'][0]['owner']] for m in second.get_received()]))
+    ''', tmp_path, JWT_SECRET='secret')
+    assert received == [['alert_triggered', 'user:u1']]
+
+def test_forged_token_does_not_get_another_users_alerts(tmp_path):
+    received = run_server('''
+        from test_alerts import sign
+        owner = server.socketio.test_client(server.app, auth={'token': sign({'id': 'u1'}, 'secret')})
+        owner.emit('add_alert', {'ticker': 'AAPL', 'metric': 'price', 'direction': 'above',
+                                 'threshold': 150}, callback=True)
+        intruder = server.socketio.test_client(server.app, auth={'token': sign({'id': 'u1'}, 'guess')})
+        listed = intruder.emit('list_alerts', {'user_id': 'u1'}, callback=True)
+        intruder.get_received()
+        server.check_alerts({'ticker': 'AAPL', 'price': 140.0, 'change_percent': 0.0})
+        server.check_alerts({'ticker': 'AAPL', 'price': 155.0, 'change_percent': 0.0})
+        print(json.dumps([listed, [m['name'] for m in intruder.get_received()]]))
+    ''', tmp_path, JWT_SECRET='secret')
+    assert received == [[], []]
+
+def test_correlation_matrix_is_emitted_once_per_view(tmp_path):
+    result = run_server('''
+        emitted = []
+        emit = server.socketio.emit
+        def counting_emit(event, *args, **kwargs):
+            if event == 'correlation_update':
+                emitted.append(kwargs.get('to'))
+            return emit(event, *args, **kwargs)
+        server.socketio.emit = counting_emit
+
+        clients = [server.socketio.test_client(server.app) for _ in range(4)]
+        views = [{'tickers': 'AAPL,MSFT'}, {'tickers': 'AAPL,MSFT'}, {'tickers': 'AAPL,MSFT'},
+                 {'tickers': 'AAPL,MSFT', 'kind': 'covariance'}]
+        for client, view in zip(clients, views):
+            client.emit('subscribe_correlation', view, callback=True)
+        # Switching views leaves the old room
+        clients[2].emit('subscribe_correlation', {'tickers': 'AAPL,MSFT', 'kind': 'covariance'}, callback=True)
+        clients[1].emit('unsubscribe_correlation', callback=True)
+        for client in clients:
+            client.get_received()
+
+        server.push_correlation()
+        received = [[m['args'][0]['kind'] for m in client.get_received() if m['name'] == 'correlation_update']
+                    for client in clients]
+        print(json.dumps({'emits': len(emitted), 'received': received}))
+    ''', tmp_path)
+    assert result['emits'] == 2
+    assert result['received'] == [['correlation'], [], ['covariance'], ['covariance']]
@@ -0,0 +1,147 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import stockAnalysis
+from stockAnalysis import analyze_stock, forecast_path, forecast_step_errors
+
+# Ends on the Friday before Christmas 2023
+ARGS = ('MSFT', '2020-01-01', '2023-12-23')
+
+@pytest.fixture(scope='module')
+def daily():
+    return analyze_stock(*ARGS, lookback_period=30, forecast_horizon=5)
+
+class NextStepModel:
+    """Predicts the last price of each window plus one"""
+    def predict(self, X):
+        return X[:, -1] + 1.0
+
+class PriceAndFeatureModel:
+    """Predicts the last price of each window plus its feature column"""
+    def predict(self, X):
+        return X[:, 1] + X[:, 2]
+
+def test_forecast_path_rolls_each_prediction_into_the_window():
+    windows = np.array([[1.0, 2.0, 3.0], [10.0, 20.0, 30.0]])
+    path = forecast_path(NextStepModel(), windows, 3)
+    np.testing.assert_array_equal(path, [[4.0, 5.0, 6.0], [31.0, 32.0, 33.0]])
+    # The caller's windows are left as they were
+    assert windows[0, -1] == 3.0
+
+def test_forecast_path_holds_feature_columns():
+    # Two price columns, then one feature column that stays put
+    path = forecast_path(PriceAndFeatureModel(), np.array([[1.0, 2.0, 100.0]]), 2, price_columns=2)
+    np.testing.assert_array_equal(path, [[102.0, 202.0]])
+
+def test_forecast_step_errors_skip_steps_past_the_end():
+    prices = np.array([10.0, 11.0, 12.0, 13.0])
+    path = np.array([[11.0, 13.0], [12.0, 13.0], [14.0, 15.0]])
+    errors = forecast_step_errors(path, prices, 1)
+    assert [step['samples'] for step in errors] == [3, 2]
+    assert errors[0]['mae'] == pytest.approx(1 / 3)
+    assert errors[1]['rmse'] == pytest.approx(np.sqrt(0.5))
+
+def test_forecast_has_one_entry_per_step(daily):
+    assert 'error' not in daily
+    forecast = daily['forecast']
+    assert forecast['horizon'] == 5
+    assert [step['step'] for step in forecast['path']] == [1, 2, 3, 4, 5]
+    assert forecast['path'][0]['price'] == daily['next_day_prediction']['price']
+    assert forecast['path'][0]['date'] == daily['next_day_prediction']['date']
+    assert all(step['error']['samples'] > 0 for step in forecast['path'])
+
+def test_intraday_training_is_capped(monkeypatch):
+    # Six months of minute bars: ~50k windows, ~40k of them in the training range
+    monkeypatch.setattr(stockAnalysis, 'MAX_TRAIN_ROWS', 1000)
+    lookback = 60
+    started = time.perf_counter()
+    tracemalloc.start()
+    try:
+        result = analyze_stock('MSFT', '2023-01-01', '2023-07-01', lookback_period=lookback,
+                               interval='1m', forecast_horizon=2, as_arrays=True)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - started
+
+    assert 'error' not in result
+    assert len(result['prices']) > 40000
+    # The training matrix holds at most MAX_TRAIN_ROWS windows
+    assert result['memory_report']['arrays']['X'] <= 1000 * lookback * 8
+    # The uncapped training matrix alone is ~19 MB and the whole run peaks near 95 MB
+    assert peak < 60 * 1024 * 1024
+    assert elapsed < 60
+
+def test_forecast_dates_skip_exchange_holidays(daily):
+    # Christmas Day and New Year's Day are skipped, as are the weekends
+    assert [step['date'] for step in daily['forecast']['path']] == [
+        '2023-12-26', '2023-12-27', '2023-12-28', '2023-12-29', '2024-01-02']
+
+def test_max_points_downsamples_the_chart_series(daily):
+    sampled = analyze_stock(*ARGS, lookback_period=30, forecast_horizon=5, max_points=200)
+    assert sampled['downsampling'] == {'original_points': len(daily['prices']), 'points': len(sampled['prices']),
+                                       'method': 'lttb'}
+    assert len(sampled['prices']) <= 200
+    assert len(sampled['dates']) == len(sampled['predictions']) == len(sampled['prices'])
+    assert sampled['dates'][0] == daily['dates'][0] and sampled['dates'][-1] == daily['dates'][-1]
+    # Markers keep every signal, not just those at sampled bars
+    assert len(sampled['signal_markers']['dates']) == daily['signal_stats']['total_signals']
+    assert sampled['forecast'] == daily['forecast']
+
+def test_cli_max_points(tmp_path):
+    script = os.path.join(os.path.dirname(stockAnalysis.__file__), 'stockAnalysis.py')
+    env = dict(os.environ, MARKET_DATA_PROVIDER='synthetic', FEATURE_STORE_DIR=str(tmp_path))
+    output = subprocess.run([sys.executable, script, 'MSFT', '2023-01-01', '2024-01-01', '30', '--max-points=50',
+                             '--compact'], env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output)
+    assert len(result['prices']) <= 50
+    assert result['dates'][0] == '2023-01-02' and result['dates'][-1] == '2023-12-29'
+    assert 'Close' not in result['stock_data']
+    assert len(result['stock_data']['Open']) == len(result['prices'])
+
+def test_support_and_resistance_bracket_the_last_price(daily):
+    levels = daily['support_resistance']
+    last_price = daily['prices'][-1]
+    assert levels['levels']
+    assert all(level['touches'] >= 2 for level in levels['levels'])
+    if levels['nearest_support'] is not None:
+        assert levels['nearest_support'] <= last_price
+    if levels['nearest_resistance'] is not None:
+        assert levels['nearest_resistance'] > last_price
+    for level in levels['levels']:
+        assert level['type'] == ('support' if level['price'] <= round(last_price, 2) else 'resistance')
+        assert ARGS[1] <= level['first_seen'] <= level['last_seen'] < ARGS[2]
+
+def test_tree_predictions_average_to_the_forest():
+    from sklearn.ensemble import RandomForestRegressor
+    from stockAnalysis import tree_predictions, tree_value_table
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = X @ [1.0, -2.0, 0.5, 0.0] + rng.normal(0, 0.1, 300)
+    model = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+    per_tree = tree_predictions(model, X[:50], tree_value_table(model))
+    assert per_tree.shape == (50, 20)
+    np.testing.assert_allclose(per_tree.mean(axis=1), model.predict(X[:50]))
+    np.testing.assert_allclose(per_tree[:, 3], model.estimators_[3].predict(X[:50]))
+
+def test_prediction_intervals(daily):
+    intervals = daily['prediction_intervals']
+    assert intervals['quantiles'] == list(stockAnalysis.PREDICTION_QUANTILES)
+    bands = intervals['bands']
+    assert list(bands) == ['p5', 'p50', 'p95']
+    assert len(bands['p5']) == len(intervals['dates']) > 0
+    assert intervals['dates'][-1] == daily['dates'][-1]
+    assert np.all(np.array(bands['p5']) <= np.array(bands['p50']))
+    assert np.all(np.array(bands['p50']) <= np.array(bands['p95']))
+    assert 0.0 <= intervals['coverage'] <= 1.0
+
+    next_day = daily['next_day_prediction']['interval']
+    assert list(next_day) == ['p5', 'p50', 'p95']
+    assert next_day['p5'] <= next_day['p50'] <= next_day['p95']
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from tick_journal import TickJournal, TICK_DTYPE, to_record
+
+def ticks(start, count, tickers=('AAPL', 'MSFT')):
+    return np.array([to_record({'ticker': tickers[i % len(tickers)], 'price': 100.0 + start + i,
+                                'change_percent': 0.5, 'signal': 'BUY'}, now=1_700_000_000 + start + i)
+                     for i in range(count)], dtype=TICK_DTYPE)
+
+def segment_files(root):
+    return sorted(name for name in os.listdir(root) if name.startswith('journal-'))
+
+def test_segments_roll_over_and_old_ones_are_pruned(tmp_path):
+    journal = TickJournal(root=str(tmp_path), snapshot_every=5, retain_segments=2)
+    journal.restore()
+    for batch in range(6):
+        journal._commit(ticks(batch * 5, 5))
+
+    # Six rollovers; only the newest two segments are kept (the current one is empty)
+    assert journal.segment == 6
+    assert segment_files(tmp_path) == ['journal-000005.bin', 'journal-000006.bin']
+    history = journal.history()
+    assert len(history) == 5
+    assert history['price'].tolist() == [125.0, 126.0, 127.0, 128.0, 129.0]
+
+    # The snapshot still restores every ticker's latest tick
+    restored = TickJournal(root=str(tmp_path), snapshot_every=5, retain_segments=2).restore()
+    assert {ticker: stock['price'] for ticker, stock in restored.items()} == {'AAPL': 129.0, 'MSFT': 128.0}
+
+def test_retention_defaults_to_a_bound(tmp_path):
+    journal = TickJournal(root=str(tmp_path), snapshot_every=1)
+    assert journal.retain_segments
+    journal.restore()
+    for i in range(journal.retain_segments + 5):
+        journal._commit(ticks(i, 1))
+    assert len(segment_files(tmp_path)) == journal.retain_segments
+
+def test_unbounded_retention_keeps_every_segment(tmp_path):
+    journal = TickJournal(root=str(tmp_path), snapshot_every=2, retain_segments=None)
+    journal.restore()
+    for batch in range(4):
+        journal._commit(ticks(batch * 2, 2))
+    assert len(segment_files(tmp_path)) == 5
+    assert len(journal.history()) == 8
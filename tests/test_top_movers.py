@@ -0,0 +1,35 @@
+import random
+
+from top_movers import TopMovers
+
+def test_ranking_follows_the_largest_moves():
+    movers = TopMovers(size=3)
+    for ticker, change in [('AAPL', 1.0), ('MSFT', -4.0), ('NVDA', 2.5), ('TSLA', 0.5), ('AMZN', -3.0)]:
+        movers.update(ticker, change)
+    assert movers.ranking() == ['MSFT', 'AMZN', 'NVDA']
+    assert movers.update('TSLA', 5.0)
+    assert movers.ranking() == ['TSLA', 'MSFT', 'AMZN']
+    assert movers.remove('MSFT')
+    assert movers.ranking() == ['TSLA', 'AMZN', 'NVDA']
+
+def test_ties_rank_by_ticker():
+    tickers = [f"T{i:02d}" for i in range(20)]
+    rankings = set()
+    for seed in range(5):
+        order = tickers[:]
+        random.Random(seed).shuffle(order)
+        movers = TopMovers(size=5)
+        for ticker in order:
+            movers.update(ticker, 2.0)
+        rankings.add(tuple(movers.ranking()))
+    assert rankings == {tuple(tickers[:5])}
+
+def test_repeated_equal_moves_are_not_changes():
+    movers = TopMovers(size=3)
+    for ticker in ['AAPL', 'MSFT', 'NVDA', 'TSLA']:
+        movers.update(ticker, 1.0)
+    assert movers.ranking() == ['AAPL', 'MSFT', 'NVDA']
+    # Ticks that leave every move where it was never report a change
+    for ticker in ['TSLA', 'NVDA', 'AAPL', 'MSFT', 'TSLA']:
+        assert not movers.update(ticker, -1.0)
+    assert movers.ranking() == ['AAPL', 'MSFT', 'NVDA']
@@ -0,0 +1,64 @@
+from datetime import datetime, time
+
+import pandas as pd
+import pytest
+
+from trading_calendar import (
+    EXCHANGE_TZ, TradingCalendar, format_dates, get_trading_calendar
+)
+
+@pytest.fixture(scope='module')
+def calendar():
+    return get_trading_calendar()
+
+@pytest.mark.parametrize('day', [
+    '2024-01-01',  # New Year's Day
+    '2024-01-15',  # Martin Luther King Jr. Day
+    '2024-03-29',  # Good Friday
+    '2022-06-20',  # Juneteenth, observed on the Monday
+    '2021-07-05',  # Independence Day, observed on the Monday
+    '2024-11-28',  # Thanksgiving
+    '2022-12-26',  # Christmas, observed on the Monday
+    '2025-01-09',  # Carter national day of mourning
+])
+def test_holidays_are_not_sessions(calendar, day):
+    assert not calendar.is_session(day)
+    assert calendar.session_close(day) is None
+
+def test_saturday_new_year_is_not_moved_to_friday(calendar):
+    # Jan 1 2022 fell on a Saturday; Dec 31 2021 was a normal session
+    assert calendar.is_session('2021-12-31')
+
+def test_early_closes(calendar):
+    assert calendar.session_close('2024-07-03') == time(13, 0)
+    assert calendar.session_close('2024-11-29') == time(13, 0)
+    assert calendar.session_close('2024-12-24') == time(13, 0)
+    assert calendar.session_close('2024-12-23') == time(16, 0)
+
+def test_next_sessions_skip_weekends_and_holidays(calendar):
+    assert format_dates(calendar.next_sessions('2023-12-22', 5)) == [
+        '2023-12-26', '2023-12-27', '2023-12-28', '2023-12-29', '2024-01-02']
+    # The day itself never counts, even when it is a session
+    assert format_dates(calendar.next_sessions('2024-03-28 15:00', 1)) == ['2024-04-01']
+
+def test_next_sessions_past_the_end_raise():
+    calendar = TradingCalendar(start='2024-01-01', end='2024-01-31')
+    with pytest.raises(ValueError):
+        calendar.next_sessions('2024-01-29', 5)
+
+def test_next_bars_stop_at_each_close(calendar):
+    # The day after Thanksgiving closes at 13:00; the last hourly bar is shorter
+    bars = calendar.next_bars('2024-11-29 11:00', 3600, 4)
+    assert format_dates(bars, 'm') == [
+        '2024-11-29T11:30', '2024-11-29T12:30', '2024-12-02T09:30', '2024-12-02T10:30']
+
+def test_sessions_between_is_inclusive(calendar):
+    sessions = calendar.sessions_between('2024-07-01', '2024-07-08')
+    assert format_dates(sessions) == ['2024-07-01', '2024-07-02', '2024-07-03', '2024-07-05', '2024-07-08']
+
+def test_is_open(calendar):
+    assert calendar.is_open(datetime(2024, 12, 24, 12, 59, tzinfo=EXCHANGE_TZ))
+    assert not calendar.is_open(datetime(2024, 12, 24, 13, 0, tzinfo=EXCHANGE_TZ))
+    assert not calendar.is_open(datetime(2024, 12, 25, 11, 0, tzinfo=EXCHANGE_TZ))
+    # Aware times in other zones are converted; 14:45 UTC is 09:45 in New York
+    assert calendar.is_open(pd.Timestamp('2024-12-23 14:45', tz='UTC').to_pydatetime())
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+pytest.importorskip('msgpack')
+
+import wire_format
+from wire_format import JSON, MSGPACK, compact_stock, decode, encode, expand_stock, negotiate
+
+STOCK = {'ticker': 'AAPL', 'price': 187.32, 'change_percent': -1.25, 'signal': 'SELL',
+         'timestamp': '2024-01-02 10:15:30', 'volume': 1200}
+
+def snapshot(n):
+    return [dict(STOCK, ticker=f'T{i:04d}', price=100.0 + i, signal=('BUY', 'SELL', 'NEUTRAL')[i % 3])
+            for i in range(n)]
+
+def test_negotiate():
+    assert negotiate(MSGPACK) == MSGPACK
+    assert negotiate(JSON) == JSON
+    assert negotiate(None) == JSON
+    assert negotiate('xml') == JSON
+
+def test_compact_projection_round_trips():
+    record = compact_stock(STOCK)
+    assert set(record) == {'t', 'p', 'c', 's', 'ts', 'volume'}
+    assert isinstance(record['s'], int) and isinstance(record['ts'], int)
+    assert expand_stock(record) == STOCK
+    # The compact record is plain data, so it survives the JSON format too
+    assert expand_stock(json.loads(json.dumps(record))) == STOCK
+
+def test_small_payloads_are_sent_raw():
+    payload = encode(STOCK)
+    assert payload[0] == wire_format.RAW
+    assert decode(payload) == STOCK
+
+def test_large_payloads_are_deflated():
+    stocks = snapshot(200)
+    payload = encode(stocks)
+    assert payload[0] == wire_format.DEFLATED
+    assert len(payload) < len(json.dumps(stocks))
+    assert decode(payload) == stocks
+    # The threshold decides, not the payload type
+    assert encode(stocks, threshold=10 ** 9)[0] == wire_format.RAW
+    assert decode(encode(stocks, threshold=10 ** 9)) == stocks